@@ -0,0 +1,43 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+from authorizer import PRINCIPAL_ID, Authorizer, HttpVerb, TokenValidator
+
+# *** Section 1 : authorization rules
+# Allow all public resources/methods explicitly
+
+# User specific resources/methods
+USER_RULES = [
+    (HttpVerb.GET, f"/users/{PRINCIPAL_ID}"),
+    (HttpVerb.GET, f"/users/count/{PRINCIPAL_ID}"),
+    (HttpVerb.PUT, f"/users/{PRINCIPAL_ID}"),
+    (HttpVerb.DELETE, f"/users/{PRINCIPAL_ID}"),
+    (HttpVerb.GET, f"/users/{PRINCIPAL_ID}/*"),
+    (HttpVerb.PUT, f"/users/{PRINCIPAL_ID}/*"),
+    (HttpVerb.DELETE, f"/users/{PRINCIPAL_ID}/*"),
+]
+
+# Administrative privileges, on top of the user ones
+ADMIN_RULES = [
+    (HttpVerb.GET, "users/count"),
+    (HttpVerb.GET, "users"),
+    (HttpVerb.GET, "users/*"),
+    (HttpVerb.DELETE, "users"),
+    (HttpVerb.DELETE, "users/*"),
+    (HttpVerb.PUT, "users"),
+    (HttpVerb.PUT, "users/*"),
+]
+
+ROLE_RULES = {
+    'user': USER_RULES,
+    'admin': USER_RULES + ADMIN_RULES,
+}
+
+# *** Section 2 : authorizer setup
+authorizer = Authorizer(
+    ROLE_RULES,
+    TokenValidator(os.getenv('USER_POOL_ID', None), os.getenv('APPLICATION_CLIENT_ID', None)),
+    admin_group_name=os.getenv('ADMIN_GROUP_NAME', None),
+)
+lambda_handler = authorizer.lambda_handler
@@ -0,0 +1,64 @@
+import os
+from boto3.dynamodb.conditions import Attr
+from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_client, get_table
+from order_summary import IN_SUMMARY
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+ordersTable = os.getenv('TABLE_NAME')
+
+BACKFILL_PAGE_SIZE = int(os.getenv('BACKFILL_PAGE_SIZE', '500'))
+# stop scanning when less than this is left, so the position can be returned
+BACKFILL_TIME_MARGIN_MS = int(os.getenv('BACKFILL_TIME_MARGIN_MS', '10000'))
+
+
+def backfill_item(table, item):
+    """Flags an order as counted in the summary of its user. The stream record of the update
+    adds the order to the summary. Returns False when the order was flagged meanwhile."""
+    try:
+        table.update_item(
+            Key={'userId': item['userId'], 'orderId': item['orderId']},
+            UpdateExpression='SET #f = :f',
+            ConditionExpression='attribute_not_exists(#f) AND attribute_exists(#d)',
+            ExpressionAttributeNames={'#f': IN_SUMMARY, '#d': 'data'},
+            ExpressionAttributeValues={':f': True}
+        )
+        return True
+    except get_client('dynamodb').exceptions.ConditionalCheckFailedException:
+        return False
+
+
+@tracer.capture_method
+def backfill_order_summary(start_key=None, should_stop=None):
+    """Scans the Orders table for orders not counted in the order summaries and flags them,
+    until the scan is complete or should_stop returns True"""
+    table = get_table(ordersTable)
+    updated = 0
+    while True:
+        scan_kwargs = {
+            'FilterExpression': Attr(IN_SUMMARY).not_exists() & Attr('data').exists(),
+            'ProjectionExpression': 'userId, orderId',
+            'Limit': BACKFILL_PAGE_SIZE,
+        }
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+        response = table.scan(**scan_kwargs)
+        updated += sum(backfill_item(table, item) for item in response['Items'])
+        start_key = response.get('LastEvaluatedKey')
+        if start_key is None or (should_stop is not None and should_stop()):
+            break
+    return {'updated': updated, 'lastEvaluatedKey': start_key, 'complete': start_key is None}
+
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    """Entry point for the backfill job. Invoke it again with the returned
+    lastEvaluatedKey while 'complete' is false."""
+    def should_stop():
+        return context.get_remaining_time_in_millis() < BACKFILL_TIME_MARGIN_MS
+
+    result = backfill_order_summary((event or {}).get('lastEvaluatedKey'), should_stop)
+    logger.info(result)
+    return result
@@ -0,0 +1,69 @@
+import os
+from datetime import datetime, timezone
+from boto3.dynamodb.conditions import Attr
+from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_client, get_table
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+ordersTable = os.getenv('TABLE_NAME')
+
+BACKFILL_PAGE_SIZE = int(os.getenv('BACKFILL_PAGE_SIZE', '500'))
+# stop scanning when less than this is left, so the position can be returned
+BACKFILL_TIME_MARGIN_MS = int(os.getenv('BACKFILL_TIME_MARGIN_MS', '10000'))
+
+
+def epoch_order_time(order_time):
+    return int(datetime.strptime(order_time, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp())
+
+
+def backfill_item(table, item):
+    """Copies data.orderTime of an order to the top level epoch orderTime, which adds it
+    to the userOrderTimeIndex. Returns False when the order got an orderTime meanwhile."""
+    try:
+        table.update_item(
+            Key={'userId': item['userId'], 'orderId': item['orderId']},
+            UpdateExpression='SET #t = :t',
+            ConditionExpression='attribute_not_exists(#t) AND attribute_exists(#k)',
+            ExpressionAttributeNames={'#t': 'orderTime', '#k': 'orderId'},
+            ExpressionAttributeValues={':t': epoch_order_time(item['data']['orderTime'])}
+        )
+        return True
+    except get_client('dynamodb').exceptions.ConditionalCheckFailedException:
+        return False
+
+
+@tracer.capture_method
+def backfill_order_time(start_key=None, should_stop=None):
+    """Scans the Orders table for orders without a top level orderTime and backfills them,
+    until the scan is complete or should_stop returns True"""
+    table = get_table(ordersTable)
+    updated = 0
+    while True:
+        scan_kwargs = {
+            'FilterExpression': Attr('orderTime').not_exists() & Attr('data.orderTime').exists(),
+            'ProjectionExpression': 'userId, orderId, #d.orderTime',
+            'ExpressionAttributeNames': {'#d': 'data'},
+            'Limit': BACKFILL_PAGE_SIZE,
+        }
+        if start_key:
+            scan_kwargs['ExclusiveStartKey'] = start_key
+        response = table.scan(**scan_kwargs)
+        updated += sum(backfill_item(table, item) for item in response['Items'])
+        start_key = response.get('LastEvaluatedKey')
+        if start_key is None or (should_stop is not None and should_stop()):
+            break
+    return {'updated': updated, 'lastEvaluatedKey': start_key, 'complete': start_key is None}
+
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    """Entry point for the backfill job. Invoke it again with the returned
+    lastEvaluatedKey while 'complete' is false."""
+    def should_stop():
+        return context.get_remaining_time_in_millis() < BACKFILL_TIME_MARGIN_MS
+
+    result = backfill_order_time((event or {}).get('lastEvaluatedKey'), should_stop)
+    logger.info(result)
+    return result
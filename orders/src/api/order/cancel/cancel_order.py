@@ -1,26 +1,31 @@
-import simplejson as json
 import os
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from aws_lambda_powertools import Logger, Tracer, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from datetime import datetime, timedelta
-from utils import get_order
-
-# Custom exception
-class OrderStatusError(Exception):
-    status_code = 400
-    
-    def __init__(self, message):
-        super().__init__(message)
+from datetime import datetime, timedelta, timezone
+from utils import get_order, cache_order, reset_order_cache, OrderNotFoundError, OrderStatusError
+from response import dumps, json_response, text_response
+from aws_clients import get_client, get_table
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 metrics = Metrics()
 ordersTable = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
+
+# Orders can only be canceled within 10 minutes of being placed
+MAX_CANCEL_AGE_SECONDS = 600
+
+def cancel_error(userId, orderId, now):
+    """Builds the error for a cancel whose condition failed, reading the order is only
+    needed on this path to tell the caller why"""
+    order = get_order(userId, orderId, use_cache=False)
+    logger.info(f"Current order status for order {orderId} is {order['status']}")
+    if order['status'] != 'SENT':
+      return OrderStatusError(f"Order {orderId} with status {order['status']} cannot be canceled. Order must have status SENT to be canceled.")
+    orderAge = now - datetime.strptime(order['orderTime'], '%Y-%m-%dT%H:%M:%SZ')
+    return OrderStatusError(f"Order {orderId} has been created  {str(round(orderAge.total_seconds()/60, 2))} minutes ago. Order must not be older than 10 minutes to be canceled.")
 
 @tracer.capture_method
 @metrics.log_metrics
@@ -28,50 +33,52 @@ def cancel_order(event, context):
     userId = event['requestContext']['authorizer']['claims']['sub']
     orderId = event['pathParameters']['orderId']
 
-    order = get_order(userId, orderId)
-    logger.info(f"Current order status for order {orderId} is {order['status']}")
-    if order['status'] != 'SENT':
-      raise OrderStatusError(f"Order {orderId} with status {order['status']} cannot be canceled. Order must have status SENT to be canceled.")
-
-    orderAge = datetime.utcnow() - datetime.strptime(order['orderTime'], '%Y-%m-%dT%H:%M:%SZ')
-    if orderAge.seconds > 600:
-      raise OrderStatusError(f"Order {orderId} has been created  {str(round(orderAge.seconds/60, 2))} minutes ago. Order must not be older than 10 minutes to be canceled.")
-    
+    # The status and age checks are part of the update, so the cancel takes a single
+    # round trip and can't race with another writer changing the status
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=MAX_CANCEL_AGE_SECONDS)
     logger.info('Updating order with new status CANCELED')
-    table = dynamodb.Table(ordersTable)
-    response = table.update_item(
-      Key={'userId': userId, 'orderId': orderId},
-      UpdateExpression="set #d.#s=:s",
-      ExpressionAttributeNames={
-        '#d': 'data',
-        '#s': 'status'
-      },
-      ExpressionAttributeValues={
-        ':s': 'CANCELED'
-      },
-      ReturnValues="ALL_NEW"
-    )
-    logger.info(json.dumps(response))
+    table = get_table(ordersTable)
+    try:
+      response = table.update_item(
+        Key={'userId': userId, 'orderId': orderId},
+        # statusVersion lets status readers tell that the status changed
+        UpdateExpression="set #d.#s=:s add #v :one",
+        # orders created before the epoch orderTime attribute existed only have the
+        # ISO timestamp in data, which compares correctly as a string
+        ConditionExpression="#d.#s = :sent AND (#t >= :cutoff OR (attribute_not_exists(#t) AND #d.#t >= :cutoffIso))",
+        ExpressionAttributeNames={
+          '#d': 'data',
+          '#s': 'status',
+          '#t': 'orderTime',
+          '#v': 'statusVersion'
+        },
+        ExpressionAttributeValues={
+          ':s': 'CANCELED',
+          ':one': 1,
+          ':sent': 'SENT',
+          ':cutoff': int(cutoff.replace(tzinfo=timezone.utc).timestamp()),
+          ':cutoffIso': cutoff.strftime('%Y-%m-%dT%H:%M:%SZ')
+        },
+        ReturnValues="ALL_NEW"
+      )
+    except get_client('dynamodb').exceptions.ConditionalCheckFailedException:
+      raise cancel_error(userId, orderId, now)
+    logger.info(dumps(response))
+    cache_order(userId, orderId, response['Attributes']['data'])
     metrics.add_metric(name="OrderCanceled", unit=MetricUnit.Count, value=1)
 
     return response['Attributes']['data']
 
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
+    reset_order_cache()
     try:
         updated = cancel_order(event, context)
-        response = {
-            "statusCode": 200,
-            "headers": {},
-            "body": json.dumps(updated)
-        }
-        return response
-    except OrderStatusError as oe:
+        return json_response(200, updated)
+    except (OrderStatusError, OrderNotFoundError) as oe:
       logger.exception(oe)
-      return {
-        "statusCode": oe.status_code,
-        "body": str(oe)
-      }
+      return text_response(oe.status_code, str(oe))
     except Exception as err:
         logger.exception(err)
         raise
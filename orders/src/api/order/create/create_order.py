@@ -1,15 +1,17 @@
 import os
-import boto3
-from decimal import Decimal
 import json
-import uuid
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from aws_lambda_powertools import Logger, Metrics
 from aws_lambda_powertools.metrics import MetricUnit
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from aws_lambda_powertools.utilities.idempotency import (
     IdempotencyConfig, DynamoDBPersistenceLayer, idempotent_function
 )
+from utils import to_decimal, OrderExistsError
+from order_summary import IN_SUMMARY
+from response import dumps, json_response, text_response
+from aws_clients import BOTO_CONFIG, get_client, get_table
 
 # Globals
 logger = Logger()
@@ -17,13 +19,20 @@ metrics = Metrics()
 
 orders_table = os.getenv('TABLE_NAME')
 idempotency_table = os.getenv('IDEMPOTENCY_TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
 
-persistence_layer = DynamoDBPersistenceLayer(table_name=idempotency_table)
-idempotency_config = IdempotencyConfig(event_key_jmespath="powertools_json(body).orderId")
+# ids starting with this are reserved for items that aren't orders
+RESERVED_ID_PREFIX = '#'
 
-@idempotent_function(data_keyword_argument="event", config=idempotency_config, persistence_store=persistence_layer)
-def add_order(event: dict):
+# 'orders' keeps the response of a create on the order item, a retried request is answered
+# from it after the conditional put fails. 'powertools' uses the powertools idempotency
+# utility and its IDEMPOTENCY_TABLE_NAME table, which costs two more writes per order.
+IDEMPOTENCY_STORE = os.getenv('IDEMPOTENCY_STORE', 'orders')
+# how long a retried request gets the stored response, like the powertools expires_after_seconds
+IDEMPOTENCY_EXPIRES_AFTER_SECONDS = int(os.getenv('IDEMPOTENCY_EXPIRES_AFTER_SECONDS', '3600'))
+
+
+def new_order(event: dict):
+    """Builds the Orders table item of a create request and the response to return"""
     logger.info("Adding a new order")
     detail = json.loads(event['body'])
     logger.info({"operation": "add_order", "order_details": detail})
@@ -31,9 +40,12 @@ def add_order(event: dict):
     total_amount = detail['totalAmount']
     order_items = detail['orderItems']
     user_id = event['requestContext']['authorizer']['claims']['sub']
-    order_time = datetime.strftime(datetime.utcnow(), '%Y-%m-%dT%H:%M:%SZ')
+    now = datetime.utcnow()
+    order_time = datetime.strftime(now, '%Y-%m-%dT%H:%M:%SZ')
 
     order_id = detail['orderId']
+    if not isinstance(order_id, str) or not order_id or order_id.startswith(RESERVED_ID_PREFIX):
+        raise ValueError(f"Invalid orderId: {order_id}")
 
     logger.info(
         f"Saving order {order_id} for user {user_id} at restaurant {restaurant_id}. Total {total_amount} with {len(order_items)} order items")
@@ -41,6 +53,10 @@ def add_order(event: dict):
     ddb_item = {
         'orderId': order_id,
         'userId': user_id,
+        # epoch seconds, lets conditions and indexes compare order times numerically
+        'orderTime': int(now.replace(tzinfo=timezone.utc).timestamp()),
+        # counted in the order summary of the user from its creation
+        IN_SUMMARY: True,
         'data': {
             'orderId': order_id,
             'userId': user_id,
@@ -51,35 +67,83 @@ def add_order(event: dict):
             'orderTime': order_time,
         }
     }
-    ddb_item = json.loads(json.dumps(ddb_item), parse_float=Decimal)
 
-    table = dynamodb.Table(orders_table)
+    detail['orderId'] = order_id
+    detail['status'] = 'PLACED'
+
+    return to_decimal(ddb_item), detail
+
+
+def put_order(ddb_item):
+    table = get_table(orders_table)
     # We must use conditional expression, otherwise put_item will always replace the original order and will never fail
     table.put_item(Item=ddb_item, ConditionExpression='attribute_not_exists(orderId) AND attribute_not_exists(userId)')
 
+    total_amount = ddb_item['data']['totalAmount']
     metrics.add_metric(name="SuccessfulOrder", unit=MetricUnit.Count, value=1)      #SuccessfulOrder
     metrics.add_metric(name="OrderTotal", unit=MetricUnit.Count, value=total_amount) #OrderTotal
-    logger.info(f"new Order with ID {order_id} saved")
+    logger.info(f"new Order with ID {ddb_item['orderId']} saved")
 
-    detail['orderId'] = order_id
-    detail['status'] = 'PLACED'
 
+def stored_response(user_id, order_id):
+    """Returns the response saved with an order that already exists, only read when the
+    conditional put of a retried request fails"""
+    item = get_table(orders_table).get_item(
+        Key={'userId': user_id, 'orderId': order_id},
+        ProjectionExpression='#r, #t',
+        ExpressionAttributeNames={'#r': 'createResponse', '#t': 'orderTime'},
+        ConsistentRead=True
+    ).get('Item') or {}
+    if 'createResponse' not in item or time.time() - int(item['orderTime']) > IDEMPOTENCY_EXPIRES_AFTER_SECONDS:
+        raise OrderExistsError(f"Order {order_id} already exists for user {user_id}")
+    logger.info(f"Order {order_id} was already created, returning the stored response")
+    return json.loads(item['createResponse'])
+
+
+def add_order(event: dict):
+    """Creates an order with a single conditional put. The response is stored on the
+    order item, so a retry of the request gets the same response without writing again."""
+    ddb_item, detail = new_order(event)
+    ddb_item['createResponse'] = dumps(detail)
+    try:
+        put_order(ddb_item)
+    except get_client('dynamodb').exceptions.ConditionalCheckFailedException:
+        return stored_response(ddb_item['userId'], ddb_item['orderId'])
+    return detail
+
+
+def add_order_once(event: dict):
+    ddb_item, detail = new_order(event)
+    put_order(ddb_item)
     return detail
 
 
+if IDEMPOTENCY_STORE == 'powertools':
+    persistence_layer = DynamoDBPersistenceLayer(table_name=idempotency_table, boto_config=BOTO_CONFIG)
+    idempotency_config = IdempotencyConfig(
+        event_key_jmespath="powertools_json(body).orderId",
+        expires_after_seconds=IDEMPOTENCY_EXPIRES_AFTER_SECONDS
+    )
+    add_order = idempotent_function(
+        data_keyword_argument="event", config=idempotency_config, persistence_store=persistence_layer
+    )(add_order_once)
+
+
 @metrics.log_metrics
 @logger.inject_lambda_context
 def lambda_handler(event, context: LambdaContext):
-    idempotency_config.register_lambda_context(context)
     """Handles the lambda method invocation"""
+    if IDEMPOTENCY_STORE == 'powertools':
+        idempotency_config.register_lambda_context(context)
     try:
         order_detail = add_order(event=event)
-        response = {
-            "statusCode": 200,
-            "headers": {},
-            "body": json.dumps(order_detail)
-        }
-        return response
+        return json_response(200, order_detail)
+    except ValueError as ve:
+        logger.info(str(ve))
+        return text_response(400, str(ve))
+    except OrderExistsError as oe:
+        logger.info(str(oe))
+        return text_response(oe.status_code, str(oe))
     except Exception as err:
         logger.exception(err)
         raise
@@ -1,16 +1,15 @@
-import simplejson as json
+import json
 import os
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
 from aws_lambda_powertools import Logger, Tracer
 from decimal import Decimal
-from utils import get_order
+from utils import get_order, cache_order, reset_order_cache, OrderNotFoundError, OrderStatusError
+from response import json_response, text_response
+from aws_clients import get_client, get_table
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 ordersTable = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
 
 def edit_order(event, context):
     userId = event['requestContext']['authorizer']['claims']['sub']
@@ -20,38 +19,43 @@ def edit_order(event, context):
     newData['userId'] = userId
     newData['orderId'] = orderId
 
+    # the edit replaces the order data but keeps its status and orderTime. orderTime never
+    # changes, so a cached order is good enough, and the status is checked by the write.
     order = get_order(userId, orderId)
-    logger.info(f"Current order status for order {orderId} is {order['status']}")
-    if order['status'] != 'SENT':
-      raise Exception(f"Order {orderId} with status {order['status']} cannot be canceled. Order must have status SENT to be canceled.")
-
-    newData['status'] = order['status']
+    newData['status'] = 'SENT'
     newData['orderTime'] = order['orderTime']
-    ddb_item = {
-                'orderId': orderId,
-                'userId': userId,
-                'data': newData
-            }
-    ddb_item = json.loads(json.dumps(ddb_item), parse_float=Decimal)
-
-    table = dynamodb.Table(ordersTable)
-    response = table.put_item(Item=ddb_item)
 
-    logger.info(f"Put item response:")
-    logger.info(response)
-
-    return get_order(userId, orderId)
+    # Replace the data in a single conditional write, the status check happens in DynamoDB
+    # so it can't race with another writer changing the status
+    table = get_table(ordersTable)
+    try:
+      table.update_item(
+        Key={'userId': userId, 'orderId': orderId},
+        UpdateExpression='SET #d = :data',
+        ConditionExpression='attribute_exists(orderId) AND #d.#s = :sent',
+        ExpressionAttributeNames={'#d': 'data', '#s': 'status'},
+        ExpressionAttributeValues={':data': newData, ':sent': 'SENT'}
+      )
+    except get_client('dynamodb').exceptions.ConditionalCheckFailedException:
+      # only the failure path reads the order again, to tell a missing order from a wrong status
+      order = get_order(userId, orderId, use_cache=False)
+      raise OrderStatusError(f"Order {orderId} with status {order['status']} cannot be edited. Order must have status SENT to be edited.")
+
+    logger.info(f"Order {orderId} updated")
+    # the written data is the current order, no need to read it back
+    cache_order(userId, orderId, newData)
+
+    return newData
 
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
+    reset_order_cache()
     try:
         updated = edit_order(event, context)
-        response = {
-            "statusCode": 200,
-            "headers": {},
-            "body": json.dumps(updated)
-        }
-        return response
+        return json_response(200, updated)
+    except (OrderStatusError, OrderNotFoundError) as oe:
+        logger.exception(oe)
+        return text_response(oe.status_code, str(oe))
     except Exception as err:
         logger.exception(err)
         raise
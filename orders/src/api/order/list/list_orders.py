@@ -1,47 +1,166 @@
-import simplejson as json
 import os
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from aws_lambda_powertools import Logger, Tracer
+from datetime import datetime, timezone
+from pagination import encode_next_token, decode_next_token, parse_page_size
+from response import json_response, text_response
+from aws_clients import get_table
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 ordersTable = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
+# GSI with userId as partition key and the epoch orderTime as sort key
+ordersByTimeIndex = os.getenv('ORDERS_BY_TIME_INDEX', 'userOrderTimeIndex')
 
-@tracer.capture_method 
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', '20'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '100'))
+# Orders written before the top level orderTime attribute existed are not in the index.
+# Until they are backfilled (see order/backfill), listings end with a query of the base
+# table for them. Set to false once the backfill is complete.
+LEGACY_ORDERS_FALLBACK = os.getenv('LEGACY_ORDERS_FALLBACK', 'true').lower() == 'true'
+
+
+def parse_order_time(value):
+    """Converts an ISO 8601 date or timestamp query parameter to epoch seconds"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        epoch = int(parsed.timestamp())
+        # the legacy orders are compared with their ISO orderTime
+        iso_order_time(epoch)
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f'Invalid date: {value}')
+    return epoch
+
+
+def parse_time_range(params):
+    """Epoch seconds of the from and to query parameters, None when absent"""
+    time_from = parse_order_time(params['from']) if params.get('from') else None
+    time_to = parse_order_time(params['to']) if params.get('to') else None
+    if time_from is not None and time_to is not None and time_from > time_to:
+        raise ValueError(f"Invalid date range: from {params['from']} is after to {params['to']}")
+    return time_from, time_to
+
+
+def iso_order_time(epoch):
+    """Epoch seconds as the ISO timestamp kept in data.orderTime"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def query_indexed_orders(table, user_id, params, time_range, limit, start_key):
+    """Queries a page of the orders in the index, newest first"""
+    # the date range is part of the key condition, so only matching orders are read
+    time_from, time_to = time_range
+    key_condition = Key('userId').eq(user_id)
+    if time_from is not None and time_to is not None:
+        key_condition = key_condition & Key('orderTime').between(time_from, time_to)
+    elif time_from is not None:
+        key_condition = key_condition & Key('orderTime').gte(time_from)
+    elif time_to is not None:
+        key_condition = key_condition & Key('orderTime').lte(time_to)
+
+    query_kwargs = {
+        'IndexName': ordersByTimeIndex,
+        'KeyConditionExpression': key_condition,
+        # newest orders first
+        'ScanIndexForward': False,
+        'Limit': limit,
+        'ProjectionExpression': '#d',
+        'ExpressionAttributeNames': {'#d': 'data'},
+    }
+    if params.get('status'):
+        # the status changes over the life of an order, so it is filtered rather than indexed
+        query_kwargs['FilterExpression'] = Attr('data.status').eq(params['status'])
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+    return table.query(**query_kwargs)
+
+
+def query_legacy_orders(table, user_id, params, time_range, limit, start_key):
+    """Queries a page of the orders without a top level orderTime in the base table. The
+    whole partition is read and filtered, in order id order."""
+    # summaries and other non order items of the partition have no data
+    time_from, time_to = time_range
+    filter_expression = Attr('orderTime').not_exists() & Attr('data.orderTime').exists()
+    if time_from is not None:
+        filter_expression = filter_expression & Attr('data.orderTime').gte(iso_order_time(time_from))
+    if time_to is not None:
+        filter_expression = filter_expression & Attr('data.orderTime').lte(iso_order_time(time_to))
+    if params.get('status'):
+        filter_expression = filter_expression & Attr('data.status').eq(params['status'])
+
+    query_kwargs = {
+        'KeyConditionExpression': Key('userId').eq(user_id),
+        'FilterExpression': filter_expression,
+        'Limit': limit,
+        'ProjectionExpression': '#d',
+        'ExpressionAttributeNames': {'#d': 'data'},
+    }
+    if start_key:
+        query_kwargs['ExclusiveStartKey'] = start_key
+    return table.query(**query_kwargs)
+
+
+@tracer.capture_method
 def list_orders(event, context):
 
     user_id = event['requestContext']['authorizer']['claims']['sub']
+    params = event.get('queryStringParameters') or {}
     logger.info(f"Retrieving orders for user %s", user_id)
+    limit = parse_page_size(params.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    time_range = parse_time_range(params)
 
-    table = dynamodb.Table(ordersTable)
-    response = table.query(
-        KeyConditionExpression=Key('userId').eq(user_id)
-    )
+    start_key = None
+    # tokens of the legacy orders pages are marked, the others are index keys
+    legacy = False
+    if params.get('nextToken'):
+        start_key = decode_next_token(params['nextToken'])
+        if start_key.get('userId') != user_id:
+            raise ValueError('Invalid nextToken')
+        legacy = start_key.pop('legacy', False)
 
+    table = get_table(ordersTable)
     userOrders = []
-    for item in response['Items']:
-      userOrders.append(item['data'])
+    next_key = None
+    if not legacy:
+        response = query_indexed_orders(table, user_id, params, time_range, limit, start_key)
+        userOrders.extend(item['data'] for item in response['Items'])
+        next_key = response.get('LastEvaluatedKey')
+        start_key = None
+        if next_key is None and LEGACY_ORDERS_FALLBACK:
+            if len(userOrders) < limit:
+                legacy = True
+            else:
+                # the legacy orders start on the next page
+                next_key = {'userId': user_id, 'legacy': True}
+
+    if legacy:
+        # a token without an order id starts the legacy orders from the beginning
+        if start_key is not None and 'orderId' not in start_key:
+            start_key = None
+        response = query_legacy_orders(table, user_id, params, time_range, limit - len(userOrders), start_key)
+        userOrders.extend(item['data'] for item in response['Items'])
+        if response.get('LastEvaluatedKey'):
+            next_key = {**response['LastEvaluatedKey'], 'legacy': True}
 
-    logger.info(userOrders)
     logger.info(f"Found {len(userOrders)} order(s) for user.")
-    return userOrders
+    page = {"orders": userOrders}
+    next_token = encode_next_token(next_key)
+    if next_token:
+        page["nextToken"] = next_token
+    return page
 
 
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     try:
-        orders = list_orders(event, context)
-        response = {
-            "statusCode": 200,
-            "headers": {},
-            "body": json.dumps({
-                "orders": orders
-            })
-        }
-        return response
+        page = list_orders(event, context)
+        return json_response(200, page)
+    except ValueError as ve:
+        logger.exception(ve)
+        return text_response(400, str(ve))
     except Exception as err:
         logger.exception(err)
         raise
@@ -0,0 +1,97 @@
+import os
+from aws_lambda_powertools import Logger, Tracer, Metrics
+from aws_lambda_powertools.metrics import MetricUnit
+from dynamodb_client import deserialize, deserialize_item
+from put_events import put_events
+from response import dumps
+from utils import image_status
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+metrics = Metrics()
+event_bus_name = os.getenv('EVENT_BUS_NAME', 'default')
+event_source = os.getenv('EVENT_SOURCE', 'orders')
+
+STATUS_CHANGED = 'order.status_changed'
+
+
+def changed_fields(old_data, new_data):
+    """Names of the order data fields a write added, changed or removed"""
+    return sorted(
+        name for name in old_data.keys() | new_data.keys()
+        if old_data.get(name) != new_data.get(name)
+    )
+
+
+def status_change(record):
+    """Returns the detail of the order.status_changed event of a stream record, or None
+    when the write left the status as it was (edits, deletes, items that aren't orders...)"""
+    if record['eventName'] not in ('INSERT', 'MODIFY'):
+        return None
+    images = record['dynamodb']
+    new_image = images.get('NewImage') or {}
+    old_image = images.get('OldImage') or {}
+    # compared in DynamoDB JSON, most writes are filtered out without deserializing them
+    status = image_status(new_image)
+    previous_status = image_status(old_image)
+    if status is None or status == previous_status:
+        return None
+
+    new_data = deserialize(new_image['data'])
+    old_data = deserialize(old_image['data']) if 'data' in old_image else {}
+    keys = deserialize_item(images['Keys'])
+    return {
+        'orderId': keys['orderId'],
+        'userId': keys['userId'],
+        'status': status,
+        'previousStatus': previous_status,
+        'statusVersion': deserialize(new_image['statusVersion']) if 'statusVersion' in new_image else 0,
+        'changedFields': changed_fields(old_data, new_data),
+        'restaurantId': new_data.get('restaurantId'),
+        'totalAmount': new_data.get('totalAmount'),
+    }
+
+
+@tracer.capture_method
+def process_records(records):
+    """Publishes the status changes of a batch of stream records and returns the
+    failures to report, so Lambda retries the batch from the first record whose event
+    couldn't be published (ReportBatchItemFailures)"""
+    entries = []
+    sequence_numbers = []
+    for record in records:
+        detail = status_change(record)
+        if detail is None:
+            continue
+        entries.append({
+            'EventBusName': event_bus_name,
+            'Source': event_source,
+            'DetailType': STATUS_CHANGED,
+            'Detail': dumps(detail),
+        })
+        sequence_numbers.append(record['dynamodb']['SequenceNumber'])
+
+    failed = put_events(entries)
+    logger.info(
+        "Published %s order status change(s) of %s record(s), %s failed",
+        len(entries) - len(failed), len(records), len(failed))
+    metrics.add_metric(name="OrderStatusChangesPublished", unit=MetricUnit.Count, value=len(entries) - len(failed))
+    if not failed:
+        return {'batchItemFailures': []}
+
+    # records of a shard must stay in order, everything from the first failure is retried
+    failed_ids = {id(entry) for entry in failed}
+    first_failed = next(i for i, entry in enumerate(entries) if id(entry) in failed_ids)
+    return {'batchItemFailures': [{'itemIdentifier': sequence_numbers[first_failed]}]}
+
+
+@metrics.log_metrics
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    """Entrypoint for Lambda, consumes the Orders table stream (NEW_AND_OLD_IMAGES)"""
+    try:
+        return process_records(event['Records'])
+    except Exception as err:
+        logger.exception(err)
+        raise
@@ -0,0 +1,100 @@
+import os
+from aws_lambda_powertools import Logger, Tracer
+from dynamodb_client import deserialize
+from order_summary import (
+    IN_SUMMARY, ORDER_COUNT, TOTAL_SPEND, add_to_order_summary, status_count
+)
+from utils import image_status
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+orders_table = os.getenv('TABLE_NAME')
+
+# canceled orders don't count in the total spend of a user
+UNPAID_STATUSES = ('CANCELED',)
+
+
+def paid_amount(image, status):
+    """Amount an order image adds to the total spend of its user"""
+    if status is None or status in UNPAID_STATUSES:
+        return 0
+    return deserialize(image['data']['M'].get('totalAmount', {'N': '0'}))
+
+
+def counted_status(image):
+    """Status an order image is counted under in the summary of its user, None when the
+    image isn't counted: a deleted order, or one not flagged by create_order or the backfill"""
+    if IN_SUMMARY not in image:
+        return None
+    return image_status(image)
+
+
+def summary_deltas(record):
+    """Changes a stream record makes to the summary of its user, or None when it doesn't
+    create or delete an order, nor change the status or paid amount of one"""
+    images = record['dynamodb']
+    new_image = images.get('NewImage') or {}
+    old_image = images.get('OldImage') or {}
+    status = counted_status(new_image)
+    previous_status = counted_status(old_image)
+    # edits can change the amount of an order without changing its status
+    spend = paid_amount(new_image, status) - paid_amount(old_image, previous_status)
+    if status == previous_status and not spend:
+        return None
+
+    deltas = {TOTAL_SPEND: spend}
+    if status != previous_status:
+        if previous_status is None:
+            deltas[ORDER_COUNT] = 1
+        else:
+            deltas[status_count(previous_status)] = -1
+        if status is None:
+            deltas[ORDER_COUNT] = -1
+        else:
+            deltas[status_count(status)] = 1
+    return deltas
+
+
+def user_changes(records):
+    """Groups the summary changes of a batch by user, keeping the stream order. Returns,
+    by user, the sequence number of the user's first record and the (eventID, deltas)
+    changes."""
+    changes = {}
+    for record in records:
+        deltas = summary_deltas(record)
+        if deltas is None:
+            continue
+        user_id = record['dynamodb']['Keys']['userId']['S']
+        if user_id not in changes:
+            changes[user_id] = (record['dynamodb']['SequenceNumber'], [])
+        changes[user_id][1].append((record['eventID'], deltas))
+    return changes
+
+
+@tracer.capture_method
+def process_records(records):
+    """Applies a batch of stream records to the order summaries with one transaction per
+    user and returns the failures to report (ReportBatchItemFailures). Lambda retries from
+    the earliest record of a failed user, the records applied since are skipped."""
+    failed_sequence_numbers = []
+    for user_id, (first_sequence_number, changes) in user_changes(records).items():
+        try:
+            add_to_order_summary(orders_table, user_id, changes)
+        except Exception as err:
+            logger.exception(f"Failed to update the order summary of user {user_id}: {err}")
+            failed_sequence_numbers.append(first_sequence_number)
+
+    if not failed_sequence_numbers:
+        return {'batchItemFailures': []}
+    return {'batchItemFailures': [{'itemIdentifier': min(failed_sequence_numbers, key=int)}]}
+
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    """Entrypoint for Lambda, consumes the Orders table stream (NEW_AND_OLD_IMAGES)"""
+    try:
+        return process_records(event['Records'])
+    except Exception as err:
+        logger.exception(err)
+        raise
@@ -1,6 +1,27 @@
-import json
+import os
+from router import Router
+from response import json_response, text_response
+from order_summary import InconsistentSummaryError, get_order_count, get_order_summary
 
-# import requests
+# Orders table, the per-user order summaries are kept in it
+ORDERS_TABLE = os.getenv('ORDERS_TABLE', None)
+
+# *** Routes served by the users function
+router = Router()
+
+
+# Number of orders of a user, a single read of the user's order summary
+@router.route('GET', '/users/count/{userid}')
+def get_order_count_route(event, context):
+    user_id = event['pathParameters']['userid']
+    return 200, {'userId': user_id, 'orderCount': get_order_count(ORDERS_TABLE, user_id)}
+
+
+# Order count, total spend and order counts by status of a user
+@router.route('GET', '/users/{userid}/orders/summary')
+def get_order_summary_route(event, context):
+    user_id = event['pathParameters']['userid']
+    return 200, {'userId': user_id, **get_order_summary(ORDERS_TABLE, user_id)}
 
 
 def lambda_handler(event, context):
@@ -24,19 +45,23 @@ def lambda_handler(event, context):
 
         Return doc: https://docs.aws.amazon.com/apigateway/latest/developerguide/set-up-lambda-proxy-integrations.html
     """
+    handler = router.resolve(event)
+    if handler is not None:
+        if not (event.get('pathParameters') or {}).get('userid'):
+            return text_response(400, 'Invalid request')
+        try:
+            status_code, response_body = handler(event, context)
+            return json_response(status_code, response_body)
+        except InconsistentSummaryError as err:
+            # e.g. a user who ordered before the summaries were kept, until the backfill ran
+            print(f'Not reporting the order summary: {err}')
+            return text_response(503, 'Order summary not available')
+        except Exception as err:
+            # e.g. DynamoDB throttling, answered instead of failing the invocation
+            print(f'Failed to read the order summary: {err!r}')
+            return text_response(500, 'Internal server error')
 
-    # try:
-    #     ip = requests.get("http://checkip.amazonaws.com/")
-    # except requests.RequestException as e:
-    #     # Send some context about this error to Lambda Logs
-    #     print(e)
-
-    #     raise e
-
-    return {
-        "statusCode": 200,
-        "body": json.dumps({
-            "message": "hello world",
-            # "location": ip.text.replace("\n", "")
-        }),
-    }
+    # the other routes are still served by the sample response
+    return json_response(200, {
+        "message": "hello world",
+    })
@@ -1,31 +1,123 @@
 from aws_lambda_powertools import Logger, Tracer
-from boto3.dynamodb.conditions import Key
-import boto3
+import copy
 import os
+import time
+from decimal import Decimal
+from aws_clients import get_table
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 ordersTable = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
 
-@tracer.capture_method 
-def get_order(userId, orderId):
+# Seconds a cached order stays valid across invocations of the same container.
+# 0 keeps the cache for the current invocation only (see reset_order_cache).
+# Status changes written by other services (orderstatus) aren't seen by the cache, only
+# enable the TTL where this function is the only writer of the orders.
+ORDER_CACHE_TTL = float(os.getenv('ORDER_CACHE_TTL', '0'))
+order_cache = {}
 
-    logger.info(f"Retrieving orders for user %s", userId)
 
-    table = dynamodb.Table(ordersTable)
-    response = table.query(
-        KeyConditionExpression=(Key('userId').eq(userId) & Key('orderId').eq(orderId))
+class OrderStatusError(Exception):
+    status_code = 400
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class OrderNotFoundError(Exception):
+    status_code = 404
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class OrderExistsError(Exception):
+    status_code = 409
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+def to_decimal(value):
+    """Returns a copy of a JSON like structure with every float converted to Decimal, the
+    number type DynamoDB accepts. The structure is walked once, and floats are converted
+    through their shortest repr so 12.3 is stored as Decimal('12.3')"""
+    value_type = type(value)
+    if value_type is dict:
+        converted = {}
+        for key, item in value.items():
+            item_type = type(item)
+            # scalars are handled inline, only containers pay for a recursive call
+            if item_type is float:
+                converted[key] = Decimal(repr(item))
+            elif item_type is dict or item_type is list or item_type is tuple:
+                converted[key] = to_decimal(item)
+            else:
+                converted[key] = item
+        return converted
+    if value_type is list or value_type is tuple:
+        converted = []
+        append = converted.append
+        for item in value:
+            item_type = type(item)
+            if item_type is float:
+                append(Decimal(repr(item)))
+            elif item_type is dict or item_type is list or item_type is tuple:
+                append(to_decimal(item))
+            else:
+                append(item)
+        return converted
+    if value_type is float:
+        return Decimal(repr(value))
+    return value
+
+
+def image_status(image):
+    """Status of an order in a DynamoDB stream image, still in DynamoDB JSON, or None
+    for items that aren't orders"""
+    try:
+        return image['data']['M']['status']['S']
+    except (KeyError, TypeError):
+        return None
+
+
+def reset_order_cache():
+    """Called at the start of an invocation, drops the orders cached by the previous one
+    unless cross-invocation caching is enabled with ORDER_CACHE_TTL"""
+    if ORDER_CACHE_TTL <= 0:
+        order_cache.clear()
+
+
+def cache_order(userId, orderId, order):
+    """Stores the latest known version of an order, e.g. right after writing it"""
+    order_cache[(userId, orderId)] = (time.monotonic(), copy.deepcopy(order))
+
+
+@tracer.capture_method
+def get_order(userId, orderId, use_cache=True):
+
+    if use_cache:
+        cached = order_cache.get((userId, orderId))
+        if cached is not None and (ORDER_CACHE_TTL <= 0 or time.monotonic() - cached[0] < ORDER_CACHE_TTL):
+            logger.info(f"Order {orderId} for user {userId} served from cache")
+            # a copy, callers may change the order they get
+            return copy.deepcopy(cached[1])
+
+    logger.info(f"Retrieving order {orderId} for user %s", userId)
+
+    table = get_table(ordersTable)
+    response = table.get_item(
+        Key={'userId': userId, 'orderId': orderId},
+        ProjectionExpression='#d',
+        ExpressionAttributeNames={'#d': 'data'}
     )
-    
-    userOrders = []
-    for item in response['Items']:
-      userOrders.append(item['data'])
 
-    logger.info(userOrders)
-    logger.info(f"Found {len(userOrders)} order(s) for user.")
+    # items without order data, e.g. written by another service, are not orders
+    if 'data' not in response.get('Item', {}):
+        raise OrderNotFoundError(f"Order {orderId} was not found for user {userId}")
 
-    #TODO: add error handling logic
-      
-    return userOrders[0]
\ No newline at end of file
+    order = response['Item']['data']
+    logger.info(order)
+    cache_order(userId, orderId, order)
+    return order
@@ -0,0 +1,59 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Compares the float to Decimal conversion of order items before they are written, run with
+#   python -m pytest tests/benchmark --benchmark-only --benchmark-group-by=param:item_count
+
+import json
+import sys
+from decimal import Decimal
+
+import pytest
+
+
+def make_order(item_count):
+    return {
+        'orderId': 'order-1',
+        'userId': 'user-1',
+        'orderTime': 978307200,
+        'data': {
+            'orderId': 'order-1',
+            'userId': 'user-1',
+            'restaurantId': 'restaurant-1',
+            'totalAmount': round(item_count * 12.5, 2),
+            'orderItems': [
+                {'id': i, 'name': f'Item {i}', 'price': 12.5 + i / 100, 'quantity': 1 + i % 3}
+                for i in range(item_count)
+            ],
+            'status': 'PLACED',
+            'orderTime': '2001-01-01T00:00:00Z',
+        }
+    }
+
+
+@pytest.fixture
+def to_decimal():
+    # utils reads TABLE_NAME when it is loaded: when the benchmark is the first to load it,
+    # it is dropped afterwards so the tests that run later load it under their environment
+    loaded = 'utils' in sys.modules
+    import utils
+    yield utils.to_decimal
+    if not loaded:
+        sys.modules.pop('utils', None)
+
+
+def json_round_trip(item):
+    # the conversion create_order used before to_decimal
+    return json.loads(json.dumps(item), parse_float=Decimal)
+
+
+@pytest.mark.parametrize('item_count', [10, 200, 1000])
+def test_json_round_trip(benchmark, to_decimal, item_count):
+    order = make_order(item_count)
+    assert benchmark(json_round_trip, order) == to_decimal(order)
+
+
+@pytest.mark.parametrize('item_count', [10, 200, 1000])
+def test_to_decimal(benchmark, to_decimal, item_count):
+    order = make_order(item_count)
+    assert benchmark(to_decimal, order) == json_round_trip(order)
@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Compares create_order with the idempotency record on the order item ('orders') and in the
+# powertools idempotency table ('powertools'), against moto tables, run with
+#   python -m pytest tests/benchmark --benchmark-only --benchmark-group-by=func
+# moto answers in process, so the timings leave out the network latency of each extra
+# request; the DynamoDB requests per call are recorded in the benchmark's extra_info.
+
+import importlib
+import itertools
+import json
+import sys
+
+import boto3
+import botocore.client
+import pytest
+from moto import mock_dynamodb
+
+ORDERS_TABLE_NAME = 'Orders'
+IDEMPOTENCY_TABLE_NAME = 'Idempotency'
+USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+CREATE_ORDER_MODULE = 'src.api.order.create.create_order'
+
+
+class MockContext:
+    function_name = 'CreateOrderFunction'
+    memory_limit_in_mb = 128
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:CreateOrderFunction'
+    aws_request_id = 'c6af9ac6-7b61-11e6-9a41-93e8deadbeef'
+
+    def get_remaining_time_in_millis(self):
+        return 10000
+
+
+def create_order_event(order_id):
+    return {
+        'resource': '/orders',
+        'httpMethod': 'POST',
+        'requestContext': {'authorizer': {'claims': {'sub': USER_ID}}},
+        'body': json.dumps({
+            'orderId': order_id,
+            'restaurantId': 1,
+            'totalAmount': 32.5,
+            'orderItems': [{'id': 1, 'name': 'Spaghetti', 'price': 32.5, 'quantity': 1}]
+        }),
+    }
+
+
+@pytest.fixture(params=['orders', 'powertools'])
+def create_order(request, monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('TABLE_NAME', ORDERS_TABLE_NAME)
+    monkeypatch.setenv('IDEMPOTENCY_TABLE_NAME', IDEMPOTENCY_TABLE_NAME)
+    monkeypatch.setenv('IDEMPOTENCY_STORE', request.param)
+    monkeypatch.setenv('POWERTOOLS_TRACE_DISABLED', 'true')
+    monkeypatch.setenv('POWERTOOLS_METRICS_NAMESPACE', 'ServerlessWorkshop')
+    monkeypatch.setenv('POWERTOOLS_LOG_LEVEL', 'WARNING')
+    with mock_dynamodb():
+        dynamodb = boto3.resource('dynamodb')
+        dynamodb.create_table(
+            TableName=ORDERS_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderId', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'orderId', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.create_table(
+            TableName=IDEMPOTENCY_TABLE_NAME,
+            KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        # the idempotency store is chosen when the module is loaded
+        create_order = importlib.reload(importlib.import_module(CREATE_ORDER_MODULE))
+        try:
+            yield create_order
+        finally:
+            forget_module(CREATE_ORDER_MODULE)
+
+
+def forget_module(name):
+    """Drops a module loaded for a benchmark's environment, so tests that run later
+    import it again under their own environment"""
+    sys.modules.pop(name, None)
+    package, _, module = name.rpartition('.')
+    if package in sys.modules and hasattr(sys.modules[package], module):
+        delattr(sys.modules[package], module)
+
+
+def count_requests(benchmark, monkeypatch, call):
+    operations = []
+    make_api_call = botocore.client.BaseClient._make_api_call
+
+    def recording(client, operation_name, api_params):
+        operations.append(operation_name)
+        return make_api_call(client, operation_name, api_params)
+
+    monkeypatch.setattr(botocore.client.BaseClient, '_make_api_call', recording)
+    call()
+    monkeypatch.setattr(botocore.client.BaseClient, '_make_api_call', make_api_call)
+    benchmark.extra_info['dynamodb_requests'] = operations
+
+
+def test_new_order(benchmark, monkeypatch, create_order):
+    order_ids = (f'order-{i}' for i in itertools.count())
+    context = MockContext()
+
+    def create():
+        return create_order.lambda_handler(create_order_event(next(order_ids)), context)
+
+    count_requests(benchmark, monkeypatch, create)
+    assert benchmark(create)['statusCode'] == 200
+
+
+def test_retried_order(benchmark, monkeypatch, create_order):
+    context = MockContext()
+    event = create_order_event('order-retried')
+    create_order.lambda_handler(event, context)
+
+    def retry():
+        return create_order.lambda_handler(event, context)
+
+    count_requests(benchmark, monkeypatch, retry)
+    assert benchmark(retry)['statusCode'] == 200
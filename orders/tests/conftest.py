@@ -0,0 +1,13 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import sys
+
+# Lambda layers are importable at the top level inside Lambda
+ORDERS_ROOT = os.path.join(os.path.dirname(__file__), '..')
+for layer_path in [
+    os.path.join(ORDERS_ROOT, 'src', 'layers', 'utils'),
+    os.path.join(ORDERS_ROOT, '..', 'shared'),
+]:
+    sys.path.insert(0, os.path.abspath(layer_path))
@@ -0,0 +1,140 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import boto3
+import botocore.client
+import pytest
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+ORDERS_MOCK_TABLE_NAME = 'Orders'
+MOCK_USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+OTHER_USER_ID = '6d4b9b7e-2ea8-4ff4-9b3c-2a7c8d4f0a11'
+MOCK_ORDER_ID = '5d6c4bfa-ada8-4586-950e-33ffdebfb816'
+
+ENVIRONMENT = {
+    'TABLE_NAME': ORDERS_MOCK_TABLE_NAME,
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'POWERTOOLS_METRICS_NAMESPACE': 'ServerlessWorkshop'
+}
+
+
+class MockContext:
+    function_name = 'CreateOrderFunction'
+    memory_limit_in_mb = 128
+    invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:CreateOrderFunction'
+    aws_request_id = 'c6af9ac6-7b61-11e6-9a41-93e8deadbeef'
+
+    def get_remaining_time_in_millis(self):
+        return 10000
+
+
+def create_order_event(user_id=MOCK_USER_ID, order_id=MOCK_ORDER_ID):
+    with open('./events/event-list-orders.json', 'r') as f:
+        event = json.load(f)
+    event['requestContext']['authorizer']['claims']['sub'] = user_id
+    event['body'] = json.dumps({
+        'orderId': order_id,
+        'restaurantId': 1,
+        'totalAmount': 32.5,
+        'orderItems': [{'id': 1, 'name': 'Spaghetti', 'price': 32.5, 'quantity': 1}]
+    })
+    return event
+
+
+@contextmanager
+def setup_test_environment():
+    with mock_dynamodb():
+        table = boto3.resource('dynamodb').create_table(
+            TableName=ORDERS_MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderId', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'orderId', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        from src.api.order.create import create_order
+        yield create_order, table
+
+
+@contextmanager
+def count_requests():
+    """Records the operations of every boto3 client"""
+    operations = []
+    make_api_call = botocore.client.BaseClient._make_api_call
+
+    def recording(client, operation_name, api_params):
+        operations.append(operation_name)
+        return make_api_call(client, operation_name, api_params)
+
+    with patch.object(botocore.client.BaseClient, '_make_api_call', recording):
+        yield operations
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_create_order_is_a_single_write():
+    with setup_test_environment() as (create_order, table):
+        with count_requests() as operations:
+            response = create_order.lambda_handler(create_order_event(), MockContext())
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['status'] == 'PLACED'
+        assert operations == ['PutItem']
+        item = table.get_item(Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID})['Item']
+        assert json.loads(item['createResponse']) == json.loads(response['body'])
+        # counted in the order summary of the user from its creation
+        assert item['inSummary'] is True
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_retried_request_gets_the_stored_response():
+    with setup_test_environment() as (create_order, table):
+        first = create_order.lambda_handler(create_order_event(), MockContext())
+        # the restaurant picked the order up before the client retried
+        table.update_item(
+            Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID},
+            UpdateExpression='SET #d.#s = :s',
+            ExpressionAttributeNames={'#d': 'data', '#s': 'status'},
+            ExpressionAttributeValues={':s': 'SENT'}
+        )
+        with count_requests() as operations:
+            retried = create_order.lambda_handler(create_order_event(), MockContext())
+        assert retried['statusCode'] == 200
+        assert retried['body'] == first['body']
+        assert operations == ['PutItem', 'GetItem']
+        assert table.scan()['Count'] == 1
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_order_ids_are_scoped_to_the_user():
+    with setup_test_environment() as (create_order, table):
+        create_order.lambda_handler(create_order_event(), MockContext())
+        response = create_order.lambda_handler(create_order_event(user_id=OTHER_USER_ID), MockContext())
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['orderId'] == MOCK_ORDER_ID
+        assert table.scan()['Count'] == 2
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_expired_retry_is_a_conflict():
+    with setup_test_environment() as (create_order, table):
+        create_order.lambda_handler(create_order_event(), MockContext())
+        with patch.object(create_order, 'IDEMPOTENCY_EXPIRES_AFTER_SECONDS', -1):
+            response = create_order.lambda_handler(create_order_event(), MockContext())
+        assert response['statusCode'] == 409
+        assert 'already exists' in response['body']
+
+
+@pytest.mark.parametrize('order_id', ['#summary', '#applied#event-1', ''])
+@patch.dict(os.environ, ENVIRONMENT)
+def test_reserved_order_ids_are_rejected(order_id):
+    with setup_test_environment() as (create_order, table):
+        response = create_order.lambda_handler(create_order_event(order_id=order_id), MockContext())
+        assert response['statusCode'] == 400
+        assert table.scan()['Count'] == 0
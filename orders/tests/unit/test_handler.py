@@ -9,7 +9,7 @@ import pytest
 from moto import mock_dynamodb
 from contextlib import contextmanager
 from unittest.mock import patch
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
 ORDERS_MOCK_TABLE_NAME = 'Orders'
@@ -21,10 +21,13 @@ order_item_1 = {}
 order_item_2 = {}
 
 
-def mock_order_item(user_id, order_id):
-    return {
+def mock_order_item(user_id, order_id, order_time='2001-01-01T00:00:00Z', legacy=False):
+    item = {
         'orderId': order_id,
         'userId': user_id,
+        'orderTime': int(
+            datetime.strptime(order_time, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp()
+        ),
         'data': {
             'orderId': order_id,
             'userId': user_id,
@@ -51,9 +54,13 @@ def mock_order_item(user_id, order_id):
                 }
             ],
             'status': 'SENT',
-            'orderTime': '2001-01-01T00:00:00Z'
+            'orderTime': order_time
         }
     }
+    if legacy:
+        # orders created before the epoch orderTime existed only have it in data
+        del item['orderTime']
+    return item
 
 
 @contextmanager
@@ -77,7 +84,21 @@ def set_up_dynamodb():
         AttributeDefinitions=[
             {'AttributeName': 'userId', 'AttributeType': 'S'},
             {'AttributeName': 'orderId', 'AttributeType': 'S'},
-
+            {'AttributeName': 'orderTime', 'AttributeType': 'N'},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                'IndexName': 'userOrderTimeIndex',
+                'KeySchema': [
+                    {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                    {'AttributeName': 'orderTime', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 1,
+                    'WriteCapacityUnits': 1
+                }
+            }
         ],
         ProvisionedThroughput={
             'ReadCapacityUnits': 1,
@@ -93,7 +114,7 @@ def put_data_dynamodb():
 
     global order_item_1, order_item_2
     order_item_1 = mock_order_item(MOCK_USER_ID, MOCK_ORDER_ID_1)
-    order_item_2 = mock_order_item(MOCK_USER_ID, MOCK_ORDER_ID_2)
+    order_item_2 = mock_order_item(MOCK_USER_ID, MOCK_ORDER_ID_2, '2001-01-01T00:05:00Z')
 
     orders_table = dynamodb.Table(ORDERS_MOCK_TABLE_NAME)
     orders_table.put_item(
@@ -109,17 +130,350 @@ def put_data_dynamodb():
 @patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
 def test_list_orders():
     with setup_test_environment():
-        from src.api import list_orders
+        from src.api.order.list import list_orders
         with open('./events/event-list-orders.json', 'r') as f:
             list_orders_event = json.load(f)
 
         response = list_orders.lambda_handler(list_orders_event, '')
         assert response['statusCode'] == 200
         data = json.loads(response['body'])
+        # newest orders first
         expected_response = {
             'orders':
                 [
-                    order_item_1['data'], order_item_2['data']
+                    order_item_2['data'], order_item_1['data']
                 ]
         }
         assert data == expected_response
+
+
+def list_orders_event(**params):
+    with open('./events/event-list-orders.json', 'r') as f:
+        event = json.load(f)
+    event['queryStringParameters'] = params
+    return event
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_list_orders_paginated():
+    with setup_test_environment():
+        from src.api.order.list import list_orders
+
+        response = list_orders.lambda_handler(list_orders_event(limit='1'), '')
+        assert response['statusCode'] == 200
+        first_page = json.loads(response['body'])
+        assert first_page['orders'] == [order_item_2['data']]
+
+        response = list_orders.lambda_handler(
+            list_orders_event(limit='1', nextToken=first_page['nextToken']), '')
+        assert response['statusCode'] == 200
+        second_page = json.loads(response['body'])
+        assert second_page['orders'] == [order_item_1['data']]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_list_orders_filters():
+    with setup_test_environment():
+        from src.api.order.list import list_orders
+
+        response = list_orders.lambda_handler(list_orders_event(to='2001-01-01T00:01:00Z'), '')
+        assert json.loads(response['body'])['orders'] == [order_item_1['data']]
+
+        response = list_orders.lambda_handler(list_orders_event(**{'from': '2001-01-01T00:01:00Z'}), '')
+        assert json.loads(response['body'])['orders'] == [order_item_2['data']]
+
+        response = list_orders.lambda_handler(list_orders_event(status='COMPLETED'), '')
+        assert json.loads(response['body'])['orders'] == []
+
+
+def put_legacy_order(order_id, order_time):
+    item = mock_order_item(MOCK_USER_ID, order_id, order_time, legacy=True)
+    boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).put_item(
+        Item=json.loads(json.dumps(item), parse_float=Decimal))
+    return item
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_list_orders_includes_legacy_orders():
+    with setup_test_environment():
+        from src.api.order.list import list_orders
+        legacy_item = put_legacy_order('legacy-order', '2000-12-31T23:00:00Z')
+        # items of the partition without order data are not listed
+        boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).put_item(
+            Item={'userId': MOCK_USER_ID, 'orderId': '#summary', 'orderCount': 3})
+
+        response = list_orders.lambda_handler(list_orders_event(), '')
+        assert json.loads(response['body'])['orders'] == [
+            order_item_2['data'], order_item_1['data'], legacy_item['data']]
+
+        # the pages go on from the index to the legacy orders
+        orders = []
+        params = {'limit': '2'}
+        while True:
+            page = json.loads(list_orders.lambda_handler(list_orders_event(**params), '')['body'])
+            orders.extend(page['orders'])
+            if 'nextToken' not in page:
+                break
+            params['nextToken'] = page['nextToken']
+        assert orders == [order_item_2['data'], order_item_1['data'], legacy_item['data']]
+
+        response = list_orders.lambda_handler(list_orders_event(to='2000-12-31T23:30:00Z'), '')
+        assert json.loads(response['body'])['orders'] == [legacy_item['data']]
+        response = list_orders.lambda_handler(list_orders_event(status='SENT', **{'from': '2001-01-01T00:01:00Z'}), '')
+        assert json.loads(response['body'])['orders'] == [order_item_2['data']]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_backfill_order_time():
+    with setup_test_environment():
+        from src.api.order.backfill import backfill_order_time
+        from src.api.order.list import list_orders
+        legacy_item = put_legacy_order('legacy-order', '2001-01-01T00:02:00Z')
+
+        result = backfill_order_time.backfill_order_time()
+        assert result == {'updated': 1, 'lastEvaluatedKey': None, 'complete': True}
+        assert backfill_order_time.backfill_order_time()['updated'] == 0
+
+        # backfilled orders are listed from the index, in time order
+        with patch.object(list_orders, 'LEGACY_ORDERS_FALLBACK', False):
+            response = list_orders.lambda_handler(list_orders_event(), '')
+        assert json.loads(response['body'])['orders'] == [
+            order_item_2['data'], legacy_item['data'], order_item_1['data']]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_list_orders_invalid_parameters():
+    with setup_test_environment():
+        from src.api.order.list import list_orders
+
+        assert list_orders.lambda_handler(list_orders_event(limit='0'), '')['statusCode'] == 400
+        assert list_orders.lambda_handler(list_orders_event(nextToken='bad'), '')['statusCode'] == 400
+        assert list_orders.lambda_handler(list_orders_event(to='yesterday'), '')['statusCode'] == 400
+        assert list_orders.lambda_handler(list_orders_event(**{'from': '2001-13-01'}), '')['statusCode'] == 400
+        assert list_orders.lambda_handler(list_orders_event(to='9999-12-31T23:00:00-05:00'), '')['statusCode'] == 400
+        response = list_orders.lambda_handler(list_orders_event(**{'from': '2002-01-01', 'to': '2001-01-01'}), '')
+        assert response['statusCode'] == 400
+        assert 'after' in response['body']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_get_order():
+    with setup_test_environment():
+        from src.api.order.get import get_order
+        with open('./events/event-list-orders.json', 'r') as f:
+            get_order_event = json.load(f)
+        get_order_event['pathParameters'] = {'orderId': MOCK_ORDER_ID_1}
+
+        response = get_order.lambda_handler(get_order_event, '')
+        assert response['statusCode'] == 200
+        assert json.loads(response['body']) == order_item_1['data']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_get_order_not_found():
+    with setup_test_environment():
+        from src.api.order.get import get_order
+        with open('./events/event-list-orders.json', 'r') as f:
+            get_order_event = json.load(f)
+        get_order_event['pathParameters'] = {'orderId': 'unknown-order'}
+
+        response = get_order.lambda_handler(get_order_event, '')
+        assert response['statusCode'] == 404
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_get_order_cache():
+    with setup_test_environment():
+        import utils
+        utils.reset_order_cache()
+        with patch.object(utils, 'get_table', wraps=utils.get_table) as table:
+            first = utils.get_order(MOCK_USER_ID, MOCK_ORDER_ID_1)
+            second = utils.get_order(MOCK_USER_ID, MOCK_ORDER_ID_1)
+            assert first == second
+            assert table.call_count == 1
+            # changing a returned order leaves the cached one alone
+            second['status'] = 'CANCELED'
+            assert utils.get_order(MOCK_USER_ID, MOCK_ORDER_ID_1) == first
+            # a new invocation doesn't reuse the orders of the previous one by default
+            utils.reset_order_cache()
+            utils.get_order(MOCK_USER_ID, MOCK_ORDER_ID_1)
+            assert table.call_count == 2
+
+
+def edit_order_event(order_id, body):
+    with open('./events/event-list-orders.json', 'r') as f:
+        event = json.load(f)
+    event['pathParameters'] = {'orderId': order_id}
+    event['body'] = json.dumps(body)
+    return event
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_edit_order():
+    with setup_test_environment():
+        from src.api.order.edit import edit_order
+        new_items = [{'name': 'Gorgeous Cotton Pizza', 'price': 5, 'id': 10, 'quantity': 3}]
+        event = edit_order_event(MOCK_ORDER_ID_1, {
+            'restaurantId': 2,
+            'totalAmount': 15,
+            'orderItems': new_items,
+            'status': 'COMPLETED',
+        })
+
+        response = edit_order.lambda_handler(event, '')
+        assert response['statusCode'] == 200
+        data = json.loads(response['body'])
+        assert data['orderItems'] == new_items
+        assert data['totalAmount'] == 15
+        # the status and order time can't be changed by an edit
+        assert data['status'] == 'SENT'
+        assert data['orderTime'] == order_item_1['data']['orderTime']
+
+        stored = boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).get_item(
+            Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID_1}
+        )['Item']['data']
+        assert stored['orderItems'][0]['quantity'] == 3
+        assert stored == data
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_edit_order_replaces_the_order_data():
+    with setup_test_environment():
+        from src.api.order.edit import edit_order
+        event = edit_order_event(MOCK_ORDER_ID_1, {'totalAmount': 15})
+
+        response = edit_order.lambda_handler(event, '')
+        assert response['statusCode'] == 200
+        # the fields left out of the edit are removed, like with a put of the whole order
+        stored = boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).get_item(
+            Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID_1}
+        )['Item']['data']
+        assert stored == {
+            'userId': MOCK_USER_ID,
+            'orderId': MOCK_ORDER_ID_1,
+            'totalAmount': 15,
+            'status': 'SENT',
+            'orderTime': order_item_1['data']['orderTime'],
+        }
+        assert json.loads(response['body']) == stored
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_edit_order_wrong_status():
+    with setup_test_environment():
+        from src.api.order.edit import edit_order
+        boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).update_item(
+            Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID_1},
+            UpdateExpression='SET #d.#s = :s',
+            ExpressionAttributeNames={'#d': 'data', '#s': 'status'},
+            ExpressionAttributeValues={':s': 'COMPLETED'}
+        )
+        event = edit_order_event(MOCK_ORDER_ID_1, {'totalAmount': 15})
+
+        response = edit_order.lambda_handler(event, '')
+        assert response['statusCode'] == 400
+        assert 'COMPLETED' in response['body']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_edit_order_not_found():
+    with setup_test_environment():
+        from src.api.order.edit import edit_order
+        event = edit_order_event('unknown-order', {'totalAmount': 15})
+
+        response = edit_order.lambda_handler(event, '')
+        assert response['statusCode'] == 404
+
+
+def put_order_placed_at(order_id, order_time, epoch=True):
+    item = mock_order_item(MOCK_USER_ID, order_id)
+    item['data']['orderTime'] = order_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+    item.pop('orderTime')
+    if epoch:
+        item['orderTime'] = int(order_time.replace(tzinfo=timezone.utc).timestamp())
+    boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).put_item(
+        Item=json.loads(json.dumps(item), parse_float=Decimal)
+    )
+
+
+def cancel_order_event(order_id):
+    with open('./events/event-list-orders.json', 'r') as f:
+        event = json.load(f)
+    event['pathParameters'] = {'orderId': order_id}
+    return event
+
+
+@pytest.mark.parametrize('epoch', [True, False], ids=['epoch', 'legacy'])
+@patch.dict(os.environ, {
+    'TABLE_NAME': ORDERS_MOCK_TABLE_NAME,
+    'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR',
+    'POWERTOOLS_METRICS_NAMESPACE': 'ServerlessWorkshop'
+})
+def test_cancel_order(epoch):
+    with setup_test_environment():
+        from src.api.order.cancel import cancel_order
+        put_order_placed_at('recent-order', datetime.utcnow() - timedelta(minutes=2), epoch)
+
+        response = cancel_order.lambda_handler(cancel_order_event('recent-order'), '')
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['status'] == 'CANCELED'
+        item = boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).get_item(
+            Key={'userId': MOCK_USER_ID, 'orderId': 'recent-order'})['Item']
+        assert item['statusVersion'] == 1
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': ORDERS_MOCK_TABLE_NAME,
+    'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR',
+    'POWERTOOLS_METRICS_NAMESPACE': 'ServerlessWorkshop'
+})
+def test_cancel_order_too_old():
+    with setup_test_environment():
+        from src.api.order.cancel import cancel_order
+        put_order_placed_at('old-order', datetime.utcnow() - timedelta(minutes=11))
+
+        response = cancel_order.lambda_handler(cancel_order_event('old-order'), '')
+        assert response['statusCode'] == 400
+        assert 'older than 10 minutes' in response['body']
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': ORDERS_MOCK_TABLE_NAME,
+    'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR',
+    'POWERTOOLS_METRICS_NAMESPACE': 'ServerlessWorkshop'
+})
+def test_cancel_order_wrong_status():
+    with setup_test_environment():
+        from src.api.order.cancel import cancel_order
+        put_order_placed_at('canceled-order', datetime.utcnow())
+        assert cancel_order.lambda_handler(cancel_order_event('canceled-order'), '')['statusCode'] == 200
+
+        response = cancel_order.lambda_handler(cancel_order_event('canceled-order'), '')
+        assert response['statusCode'] == 400
+        assert 'CANCELED' in response['body']
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': ORDERS_MOCK_TABLE_NAME,
+    'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR',
+    'POWERTOOLS_METRICS_NAMESPACE': 'ServerlessWorkshop'
+})
+def test_cancel_order_not_found():
+    with setup_test_environment():
+        from src.api.order.cancel import cancel_order
+        response = cancel_order.lambda_handler(cancel_order_event('unknown-order'), '')
+        assert response['statusCode'] == 404
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'})
+def test_items_without_order_data_are_not_found():
+    with setup_test_environment():
+        from src.api.order.get import get_order
+        from src.api.order.edit import edit_order
+        from src.api.order.cancel import cancel_order
+        boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME).put_item(
+            Item={'userId': MOCK_USER_ID, 'orderId': '#not-an-order', 'orderCount': 3})
+
+        assert get_order.lambda_handler(cancel_order_event('#not-an-order'), '')['statusCode'] == 404
+        assert edit_order.lambda_handler(edit_order_event('#not-an-order', {'totalAmount': 15}), '')['statusCode'] == 404
+        assert cancel_order.lambda_handler(cancel_order_event('#not-an-order'), '')['statusCode'] == 404
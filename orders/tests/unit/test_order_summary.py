@@ -0,0 +1,247 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+from decimal import Decimal
+import boto3
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+ORDERS_MOCK_TABLE_NAME = 'Orders'
+MOCK_USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+OTHER_USER_ID = '6d4b9b7e-2ea8-4ff4-9b3c-2a7c8d4f0a11'
+
+ENVIRONMENT = {
+    'TABLE_NAME': ORDERS_MOCK_TABLE_NAME,
+    'ORDERS_TABLE': ORDERS_MOCK_TABLE_NAME,
+    'POWERTOOLS_TRACE_DISABLED': 'true'
+}
+
+
+def order_item(order_id, status, total_amount=32, user_id=MOCK_USER_ID, in_summary=True):
+    item = {
+        'userId': user_id,
+        'orderId': order_id,
+        'data': {'orderId': order_id, 'userId': user_id, 'totalAmount': total_amount, 'status': status}
+    }
+    if in_summary:
+        item['inSummary'] = True
+    return item
+
+
+def order_image(order_id, status, total_amount=32, user_id=MOCK_USER_ID, in_summary=True):
+    from dynamodb_client import serialize_item
+    return serialize_item(order_item(order_id, status, total_amount, user_id, in_summary))
+
+
+def stream_record(sequence_number, old_image=None, new_image=None):
+    image = new_image or old_image
+    event_name = 'MODIFY' if old_image and new_image else 'INSERT' if new_image else 'REMOVE'
+    images = {
+        'Keys': {'userId': image['userId'], 'orderId': image['orderId']},
+        'SequenceNumber': str(sequence_number)
+    }
+    if old_image is not None:
+        images['OldImage'] = old_image
+    if new_image is not None:
+        images['NewImage'] = new_image
+    return {
+        'eventID': f'event-{sequence_number}',
+        'eventName': event_name,
+        'eventSource': 'aws:dynamodb',
+        'dynamodb': images
+    }
+
+
+def summary_event(user_id, resource='/users/{userid}/orders/summary'):
+    return {
+        'resource': resource,
+        'httpMethod': 'GET',
+        'pathParameters': {'userid': user_id},
+    }
+
+
+@contextmanager
+def setup_test_environment():
+    with mock_dynamodb():
+        boto3.resource('dynamodb').create_table(
+            TableName=ORDERS_MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderId', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'orderId', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        from src.api.order.stream import update_order_summary
+        from src.api import users
+        yield update_order_summary, users
+
+
+def summary(users, user_id=MOCK_USER_ID):
+    response = users.lambda_handler(summary_event(user_id), None)
+    assert response['statusCode'] == 200
+    return json.loads(response['body'])
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_summary_follows_order_lifecycle():
+    with setup_test_environment() as (update_order_summary, users):
+        records = [
+            stream_record(100, new_image=order_image('order-1', 'PLACED', 32)),
+            stream_record(110, new_image=order_image('order-2', 'PLACED', Decimal('10.5'))),
+            stream_record(120, order_image('order-1', 'PLACED', 32), order_image('order-1', 'SENT', 32)),
+            # an edit that keeps the status only changes the total spend
+            stream_record(130, order_image('order-1', 'SENT', 32), order_image('order-1', 'SENT', 40)),
+            stream_record(140, new_image=order_image('order-3', 'PLACED', 5, user_id=OTHER_USER_ID)),
+        ]
+        assert update_order_summary.lambda_handler({'Records': records}, None) == {'batchItemFailures': []}
+        assert summary(users) == {
+            'userId': MOCK_USER_ID,
+            'orderCount': 2,
+            'totalSpend': 50.5,
+            'statusCounts': {'PLACED': 1, 'SENT': 1},
+        }
+
+        records = [
+            stream_record(150, order_image('order-1', 'SENT', 40), order_image('order-1', 'CANCELED', 40)),
+            stream_record(160, old_image=order_image('order-2', 'PLACED', Decimal('10.5'))),
+        ]
+        update_order_summary.lambda_handler({'Records': records}, None)
+        assert summary(users) == {
+            'userId': MOCK_USER_ID,
+            'orderCount': 1,
+            'totalSpend': 0,
+            'statusCounts': {'CANCELED': 1},
+        }
+        assert summary(users, OTHER_USER_ID)['orderCount'] == 1
+
+        response = users.lambda_handler(summary_event(MOCK_USER_ID, '/users/count/{userid}'), None)
+        assert json.loads(response['body']) == {'userId': MOCK_USER_ID, 'orderCount': 1}
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_redelivered_records_are_counted_once():
+    with setup_test_environment() as (update_order_summary, users):
+        first = [stream_record(100 + i, new_image=order_image(f'order-{i}', 'PLACED', 10)) for i in range(3)]
+        update_order_summary.lambda_handler({'Records': first}, None)
+        # a retried batch starts in the middle of the records already applied
+        second = first[1:] + [stream_record(200, new_image=order_image('order-9', 'PLACED', 10))]
+        assert update_order_summary.lambda_handler({'Records': second}, None) == {'batchItemFailures': []}
+        update_order_summary.lambda_handler({'Records': second}, None)
+
+        assert summary(users)['orderCount'] == 4
+        assert summary(users)['totalSpend'] == 40
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_records_of_other_shards_are_counted():
+    with setup_test_environment() as (update_order_summary, users):
+        # after a shard split, the records of a user can come from shards with unrelated
+        # sequence numbers, and be processed in any order
+        update_order_summary.lambda_handler({'Records': [
+            stream_record(500, new_image=order_image('order-1', 'PLACED', 10))]}, None)
+        update_order_summary.lambda_handler({'Records': [
+            stream_record(100, new_image=order_image('order-2', 'PLACED', 10))]}, None)
+        assert summary(users)['orderCount'] == 2
+
+        # the markers of the applied records expire with the stream records
+        table = boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME)
+        marker = table.get_item(Key={'userId': '#applied#' + MOCK_USER_ID, 'orderId': 'event-500'})['Item']
+        assert marker['expiresAt'] > 0
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_large_batches_of_a_user():
+    with setup_test_environment() as (update_order_summary, users):
+        records = [stream_record(100 + i, new_image=order_image(f'order-{i}', 'PLACED', 1)) for i in range(60)]
+        assert update_order_summary.lambda_handler({'Records': records}, None) == {'batchItemFailures': []}
+        assert update_order_summary.lambda_handler({'Records': records[30:]}, None) == {'batchItemFailures': []}
+        assert summary(users)['orderCount'] == 60
+        assert summary(users)['totalSpend'] == 60
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_user_without_orders():
+    with setup_test_environment() as (update_order_summary, users):
+        assert summary(users) == {'userId': MOCK_USER_ID, 'orderCount': 0, 'totalSpend': 0, 'statusCounts': {}}
+        response = users.lambda_handler(summary_event(MOCK_USER_ID, '/users/count/{userid}'), None)
+        assert json.loads(response['body'])['orderCount'] == 0
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_backfill_order_summary():
+    with setup_test_environment() as (update_order_summary, users):
+        from dynamodb_client import serialize_item
+        from src.api.order.backfill import backfill_order_summary
+        table = boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME)
+        key = {'userId': MOCK_USER_ID, 'orderId': 'legacy-order'}
+        # an order written before the summaries were kept isn't counted when it changes
+        table.put_item(Item=order_item('legacy-order', 'SENT', 20, in_summary=False))
+        update_order_summary.lambda_handler({'Records': [
+            stream_record(100, order_image('legacy-order', 'PLACED', 20, in_summary=False),
+                          order_image('legacy-order', 'SENT', 20, in_summary=False)),
+            stream_record(110, new_image=order_image('order-1', 'PLACED', 10)),
+        ]}, None)
+        assert summary(users)['orderCount'] == 1
+
+        result = backfill_order_summary.backfill_order_summary()
+        assert result == {'updated': 1, 'lastEvaluatedKey': None, 'complete': True}
+        assert backfill_order_summary.backfill_order_summary()['updated'] == 0
+
+        # the stream record of the backfill counts the order once
+        old_image = order_image('legacy-order', 'SENT', 20, in_summary=False)
+        new_image = serialize_item(table.get_item(Key=key)['Item'])
+        record = stream_record(120, old_image, new_image)
+        update_order_summary.lambda_handler({'Records': [record]}, None)
+        update_order_summary.lambda_handler({'Records': [record]}, None)
+        assert summary(users) == {
+            'userId': MOCK_USER_ID,
+            'orderCount': 2,
+            'totalSpend': 30,
+            'statusCounts': {'PLACED': 1, 'SENT': 1},
+        }
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_inconsistent_summaries_are_not_reported():
+    with setup_test_environment() as (update_order_summary, users):
+        from order_summary import summary_key
+        table = boto3.resource('dynamodb').Table(ORDERS_MOCK_TABLE_NAME)
+        table.put_item(Item={**summary_key(MOCK_USER_ID), 'orderCount': -1, 'count#SENT': -1, 'totalSpend': 0})
+        for resource in ['/users/{userid}/orders/summary', '/users/count/{userid}']:
+            response = users.lambda_handler(summary_event(MOCK_USER_ID, resource), None)
+            assert response['statusCode'] == 503
+
+        table.put_item(Item={**summary_key(MOCK_USER_ID), 'orderCount': 2, 'count#SENT': 1, 'totalSpend': 10})
+        response = users.lambda_handler(summary_event(MOCK_USER_ID), None)
+        assert response['statusCode'] == 503
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_summary_errors():
+    with setup_test_environment() as (update_order_summary, users):
+        event = summary_event(MOCK_USER_ID)
+        event['pathParameters'] = None
+        assert users.lambda_handler(event, None)['statusCode'] == 400
+        event['pathParameters'] = {}
+        assert users.lambda_handler(event, None)['statusCode'] == 400
+
+        # a KeyError of the summary itself isn't blamed on the request
+        with patch.object(users, 'get_order_summary', side_effect=KeyError('orderCount')):
+            assert users.lambda_handler(summary_event(MOCK_USER_ID), None)['statusCode'] == 500
+
+        import aws_clients
+        # the table the handler reads, a resource Table or a ClientTable (DDB_LOW_LEVEL_CLIENT)
+        table = aws_clients.get_table(ORDERS_MOCK_TABLE_NAME)
+        throttled = aws_clients.get_client('dynamodb').exceptions.ProvisionedThroughputExceededException(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Throttled'}}, 'GetItem')
+        with patch.object(table, 'get_item', side_effect=throttled):
+            response = users.lambda_handler(summary_event(MOCK_USER_ID), None)
+        assert response['statusCode'] == 500
+        assert response['headers']['Content-Type'] == 'text/plain'
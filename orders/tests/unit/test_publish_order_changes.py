@@ -0,0 +1,99 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+from unittest.mock import patch
+
+MOCK_USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+MOCK_ORDER_ID = '5d6c4bfa-ada8-4586-950e-33ffdebfb816'
+
+ENVIRONMENT = {
+    'EVENT_BUS_NAME': 'Orders-dev',
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'POWERTOOLS_METRICS_NAMESPACE': 'ServerlessWorkshop'
+}
+
+
+def order_image(status, order_id=MOCK_ORDER_ID, status_version=None, **data):
+    from dynamodb_client import serialize_item
+    item = {
+        'userId': MOCK_USER_ID,
+        'orderId': order_id,
+        'data': {'orderId': order_id, 'userId': MOCK_USER_ID, 'restaurantId': 1, 'totalAmount': 32, 'status': status, **data}
+    }
+    if status_version is not None:
+        item['statusVersion'] = status_version
+    return serialize_item(item)
+
+
+def stream_record(event_name, sequence_number, old_image=None, new_image=None):
+    images = {
+        'Keys': {'userId': {'S': MOCK_USER_ID}, 'orderId': {'S': (new_image or old_image)['orderId']['S']}},
+        'SequenceNumber': sequence_number,
+        'StreamViewType': 'NEW_AND_OLD_IMAGES'
+    }
+    if old_image is not None:
+        images['OldImage'] = old_image
+    if new_image is not None:
+        images['NewImage'] = new_image
+    return {'eventName': event_name, 'eventSource': 'aws:dynamodb', 'dynamodb': images}
+
+
+class RecordedEvents(object):
+    """Stands in for put_events, fails the entries of the given order ids"""
+
+    def __init__(self, failing_order_ids=()):
+        self.failing_order_ids = failing_order_ids
+        self.entries = []
+
+    def __call__(self, entries):
+        self.entries.extend(entries)
+        return [entry for entry in entries if json.loads(entry['Detail'])['orderId'] in self.failing_order_ids]
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_only_status_changes_are_published():
+    from src.api.order.stream import publish_order_changes
+    records = [
+        stream_record('INSERT', '100', new_image=order_image('PLACED')),
+        # an edit of the order items keeps the status
+        stream_record('MODIFY', '200', order_image('PLACED'), order_image('PLACED', orderItems=[])),
+        stream_record('MODIFY', '300', order_image('PLACED'), order_image('SENT', status_version=1, note='ring twice')),
+        stream_record('REMOVE', '400', old_image=order_image('SENT')),
+    ]
+    recorded = RecordedEvents()
+    with patch.object(publish_order_changes, 'put_events', recorded):
+        result = publish_order_changes.lambda_handler({'Records': records}, None)
+
+    assert result == {'batchItemFailures': []}
+    assert [entry['DetailType'] for entry in recorded.entries] == ['order.status_changed'] * 2
+    assert {entry['EventBusName'] for entry in recorded.entries} == {'Orders-dev'}
+    placed, sent = [json.loads(entry['Detail']) for entry in recorded.entries]
+    assert placed['status'] == 'PLACED' and placed['previousStatus'] is None
+    assert placed['statusVersion'] == 0
+    assert sent == {
+        'orderId': MOCK_ORDER_ID,
+        'userId': MOCK_USER_ID,
+        'status': 'SENT',
+        'previousStatus': 'PLACED',
+        'statusVersion': 1,
+        'changedFields': ['note', 'status'],
+        'restaurantId': 1,
+        'totalAmount': 32,
+    }
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+def test_failed_events_are_retried_from_the_first_failure():
+    from src.api.order.stream import publish_order_changes
+    records = [
+        stream_record('MODIFY', str(i), order_image('PLACED', order_id=f'order-{i}'), order_image('SENT', order_id=f'order-{i}'))
+        for i in range(12)
+    ]
+    recorded = RecordedEvents(failing_order_ids=('order-7', 'order-11'))
+    with patch.object(publish_order_changes, 'put_events', recorded):
+        result = publish_order_changes.lambda_handler({'Records': records}, None)
+
+    assert len(recorded.entries) == 12
+    assert result == {'batchItemFailures': [{'itemIdentifier': '7'}]}
@@ -0,0 +1,31 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+from decimal import Decimal
+
+
+ORDER = {
+    'orderId': 'order-1',
+    'totalAmount': 42.3,
+    'quantity': 2,
+    'paid': True,
+    'notes': None,
+    'orderItems': [
+        {'id': 1, 'name': 'Spaghetti', 'price': 9.99, 'quantity': 1},
+        {'id': 2, 'name': 'Pizza', 'price': 0.1, 'quantity': 3, 'tags': ['veggie', 1.5]},
+    ]
+}
+
+
+def test_to_decimal_matches_json_round_trip():
+    from utils import to_decimal
+
+    expected = json.loads(json.dumps(ORDER), parse_float=Decimal)
+    converted = to_decimal(ORDER)
+    assert converted == expected
+    assert converted['totalAmount'] == Decimal('42.3')
+    assert converted['orderItems'][1]['price'] == Decimal('0.1')
+    assert converted['paid'] is True
+    # the input is left untouched
+    assert ORDER['totalAmount'] == 42.3
@@ -1,23 +1,37 @@
 #!/bin/bash
-url=$1
+# Usage: polling-api.sh <order status api endpoint>/orders/<orderId> <id token>
+url=$1/status
 TOKEN=$2
 AUTH_HEADER="Authorization:$TOKEN"
-interval_in_seconds=2
+wait_in_seconds=20
 result="IN-PROCESS"
-printf "\nPolling '$url' every $interval_in_seconds seconds, until '$result'\n"
-while true; 
-do 
-	x=$(curl $url -s -H "$AUTH_HEADER"); 
-	
+etag=""
+printf "\nLong polling '$url' until '$result'\n"
+while true;
+do
+	# the API holds the request until the status differs from the one of the ETag,
+	# and answers 304 Not Modified if it didn't change within waitSeconds
+	headers=$(mktemp)
+	x=$(curl "$url?waitSeconds=$wait_in_seconds" -s -D "$headers" -H "$AUTH_HEADER" ${etag:+-H "If-None-Match: $etag"});
+	code=$(head -1 "$headers" | awk '{print $2}')
+	new_etag=$(grep -i '^etag:' "$headers" | cut -d' ' -f2 | tr -d '\r')
+	rm -f "$headers"
+
+	if [[ "$code" == "304" ]]; then
+		printf "\nStatus unchanged, still waiting for $result status\n";
+		continue;
+	fi;
+	if [[ "$code" != "200" ]]; then
+		printf "\nRequest failed with status $code: $x\n";
+		exit 1;
+	fi;
+	etag=$new_etag
+
 	resp=$(echo $x | python3 -c "import json; import sys; resp=json.load(sys.stdin);sys.stdout.write(resp['status']);");
-	
-	if [[ "$result" == "$resp" ]]; then 
+
+	if [[ "$result" == "$resp" ]]; then
 		printf "\n Order status matches desired result of ${resp}. Polling is complete!\n";
 		break;
-
 	fi;
-	printf "\nStill waiting for $result status\n";	
-
-	sleep $interval_in_seconds; 
+	printf "\nStatus is now ${resp}, still waiting for $result status\n";
 done
-
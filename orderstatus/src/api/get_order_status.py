@@ -0,0 +1,93 @@
+import os
+import time
+from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_table
+from response import cacheable_json_response, dumps, etag, etag_matches, text_response
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+orders_table = os.getenv('TABLE_NAME')
+
+# Long polls are capped below the 29 seconds API Gateway waits for an integration
+MAX_WAIT_SECONDS = int(os.getenv('MAX_WAIT_SECONDS', '20'))
+POLL_INTERVAL_MS = int(os.getenv('POLL_INTERVAL_MS', '500'))
+# stop polling when the function has less than this left
+TIME_MARGIN_MS = 1000
+
+
+class OrderNotFoundError(Exception):
+    status_code = 404
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+@tracer.capture_method
+def read_order_status(user_id, order_id):
+    """Reads only the status and status version of an order"""
+    response = get_table(orders_table).get_item(
+        Key={'userId': user_id, 'orderId': order_id},
+        ProjectionExpression='#d.#s, #v',
+        ExpressionAttributeNames={'#d': 'data', '#s': 'status', '#v': 'statusVersion'}
+    )
+    item = response.get('Item')
+    # items without order data are not orders
+    if item is None or 'data' not in item:
+        raise OrderNotFoundError(f"Order {order_id} was not found for user {user_id}")
+    return {
+        'orderId': order_id,
+        'status': item['data']['status'],
+        # orders get a version with their first status change
+        'version': item.get('statusVersion', 0),
+    }
+
+
+def parse_wait_seconds(params):
+    value = params.get('waitSeconds')
+    if value is None:
+        return 0
+    try:
+        wait_seconds = int(value)
+    except ValueError:
+        raise ValueError(f'Invalid waitSeconds: {value}')
+    if wait_seconds < 0:
+        raise ValueError('waitSeconds must not be negative')
+    return min(wait_seconds, MAX_WAIT_SECONDS)
+
+
+def wait_for_change(event, context, user_id, order_id, wait_seconds):
+    """Returns the status of an order. When the request's If-None-Match matches the
+    current status, the status is read again every POLL_INTERVAL_MS until it changes or
+    wait_seconds pass, so clients learn about a change without polling themselves."""
+    deadline = time.monotonic() + wait_seconds
+    order_status = read_order_status(user_id, order_id)
+    while etag_matches(event, etag(dumps(order_status))):
+        remaining = deadline - time.monotonic()
+        if context:
+            remaining = min(remaining, (context.get_remaining_time_in_millis() - TIME_MARGIN_MS) / 1000)
+        if remaining <= 0:
+            break
+        time.sleep(min(POLL_INTERVAL_MS / 1000, remaining))
+        order_status = read_order_status(user_id, order_id)
+    return order_status
+
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    user_id = event['requestContext']['authorizer']['claims']['sub']
+    order_id = event['pathParameters']['orderId']
+    params = event.get('queryStringParameters') or {}
+    try:
+        order_status = wait_for_change(event, context, user_id, order_id, parse_wait_seconds(params))
+        # 304 Not Modified when the status is still the one the client has
+        return cacheable_json_response(event, 200, order_status)
+    except OrderNotFoundError as nfe:
+        logger.info(str(nfe))
+        return text_response(nfe.status_code, str(nfe))
+    except ValueError as ve:
+        logger.info(str(ve))
+        return text_response(400, str(ve))
+    except Exception as err:
+        logger.exception(err)
+        raise
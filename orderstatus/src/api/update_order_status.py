@@ -1 +1,137 @@
-import json 
\ No newline at end of file
+import os
+from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_client, get_table
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+orders_table = os.getenv('TABLE_NAME')
+
+INITIAL_STATUS = 'PLACED'
+# Status changes an order can go through, by current status. Terminal statuses have no
+# targets.
+TRANSITIONS = {
+    'PLACED': ('SENT',),
+    'SENT': ('IN-PROCESS', 'CANCELED'),
+    'IN-PROCESS': ('COMPLETED', 'CANCELED'),
+    'COMPLETED': (),
+    'CANCELED': (),
+}
+
+
+def validate_transitions(transitions, initial_status):
+    """Checks a transition table once at import time: every target is a declared status,
+    and every status can be reached from the initial one"""
+    for status, targets in transitions.items():
+        for target in targets:
+            if target not in transitions:
+                raise ValueError(f"Transition {status} -> {target} targets an undeclared status")
+    reachable = {initial_status}
+    pending = [initial_status]
+    while pending:
+        for target in transitions[pending.pop()]:
+            if target not in reachable:
+                reachable.add(target)
+                pending.append(target)
+    unreachable = set(transitions) - reachable
+    if unreachable:
+        raise ValueError(f"Statuses {sorted(unreachable)} can't be reached from {initial_status}")
+
+
+def allowed_sources(transitions):
+    """Inverts the transition table: the statuses an order may have to move to a status"""
+    sources = {}
+    for status, targets in transitions.items():
+        for target in targets:
+            sources.setdefault(target, []).append(status)
+    return sources
+
+
+validate_transitions(TRANSITIONS, INITIAL_STATUS)
+SOURCES = allowed_sources(TRANSITIONS)
+
+
+class TransitionRejected(Exception):
+
+    def __init__(self, message):
+        super().__init__(message)
+
+
+@tracer.capture_method
+def update_status(user_id, order_id, status):
+    """Moves an order to a new status with a single conditional write, the current status
+    is checked by DynamoDB so concurrent events can't apply an invalid transition.
+    Returns the updated order data."""
+    sources = SOURCES.get(status)
+    if not sources:
+        raise TransitionRejected(f"Status {status} is not a valid target status")
+
+    names = {'#d': 'data', '#s': 'status', '#v': 'statusVersion'}
+    values = {':to': status, ':one': 1}
+    placeholders = []
+    for i, source in enumerate(sources):
+        values[f':from{i}'] = source
+        placeholders.append(f':from{i}')
+    try:
+        response = get_table(orders_table).update_item(
+            Key={'userId': user_id, 'orderId': order_id},
+            UpdateExpression='SET #d.#s = :to ADD #v :one',
+            ConditionExpression=f"#d.#s IN ({', '.join(placeholders)})",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW'
+        )
+    except get_client('dynamodb').exceptions.ConditionalCheckFailedException:
+        # only the failure path reads the order, to tell the reason apart
+        item = get_table(orders_table).get_item(
+            Key={'userId': user_id, 'orderId': order_id},
+            ProjectionExpression='#d.#s',
+            ExpressionAttributeNames={'#d': 'data', '#s': 'status'}
+        ).get('Item')
+        if item is None or 'data' not in item:
+            raise TransitionRejected(f"Order {order_id} was not found for user {user_id}")
+        current = item['data']['status']
+        if current == status:
+            # a redelivered event, the order already has the status
+            logger.info(f"Order {order_id} already has status {status}")
+            return None
+        raise TransitionRejected(f"Order {order_id} can't go from status {current} to {status}")
+
+    logger.info(f"Order {order_id} status changed to {status}")
+    return response['Attributes']['data']
+
+
+def order_status_detail(event):
+    """Returns the user id, order id and status of an order.updated event"""
+    detail = event.get('detail')
+    if not isinstance(detail, dict):
+        raise TransitionRejected("Event has no detail")
+    # some publishers wrap the order in a data attribute, like the Orders table items,
+    # and the restaurant events use a capitalized Status
+    detail = detail.get('data', detail)
+    if not isinstance(detail, dict):
+        raise TransitionRejected("Event detail has no order")
+    status = detail.get('status') or detail.get('Status')
+    for name, value in (('userId', detail.get('userId')), ('orderId', detail.get('orderId')), ('status', status)):
+        if not isinstance(value, str) or not value:
+            raise TransitionRejected(f"Event detail has no {name}")
+    return detail['userId'], detail['orderId'], status
+
+
+@tracer.capture_lambda_handler
+def lambda_handler(event, context):
+    """Applies an order.updated event to the order it refers to"""
+    order_id = None
+    status = None
+    try:
+        user_id, order_id, status = order_status_detail(event)
+        if update_status(user_id, order_id, status) is None:
+            return {'orderId': order_id, 'status': status, 'applied': False, 'reason': 'duplicate'}
+        return {'orderId': order_id, 'status': status, 'applied': True}
+    except TransitionRejected as tr:
+        # retrying the event wouldn't change the outcome, it is logged and dropped
+        logger.warning(str(tr))
+        return {'orderId': order_id, 'status': status, 'applied': False, 'reason': str(tr)}
+    except Exception as err:
+        logger.exception(err)
+        raise
@@ -0,0 +1,130 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import time
+import boto3
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+ORDERS_MOCK_TABLE_NAME = 'Orders'
+MOCK_USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+MOCK_ORDER_ID = '5d6c4bfa-ada8-4586-950e-33ffdebfb816'
+
+
+class MockContext:
+
+    def __init__(self, remaining_ms=25000):
+        self.deadline = time.monotonic() + remaining_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self.deadline - time.monotonic()) * 1000)
+
+
+def get_status_event(order_id=MOCK_ORDER_ID, etag=None, wait_seconds=None):
+    with open('./events/event-get-order-status.json', 'r') as f:
+        event = json.load(f)
+    event['pathParameters'] = {'orderId': order_id}
+    if etag is not None:
+        event['headers']['If-None-Match'] = etag
+    if wait_seconds is not None:
+        event['queryStringParameters'] = {'waitSeconds': wait_seconds}
+    return event
+
+
+@contextmanager
+def setup_test_environment(status='SENT'):
+    with mock_dynamodb():
+        table = boto3.resource('dynamodb').create_table(
+            TableName=ORDERS_MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderId', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'orderId', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table.put_item(Item={
+            'orderId': MOCK_ORDER_ID,
+            'userId': MOCK_USER_ID,
+            'statusVersion': 1,
+            'data': {'orderId': MOCK_ORDER_ID, 'userId': MOCK_USER_ID, 'status': status}
+        })
+        from src.api import get_order_status
+        yield get_order_status, table
+
+
+def set_status(table, status):
+    table.update_item(
+        Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID},
+        UpdateExpression='SET #d.#s = :to ADD #v :one',
+        ExpressionAttributeNames={'#d': 'data', '#s': 'status', '#v': 'statusVersion'},
+        ExpressionAttributeValues={':to': status, ':one': 1}
+    )
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_get_order_status():
+    with setup_test_environment() as (get_order_status, table):
+        response = get_order_status.lambda_handler(get_status_event(), MockContext())
+        assert response['statusCode'] == 200
+        assert json.loads(response['body']) == {'orderId': MOCK_ORDER_ID, 'status': 'SENT', 'version': 1}
+        assert response['headers']['ETag']
+
+        # the same status is not sent again
+        response = get_order_status.lambda_handler(
+            get_status_event(etag=response['headers']['ETag']), MockContext())
+        assert response['statusCode'] == 304
+        assert response['body'] == ''
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_get_order_status_errors():
+    with setup_test_environment() as (get_order_status, table):
+        response = get_order_status.lambda_handler(get_status_event(order_id='missing'), MockContext())
+        assert response['statusCode'] == 404
+        table.put_item(Item={'userId': MOCK_USER_ID, 'orderId': '#not-an-order', 'orderCount': 3})
+        response = get_order_status.lambda_handler(get_status_event(order_id='#not-an-order'), MockContext())
+        assert response['statusCode'] == 404
+
+        for wait_seconds in ('soon', '-1'):
+            response = get_order_status.lambda_handler(get_status_event(wait_seconds=wait_seconds), MockContext())
+            assert response['statusCode'] == 400
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_long_poll_returns_on_change():
+    with setup_test_environment() as (get_order_status, table):
+        etag = get_order_status.lambda_handler(get_status_event(), MockContext())['headers']['ETag']
+        sleeps = []
+
+        def sleep(seconds):
+            # the restaurant moves the order on while the request waits
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                set_status(table, 'IN-PROCESS')
+
+        with patch.object(get_order_status.time, 'sleep', sleep):
+            response = get_order_status.lambda_handler(
+                get_status_event(etag=etag, wait_seconds='20'), MockContext())
+        assert response['statusCode'] == 200
+        assert json.loads(response['body'])['status'] == 'IN-PROCESS'
+        assert json.loads(response['body'])['version'] == 2
+        assert sleeps == [0.5, 0.5, 0.5]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_long_poll_times_out():
+    with setup_test_environment() as (get_order_status, table):
+        etag = get_order_status.lambda_handler(get_status_event(), MockContext())['headers']['ETag']
+
+        # the remaining time of the function bounds the wait, whatever waitSeconds asks for
+        with patch.object(get_order_status, 'POLL_INTERVAL_MS', 10):
+            response = get_order_status.lambda_handler(
+                get_status_event(etag=etag, wait_seconds='20'), MockContext(remaining_ms=1200))
+        assert response['statusCode'] == 304
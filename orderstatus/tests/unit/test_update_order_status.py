@@ -0,0 +1,159 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import boto3
+import pytest
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+ORDERS_MOCK_TABLE_NAME = 'Orders'
+MOCK_USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+MOCK_ORDER_ID = '5d6c4bfa-ada8-4586-950e-33ffdebfb816'
+
+
+def mock_order_item(status='PLACED'):
+    return {
+        'orderId': MOCK_ORDER_ID,
+        'userId': MOCK_USER_ID,
+        'data': {
+            'orderId': MOCK_ORDER_ID,
+            'userId': MOCK_USER_ID,
+            'restaurantId': '1',
+            'totalAmount': 32,
+            'orderItems': [{'id': 1, 'name': 'Spaghetti', 'price': 32, 'quantity': 1}],
+            'status': status,
+            'orderTime': '2001-01-01T00:00:00Z'
+        }
+    }
+
+
+def order_status_event(status, order_id=MOCK_ORDER_ID):
+    with open('./events/event-order-status.json', 'r') as f:
+        event = json.load(f)
+    event['detail']['status'] = status
+    event['detail']['orderId'] = order_id
+    return event
+
+
+@contextmanager
+def setup_test_environment(status='PLACED'):
+    with mock_dynamodb():
+        table = boto3.resource('dynamodb').create_table(
+            TableName=ORDERS_MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderId', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'orderId', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        table.put_item(Item=mock_order_item(status))
+        from src.api import update_order_status
+        yield update_order_status, table
+
+
+def stored_order(table):
+    return table.get_item(Key={'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID})['Item']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_order_lifecycle():
+    with setup_test_environment() as (update_order_status, table):
+        for version, status in enumerate(['SENT', 'IN-PROCESS', 'COMPLETED'], start=1):
+            result = update_order_status.lambda_handler(order_status_event(status), '')
+            assert result['applied'] is True
+            item = stored_order(table)
+            assert item['data']['status'] == status
+            assert item['statusVersion'] == version
+        # the other order data is left untouched
+        assert item['data']['orderItems'] == mock_order_item()['data']['orderItems']
+
+
+@pytest.mark.parametrize('current, status', [
+    ('PLACED', 'COMPLETED'),
+    ('PLACED', 'IN-PROCESS'),
+    ('COMPLETED', 'CANCELED'),
+    ('CANCELED', 'SENT'),
+    ('SENT', 'PLACED'),
+    ('SENT', 'DELIVERED'),
+])
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_invalid_transitions_are_rejected(current, status):
+    with setup_test_environment(current) as (update_order_status, table):
+        result = update_order_status.lambda_handler(order_status_event(status), '')
+        assert result['applied'] is False
+        assert stored_order(table)['data']['status'] == current
+        assert 'statusVersion' not in stored_order(table)
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_redelivered_event_is_ignored():
+    with setup_test_environment('SENT') as (update_order_status, table):
+        update_order_status.lambda_handler(order_status_event('IN-PROCESS'), '')
+        result = update_order_status.lambda_handler(order_status_event('IN-PROCESS'), '')
+        assert result['applied'] is False
+        assert result['reason'] == 'duplicate'
+        assert stored_order(table)['statusVersion'] == 1
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_unknown_order_is_rejected():
+    with setup_test_environment() as (update_order_status, table):
+        result = update_order_status.lambda_handler(order_status_event('SENT', order_id='missing'), '')
+        assert result['applied'] is False
+        assert 'not found' in result['reason']
+
+        # items without order data are not orders
+        table.put_item(Item={'userId': MOCK_USER_ID, 'orderId': '#not-an-order', 'orderCount': 3})
+        result = update_order_status.lambda_handler(order_status_event('SENT', order_id='#not-an-order'), '')
+        assert result['applied'] is False
+        assert 'not found' in result['reason']
+        assert 'data' not in table.get_item(Key={'userId': MOCK_USER_ID, 'orderId': '#not-an-order'})['Item']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_transition_table_validation():
+    with setup_test_environment() as (update_order_status, table):
+        validate = update_order_status.validate_transitions
+        validate(update_order_status.TRANSITIONS, 'PLACED')
+        with pytest.raises(ValueError, match='undeclared'):
+            validate({'PLACED': ('SENT',)}, 'PLACED')
+        with pytest.raises(ValueError, match="can't be reached"):
+            validate({'PLACED': ('SENT',), 'SENT': (), 'LOST': ()}, 'PLACED')
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_event_formats():
+    with setup_test_environment() as (update_order_status, table):
+        event = order_status_event('SENT')
+        event['detail'] = {'data': event['detail']}
+        assert update_order_status.lambda_handler(event, '')['applied'] is True
+
+        event = order_status_event('IN-PROCESS')
+        event['detail']['Status'] = event['detail'].pop('status')
+        assert update_order_status.lambda_handler(event, '')['applied'] is True
+        assert stored_order(table)['data']['status'] == 'IN-PROCESS'
+
+
+@pytest.mark.parametrize('detail', [
+    {'orderId': MOCK_ORDER_ID, 'status': 'SENT'},
+    {'userId': MOCK_USER_ID, 'status': 'SENT'},
+    {'userId': MOCK_USER_ID, 'orderId': MOCK_ORDER_ID},
+    {'data': None},
+    None,
+], ids=['no-user', 'no-order', 'no-status', 'no-order-data', 'no-detail'])
+@patch.dict(os.environ, {'TABLE_NAME': ORDERS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_malformed_events_are_rejected(detail):
+    with setup_test_environment() as (update_order_status, table):
+        event = order_status_event('SENT')
+        event['detail'] = detail
+        result = update_order_status.lambda_handler(event, '')
+        assert result['applied'] is False
+        assert 'Event' in result['reason']
+        assert stored_order(table)['data']['status'] == 'PLACED'
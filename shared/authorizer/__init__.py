@@ -0,0 +1,21 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from .handler import PRINCIPAL_ID, Authorizer
+from .jwks import JwksCache, fetch_jwks
+from .policy import AuthPolicy, HttpVerb, PolicyTemplate
+from .token import TokenValidator, cognito_jwks_url
+from .token_cache import VerifiedTokenCache
+
+__all__ = [
+    'PRINCIPAL_ID',
+    'Authorizer',
+    'AuthPolicy',
+    'HttpVerb',
+    'JwksCache',
+    'PolicyTemplate',
+    'TokenValidator',
+    'VerifiedTokenCache',
+    'cognito_jwks_url',
+    'fetch_jwks',
+]
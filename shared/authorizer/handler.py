@@ -0,0 +1,65 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from .policy import AuthPolicy, PolicyTemplate
+
+PRINCIPAL_ID = '{principalId}'
+"""Marker for the caller's principal id in the resources of the authorization rules"""
+
+
+class Authorizer(object):
+    """API Gateway Lambda token authorizer driven by authorization rules declared as data.
+
+    role_rules maps a role to the list of (HttpVerb, resource) pairs it is allowed to call.
+    Callers whose first Cognito group is admin_group_name get the 'admin' role, everybody
+    else gets the 'user' role. The policy of a role is built once per API stage and then
+    only rendered for each principal."""
+
+    def __init__(self, role_rules, validator, admin_group_name=None):
+        for role in ('user', 'admin'):
+            if role not in role_rules:
+                raise ValueError(f"No authorization rules declared for role '{role}'")
+        self.role_rules = role_rules
+        self.validator = validator
+        self.admin_group_name = admin_group_name
+        # built policies per (role, account, restApiId, stage, region)
+        self._templates = {}
+
+    def resolve_role(self, claims):
+        # Look for admin group in Cognito groups
+        # Assumption: admin group always has higher precedence
+        if 'cognito:groups' in claims and claims['cognito:groups'][0] == self.admin_group_name:
+            return 'admin'
+        return 'user'
+
+    def get_policy_template(self, role, aws_account_id, rest_api_id, stage, region):
+        """Returns the policy template of a role, building it on first use"""
+        template_key = (role, aws_account_id, rest_api_id, stage, region)
+        template = self._templates.get(template_key)
+        if template is None:
+            policy = AuthPolicy(PolicyTemplate.placeholder, aws_account_id)
+            policy.restApiId = rest_api_id
+            policy.region = region
+            policy.stage = stage
+            for verb, resource in self.role_rules[role]:
+                policy.allow_method(verb, resource.replace(PRINCIPAL_ID, PolicyTemplate.placeholder))
+            template = PolicyTemplate(policy.build())
+            self._templates[template_key] = template
+        return template
+
+    def lambda_handler(self, event, context):
+        tmp = event['methodArn'].split(':')
+        api_gateway_arn_tmp = tmp[5].split('/')
+        region = tmp[3]
+        aws_account_id = tmp[4]
+        # validate the incoming token
+        validated_decoded_token = self.validator.validate(event['authorizationToken'], region)
+        if not validated_decoded_token:
+            raise Exception('Unauthorized')
+        principal_id = validated_decoded_token['sub']
+        role = self.resolve_role(validated_decoded_token)
+        # render the policy of the role for this principal
+        template = self.get_policy_template(
+            role, aws_account_id, api_gateway_arn_tmp[0], api_gateway_arn_tmp[1], region
+        )
+        return template.render(principal_id)
@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import threading
+import time
+import urllib.request
+
+JWKS_CACHE_TTL = int(os.getenv('JWKS_CACHE_TTL', '3600'))
+JWKS_MISS_REFRESH_INTERVAL = int(os.getenv('JWKS_MISS_REFRESH_INTERVAL', '60'))
+JWKS_FETCH_TIMEOUT = float(os.getenv('JWKS_FETCH_TIMEOUT', '3'))
+
+
+def fetch_jwks(url):
+    """Downloads a JSON Web Key Set and returns its list of keys"""
+    with urllib.request.urlopen(url, timeout=JWKS_FETCH_TIMEOUT) as f:
+        response = f.read()
+    return json.loads(response.decode('utf-8'))['keys']
+
+
+class JwksCache(object):
+    """Per-container cache of the public keys of an identity provider, indexed by kid.
+
+    The first lookup downloads the key set. Once the keys are older than ttl seconds they
+    keep being served while a background thread downloads them again
+    (stale-while-revalidate). A kid that is not in the cache triggers one synchronous
+    download to pick up rotated keys, unless the keys were downloaded, or a miss refresh
+    was tried, within the last miss_refresh_interval seconds."""
+
+    def __init__(self, url, ttl=JWKS_CACHE_TTL, miss_refresh_interval=JWKS_MISS_REFRESH_INTERVAL,
+                 fetcher=fetch_jwks, clock=time.monotonic):
+        self.url = url
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._fetcher = fetcher
+        self._clock = clock
+        self._keys = {}
+        self._fetched_at = None
+        self._last_miss_refresh = None
+        self._refreshing = False
+        self._refresh_thread = None
+        self._lock = threading.Lock()
+
+    def get_key(self, kid):
+        """Returns the JWK with the given kid, or None if the identity provider doesn't know it"""
+        now = self._clock()
+        if self._fetched_at is None:
+            self.refresh()
+        elif now - self._fetched_at >= self.ttl:
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and (
+            # the initial load and background refreshes count as recent downloads too
+            now - self._fetched_at >= self.miss_refresh_interval
+            and (self._last_miss_refresh is None
+                 or now - self._last_miss_refresh >= self.miss_refresh_interval)
+        ):
+            self._last_miss_refresh = now
+            self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def refresh(self):
+        """Downloads the key set and replaces the cached keys"""
+        keys = self._fetcher(self.url)
+        self._keys = {key['kid']: key for key in keys}
+        self._fetched_at = self._clock()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as err:
+                # keep serving the stale keys, the next lookup will try again
+                print(f'Failed to refresh JWKS from {self.url}: {err}')
+            finally:
+                self._refreshing = False
+
+        self._refresh_thread = threading.Thread(target=run, daemon=True)
+        self._refresh_thread.start()
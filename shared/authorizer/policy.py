@@ -1,116 +1,11 @@
-import os
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Authorization policy helper classes based on https://github.com/awslabs/aws-apigateway-lambda-authorizer-blueprints/blob/master/blueprints/python/api-gateway-authorizer-python.py
+
 import re
-import json
-import time
-import urllib.request
-from jose import jwk, jwt
-from jose.utils import base64url_decode
-
-# *** Section 1 : base setup and token validation helper function
-is_cold_start = True
-keys = {}
-user_pool_id = os.getenv('USER_POOL_ID', None)
-app_client_id = os.getenv('APPLICATION_CLIENT_ID', None)
-admin_group_name = os.getenv('ADMIN_GROUP_NAME', None)
-
-
-def validate_token(token, region):
-    global keys, is_cold_start, user_pool_id, app_client_id
-    if is_cold_start:
-        # KEYS_URL -- REPLACE WHEN CHANGING IDENTITY PROVIDER!!
-        keys_url = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
-        with urllib.request.urlopen(keys_url) as f:
-            response = f.read()
-        keys = json.loads(response.decode('utf-8'))['keys']
-        is_cold_start = False
-
-    # get the kid from the headers prior to verification
-    headers = jwt.get_unverified_headers(token)
-    kid = headers['kid']
-    # search for the kid in the downloaded public keys
-    key_index = -1
-    for i in range(len(keys)):
-        if kid == keys[i]['kid']:
-            key_index = i
-            break
-    if key_index == -1:
-        print('Public key not found in jwks.json')
-        return False
-    # construct the public key
-    public_key = jwk.construct(keys[key_index])
-    # get the last two sections of the token,
-    # message and signature (encoded in base64)
-    message, encoded_signature = str(token).rsplit('.', 1)
-    # decode the signature
-    decoded_signature = base64url_decode(encoded_signature.encode('utf-8'))
-    # verify the signature
-    if not public_key.verify(message.encode("utf8"), decoded_signature):
-        print('Signature verification failed')
-        return False
-    print('Signature successfully verified')
-    # since verification succeeded, you can now safely use the unverified claims
-    claims = jwt.get_unverified_claims(token)
-
-    # Additionally you can verify the token expiration
-    if time.time() > claims['exp']:
-        print('Token is expired')
-        return False
-    # and the Audience  (use claims['client_id'] if verifying an access token)
-    if claims['aud'] != app_client_id:
-        print('Token was not issued for this audience')
-        return False
-    decoded_jwt = jwt.decode(token, key=keys[key_index], audience=app_client_id)
-    return decoded_jwt
-
-
-def lambda_handler(event, context):
-    global admin_group_name
-    tmp = event['methodArn'].split(':')
-    api_gateway_arn_tmp = tmp[5].split('/')
-    region = tmp[3]
-    aws_account_id = tmp[4]
-    # validate the incoming token
-    validated_decoded_token = validate_token(event['authorizationToken'], region)
-    if not validated_decoded_token:
-        raise Exception('Unauthorized')
-    principal_id = validated_decoded_token['sub']
-    # initialize the policy
-    policy = AuthPolicy(principal_id, aws_account_id)
-    policy.restApiId = api_gateway_arn_tmp[0]
-    policy.region = region
-    policy.stage = api_gateway_arn_tmp[1]
-
-    # *** Section 2 : authorization rules
-    # Allow all public resources/methods explicitly
-
-    # Add user specific resources/methods
-    policy.allow_method(HttpVerb.GET, f"/users/{principal_id}")
-    policy.allow_method(HttpVerb.GET, f"/users/count/{principal_id}")
-    policy.allow_method(HttpVerb.PUT, f"/users/{principal_id}")
-    policy.allow_method(HttpVerb.DELETE, f"/users/{principal_id}")
-    policy.allow_method(HttpVerb.GET, f"/users/{principal_id}/*")
-    policy.allow_method(HttpVerb.PUT, f"/users/{principal_id}/*")
-    policy.allow_method(HttpVerb.DELETE, f"/users/{principal_id}/*")
-
-    # Look for admin group in Cognito groups
-    # Assumption: admin group always has higher precedence
-    if 'cognito:groups' in validated_decoded_token and validated_decoded_token['cognito:groups'][0] == admin_group_name:
-        # add administrative privileges
-        policy.allow_method(HttpVerb.GET, "users/count")
-        policy.allow_method(HttpVerb.GET, "users")
-        policy.allow_method(HttpVerb.GET, "users/*")
-        policy.allow_method(HttpVerb.DELETE, "users")
-        policy.allow_method(HttpVerb.DELETE, "users/*")
-        policy.allow_method(HttpVerb.PUT, "users")
-        policy.allow_method(HttpVerb.PUT, "users/*")
-
-    # Finally, build the policy
-    auth_response = policy.build()
-    return auth_response
-
-
-
-# *** Section 3 : authorization policy helper classes
+
+
 class HttpVerb:
     GET = "GET"
     POST = "POST"
@@ -131,6 +26,8 @@ class AuthPolicy(object):
     """The policy version used for the evaluation. This should always be '2012-10-17'"""
     pathRegex = "^[/.a-zA-Z0-9-\*]+$"
     """The regular expression used to validate resource paths for the policy"""
+    pathPattern = re.compile(pathRegex)
+    """pathRegex compiled once, instead of on every added method"""
 
     """these are the internal lists of allowed and denied methods. These are lists
     of objects and each object has 2 properties: A resource ARN and a nullable
@@ -166,32 +63,43 @@ class AuthPolicy(object):
         the internal list contains a resource ARN and a condition statement. The condition
         statement can be null."""
         if verb != "*" and not hasattr(HttpVerb, verb):
-            raise NameError("Invalid HTTP verb " + verb + ". Allowed verbs in HttpVerb class")
-        resource_pattern = re.compile(self.pathRegex)
-        if not resource_pattern.match(resource):
-            raise NameError("Invalid resource path: " + resource + ". Path should match " + self.pathRegex)
+            raise NameError(
+                "Invalid HTTP verb " + verb + ". Allowed verbs in HttpVerb class"
+            )
+        if not self.pathPattern.match(resource):
+            raise NameError(
+                "Invalid resource path: "
+                + resource
+                + ". Path should match "
+                + self.pathRegex
+            )
 
         if resource[:1] == "/":
             resource = resource[1:]
 
-        resource_arn = ("arn:aws:execute-api:" +
-                        self.region + ":" +
-                        self.awsAccountId + ":" +
-                        self.restApiId + "/" +
-                        self.stage + "/" +
-                        verb + "/" +
-                        resource)
+        resource_arn = (
+            "arn:aws:execute-api:"
+            + self.region
+            + ":"
+            + self.awsAccountId
+            + ":"
+            + self.restApiId
+            + "/"
+            + self.stage
+            + "/"
+            + verb
+            + "/"
+            + resource
+        )
 
         if effect.lower() == "allow":
-            self.allowMethods.append({
-                'resourceArn': resource_arn,
-                'conditions': conditions
-            })
+            self.allowMethods.append(
+                {'resourceArn': resource_arn, 'conditions': conditions}
+            )
         elif effect.lower() == "deny":
-            self.denyMethods.append({
-                'resourceArn': resource_arn,
-                'conditions': conditions
-            })
+            self.denyMethods.append(
+                {'resourceArn': resource_arn, 'conditions': conditions}
+            )
 
     def _get_empty_statement(self, effect):
         """Returns an empty statement object prepopulated with the correct action and the
@@ -199,7 +107,7 @@ class AuthPolicy(object):
         statement = {
             'Action': 'execute-api:Invoke',
             'Effect': effect[:1].upper() + effect[1:].lower(),
-            'Resource': []
+            'Resource': [],
         }
 
         return statement
@@ -246,13 +154,15 @@ class AuthPolicy(object):
     def allow_method_with_conditions(self, verb, resource, conditions):
         """Adds an API Gateway method (Http verb + Resource path) to the list of allowed
         methods and includes a condition for the policy statement. More on AWS policy
-        conditions here: http://docs.aws.amazon.com/IAM/latest/UserGuide/reference_policies_elements.html#Condition"""
+        conditions here: http://docs.aws.amazon.com/IAM/latest/UserGuide/reference_policies_elements.html#Condition
+        """
         self._add_method("Allow", verb, resource, conditions)
 
     def deny_method_with_conditions(self, verb, resource, conditions):
         """Adds an API Gateway method (Http verb + Resource path) to the list of denied
         methods and includes a condition for the policy statement. More on AWS policy
-        conditions here: http://docs.aws.amazon.com/IAM/latest/UserGuide/reference_policies_elements.html#Condition"""
+        conditions here: http://docs.aws.amazon.com/IAM/latest/UserGuide/reference_policies_elements.html#Condition
+        """
         self._add_method("Deny", verb, resource, conditions)
 
     def build(self):
@@ -260,19 +170,53 @@ class AuthPolicy(object):
         conditions. This will generate a policy with two main statements for the effect:
         one statement for Allow and one statement for Deny.
         Methods that includes conditions will have their own statement in the policy."""
-        if ((self.allowMethods is None or len(self.allowMethods) == 0) and
-                (self.denyMethods is None or len(self.denyMethods) == 0)):
+        if (self.allowMethods is None or len(self.allowMethods) == 0) and (
+            self.denyMethods is None or len(self.denyMethods) == 0
+        ):
             raise NameError("No statements defined for the policy")
 
         policy = {
             'principalId': self.principalId,
-            'policyDocument': {
-                'Version': self.version,
-                'Statement': []
-            }
+            'policyDocument': {'Version': self.version, 'Statement': []},
         }
 
-        policy['policyDocument']['Statement'].extend(self._get_statement_for_effect("Allow", self.allowMethods))
-        policy['policyDocument']['Statement'].extend(self._get_statement_for_effect("Deny", self.denyMethods))
+        policy['policyDocument']['Statement'].extend(
+            self._get_statement_for_effect("Allow", self.allowMethods)
+        )
+        policy['policyDocument']['Statement'].extend(
+            self._get_statement_for_effect("Deny", self.denyMethods)
+        )
 
         return policy
+
+
+class PolicyTemplate(object):
+    """A built policy in which the principal id is a placeholder. The rules and resource
+    ARNs are generated once; rendering the policy for a principal only substitutes the
+    placeholder."""
+
+    placeholder = "principal-id-placeholder"
+    """Stands in for the principal id while the template is built, it must match pathRegex"""
+    principalPattern = re.compile("^[.a-zA-Z0-9-]+$")
+    """Principal ids are substituted into resource paths, so they must be a single path segment"""
+
+    def __init__(self, policy):
+        self.version = policy['policyDocument']['Version']
+        self.statements = []
+        for statement in policy['policyDocument']['Statement']:
+            resources = [resource.split(self.placeholder) for resource in statement['Resource']]
+            self.statements.append((statement, resources))
+
+    def render(self, principal_id):
+        """Returns the policy document for the given principal"""
+        if not self.principalPattern.match(principal_id):
+            raise NameError("Invalid principal id: " + principal_id)
+        statements = []
+        for statement, resources in self.statements:
+            rendered = dict(statement)
+            rendered['Resource'] = [principal_id.join(parts) for parts in resources]
+            statements.append(rendered)
+        return {
+            'principalId': principal_id,
+            'policyDocument': {'Version': self.version, 'Statement': statements},
+        }
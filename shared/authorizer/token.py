@@ -0,0 +1,84 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Token validation code based on https://github.com/awslabs/aws-support-tools/blob/master/Cognito/decode-verify-jwt/decode-verify-jwt.py
+
+import time
+from jose import jwk, jwt
+from jose.utils import base64url_decode
+from .jwks import JwksCache
+from .token_cache import VerifiedTokenCache
+
+
+def cognito_jwks_url(region, user_pool_id):
+    # KEYS_URL -- REPLACE WHEN CHANGING IDENTITY PROVIDER!!
+    return f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
+
+
+class TokenValidator(object):
+    """Verifies Cognito ID tokens against the user pool's public keys.
+
+    Public keys are downloaded through a JwksCache and constructed once per kid, and the
+    claims of verified tokens are kept in a VerifiedTokenCache until they expire."""
+
+    def __init__(self, user_pool_id, app_client_id, jwks_cache=None, verified_tokens=None):
+        self.user_pool_id = user_pool_id
+        self.app_client_id = app_client_id
+        self.jwks_cache = jwks_cache
+        self.verified_tokens = verified_tokens if verified_tokens is not None else VerifiedTokenCache()
+        # constructed public keys by kid, next to the JWK they were built from
+        self._public_keys = {}
+
+    def get_public_key(self, kid, key):
+        """Returns the constructed public key for a JWK, building it only once per kid"""
+        cached = self._public_keys.get(kid)
+        # a refreshed key set holds new JWK objects, rebuild the key in that case
+        if cached is None or cached[0] is not key:
+            cached = (key, jwk.construct(key))
+            self._public_keys[kid] = cached
+        return cached[1]
+
+    def validate(self, token, region):
+        """Returns the claims of a valid token, False otherwise"""
+        # repeat calls with a token that was verified before skip signature verification
+        cached_claims = self.verified_tokens.get(token)
+        if cached_claims is not None:
+            return cached_claims
+        if self.jwks_cache is None:
+            self.jwks_cache = JwksCache(cognito_jwks_url(region, self.user_pool_id))
+
+        # get the kid from the headers prior to verification
+        headers = jwt.get_unverified_headers(token)
+        kid = headers['kid']
+        # look up the kid in the cached public keys
+        key = self.jwks_cache.get_key(kid)
+        if key is None:
+            print('Public key not found in jwks.json')
+            return False
+        # construct the public key
+        public_key = self.get_public_key(kid, key)
+        # get the last two sections of the token,
+        # message and signature (encoded in base64)
+        message, encoded_signature = str(token).rsplit('.', 1)
+        # decode the signature
+        decoded_signature = base64url_decode(encoded_signature.encode('utf-8'))
+        # verify the signature
+        if not public_key.verify(message.encode("utf8"), decoded_signature):
+            print('Signature verification failed')
+            return False
+        print('Signature successfully verified')
+        # since verification succeeded, you can now safely use the unverified claims
+        claims = jwt.get_unverified_claims(token)
+
+        # Additionally you can verify the token expiration
+        if time.time() > claims['exp']:
+            print('Token is expired')
+            return False
+        # and the Audience  (use claims['client_id'] if verifying an access token)
+        if claims['aud'] != self.app_client_id:
+            print('Token was not issued for this audience')
+            return False
+        # the signature, expiration and audience are verified at this point, so the claims
+        # are returned as is instead of decoding and verifying the token a second time
+        self.verified_tokens.put(token, claims)
+        return claims
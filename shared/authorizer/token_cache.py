@@ -0,0 +1,52 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '1000'))
+
+
+class VerifiedTokenCache(object):
+    """Bounded LRU of the claims of tokens whose signature has already been verified.
+
+    Entries are keyed by the SHA-256 of the token, so raw tokens are never kept in memory,
+    and expire at the token's own 'exp' claim."""
+
+    def __init__(self, max_size=TOKEN_CACHE_SIZE, clock=time.time):
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(token):
+        return hashlib.sha256(str(token).encode('utf-8')).digest()
+
+    def get(self, token):
+        """Returns the cached claims of the token, or None if it isn't cached or has expired"""
+        token_hash = self._hash(token)
+        with self._lock:
+            claims = self._entries.get(token_hash)
+            if claims is None:
+                return None
+            if self._clock() > claims['exp']:
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return claims
+
+    def put(self, token, claims):
+        """Caches the claims of a verified token until its expiration time"""
+        token_hash = self._hash(token)
+        with self._lock:
+            self._entries[token_hash] = claims
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import threading
+import time
+import boto3
+from botocore.config import Config
+
+# Tuned for short lived Lambda requests: fail fast on connection problems, keep
+# connections alive between invocations and retry throttling with the standard mode.
+BOTO_CONFIG = Config(
+    connect_timeout=float(os.getenv('BOTO_CONNECT_TIMEOUT', '2')),
+    read_timeout=float(os.getenv('BOTO_READ_TIMEOUT', '5')),
+    max_pool_connections=int(os.getenv('BOTO_MAX_POOL_CONNECTIONS', '10')),
+    retries={
+        'mode': os.getenv('BOTO_RETRY_MODE', 'standard'),
+        'max_attempts': int(os.getenv('BOTO_MAX_ATTEMPTS', '3')),
+    },
+    tcp_keepalive=True,
+)
+
+# Opt-in: get_table returns a dynamodb_client.ClientTable, which talks to the low level
+# client with a faster marshaller, instead of the boto3 Table resource
+DDB_LOW_LEVEL_CLIENT = os.getenv('DDB_LOW_LEVEL_CLIENT', 'false').lower() == 'true'
+
+# Milliseconds spent creating each client and resource, by "client:<service>" or
+# "resource:<service>" key, e.g. to report the share of the cold start spent in boto3
+init_timings = {}
+
+_clients = {}
+_resources = {}
+_tables = {}
+# boto3's default session is not thread safe, creation is serialized
+_lock = threading.Lock()
+
+
+def _create(kind, service_name, factory):
+    start = time.perf_counter()
+    created = factory(service_name, config=BOTO_CONFIG)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    init_timings[f'{kind}:{service_name}'] = elapsed_ms
+    print(f'Created {service_name} {kind} in {elapsed_ms:.1f} ms')
+    return created
+
+
+def get_resource(service_name='dynamodb'):
+    """Returns the boto3 resource of a service, created on first use and shared by every
+    module of the function"""
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = _create('resource', service_name, boto3.resource)
+                _resources[service_name] = resource
+    return resource
+
+
+def get_client(service_name):
+    """Returns the low level client of a service, created on first use. Unless
+    DDB_LOW_LEVEL_CLIENT is set, the DynamoDB client is the one backing the DynamoDB
+    resource, so both share a connection pool."""
+    if service_name == 'dynamodb' and not DDB_LOW_LEVEL_CLIENT:
+        return get_resource('dynamodb').meta.client
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _create('client', service_name, boto3.client)
+                _clients[service_name] = client
+    return client
+
+
+def get_table(table_name):
+    """Returns the DynamoDB Table resource for a table name, created on first use, or
+    an equivalent ClientTable when DDB_LOW_LEVEL_CLIENT is set"""
+    table = _tables.get(table_name)
+    if table is None:
+        if DDB_LOW_LEVEL_CLIENT:
+            from dynamodb_client import ClientTable
+            table = ClientTable(table_name, get_client('dynamodb'))
+        else:
+            table = get_resource('dynamodb').Table(table_name)
+        # several threads may create the same table, setdefault keeps the first one.
+        # _lock can't be held here, get_client and get_resource take it.
+        table = _tables.setdefault(table_name, table)
+    return table
+
+
+def clear_cache():
+    """Drops the memoized clients and resources, the next call creates new ones"""
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _tables.clear()
+        init_timings.clear()
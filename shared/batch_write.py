@@ -0,0 +1,44 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import random
+import time
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_clients import get_resource
+
+# BatchWriteItem accepts at most 25 put or delete requests
+MAX_BATCH_SIZE = 25
+BATCH_WRITE_MAX_ATTEMPTS = int(os.getenv('BATCH_WRITE_MAX_ATTEMPTS', '5'))
+BATCH_WRITE_BASE_DELAY_MS = int(os.getenv('BATCH_WRITE_BASE_DELAY_MS', '50'))
+
+
+def batch_write(table_name, write_requests, max_attempts=BATCH_WRITE_MAX_ATTEMPTS,
+                base_delay_ms=BATCH_WRITE_BASE_DELAY_MS, sleep=time.sleep):
+    """Writes PutRequest/DeleteRequest dicts to a table with BatchWriteItem calls of up
+    to 25 requests. Unprocessed items are retried with exponential backoff and full
+    jitter, up to max_attempts calls per chunk.
+
+    The requests must not contain two operations on the same key, DynamoDB rejects such
+    batches. Returns the requests that were still unprocessed after the last attempt,
+    including every request of a chunk whose call failed (throttling after the client's
+    retries, validation errors, network errors), so callers only retry the affected items.
+    It is safe to call from several threads, they share the client of the DynamoDB resource."""
+    # clients are thread safe, unlike resources, and this one converts the values
+    dynamodb = get_resource('dynamodb').meta.client
+    failed = []
+    for start in range(0, len(write_requests), MAX_BATCH_SIZE):
+        pending = write_requests[start:start + MAX_BATCH_SIZE]
+        for attempt in range(max_attempts):
+            if attempt:
+                sleep(random.uniform(0, base_delay_ms * 2 ** (attempt - 1)) / 1000)
+            try:
+                response = dynamodb.batch_write_item(RequestItems={table_name: pending})
+            except (BotoCoreError, ClientError) as err:
+                print(f'BatchWriteItem of {len(pending)} request(s) to {table_name} failed: {err}')
+                break
+            pending = response.get('UnprocessedItems', {}).get(table_name, [])
+            if not pending:
+                break
+        failed.extend(pending)
+    return failed
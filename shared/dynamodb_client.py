@@ -0,0 +1,142 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from decimal import Decimal
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# boto3's TypeSerializer/TypeDeserializer run a chain of isinstance checks for every
+# value. The items of our tables (users, orders, addresses, favorites) only hold
+# strings, numbers, booleans, nulls, maps and lists, so those are converted through
+# dispatch tables keyed by the exact type / attribute value tag. Anything else, e.g.
+# sets, binary values or subclasses of the built-in types, falls back to boto3.
+_fallback_serializer = TypeSerializer()
+_fallback_deserializer = TypeDeserializer()
+
+
+def serialize(value):
+    """Converts a Python value to a DynamoDB attribute value, like TypeSerializer"""
+    serializer = _SERIALIZERS.get(type(value))
+    if serializer is None:
+        return _fallback_serializer.serialize(value)
+    return serializer(value)
+
+
+def serialize_item(item):
+    """Converts a dict of Python values to a DynamoDB item (or key)"""
+    return {name: serialize(value) for name, value in item.items()}
+
+
+def _serialize_float(value):
+    raise TypeError('Float types are not supported. Use Decimal types instead.')
+
+
+_SERIALIZERS = {
+    str: lambda value: {'S': value},
+    bool: lambda value: {'BOOL': value},
+    int: lambda value: {'N': str(value)},
+    Decimal: lambda value: {'N': str(value)},
+    float: _serialize_float,
+    type(None): lambda value: {'NULL': True},
+    dict: lambda value: {'M': {name: serialize(item) for name, item in value.items()}},
+    list: lambda value: {'L': [serialize(item) for item in value]},
+    tuple: lambda value: {'L': [serialize(item) for item in value]},
+}
+
+
+def deserialize(attribute_value):
+    """Converts a DynamoDB attribute value to a Python value, like TypeDeserializer"""
+    for tag, value in attribute_value.items():
+        deserializer = _DESERIALIZERS.get(tag)
+        if deserializer is None:
+            return _fallback_deserializer.deserialize(attribute_value)
+        return deserializer(value)
+    raise TypeError('Value must be a nonempty dictionary whose key is a valid dynamodb type.')
+
+
+def deserialize_item(item):
+    """Converts a DynamoDB item (or key) to a dict of Python values"""
+    return {name: deserialize(value) for name, value in item.items()}
+
+
+_DESERIALIZERS = {
+    'S': lambda value: value,
+    'N': Decimal,
+    'BOOL': lambda value: value,
+    'NULL': lambda value: None,
+    'M': lambda value: {name: deserialize(item) for name, item in value.items()},
+    'L': lambda value: [deserialize(item) for item in value],
+}
+
+# request parameters holding a key or an item, and response fields holding one or more
+_ITEM_PARAMETERS = ('Key', 'Item', 'ExclusiveStartKey')
+_ITEM_RESPONSE_FIELDS = ('Item', 'Attributes', 'LastEvaluatedKey')
+_CONDITION_PARAMETERS = (
+    ('KeyConditionExpression', True),
+    ('FilterExpression', False),
+    ('ConditionExpression', False),
+)
+
+
+class ClientTable(object):
+    """Drop-in replacement for the boto3 Table resource that calls the low level client
+    and converts the requests and responses with the dispatch table marshaller.
+
+    It supports the Table methods the services use, with the same arguments, including
+    boto3.dynamodb.conditions objects, and the same return values. The client must be a
+    plain DynamoDB client, not the meta.client of a resource, which converts values itself."""
+
+    def __init__(self, table_name, client):
+        self.name = table_name
+        self.client = client
+
+    def _call(self, operation, kwargs):
+        request = dict(kwargs, TableName=self.name)
+        names = dict(request.get('ExpressionAttributeNames') or {})
+        values = {
+            placeholder: serialize(value)
+            for placeholder, value in (request.get('ExpressionAttributeValues') or {}).items()
+        }
+        # a single builder keeps the generated placeholders unique across expressions
+        builder = ConditionExpressionBuilder()
+        for parameter, is_key_condition in _CONDITION_PARAMETERS:
+            condition = request.get(parameter)
+            if isinstance(condition, ConditionBase):
+                built = builder.build_expression(condition, is_key_condition=is_key_condition)
+                request[parameter] = built.condition_expression
+                names.update(built.attribute_name_placeholders)
+                for placeholder, value in built.attribute_value_placeholders.items():
+                    values[placeholder] = serialize(value)
+        if names:
+            request['ExpressionAttributeNames'] = names
+        if values:
+            request['ExpressionAttributeValues'] = values
+        for parameter in _ITEM_PARAMETERS:
+            if parameter in request:
+                request[parameter] = serialize_item(request[parameter])
+
+        response = getattr(self.client, operation)(**request)
+        for field in _ITEM_RESPONSE_FIELDS:
+            if field in response:
+                response[field] = deserialize_item(response[field])
+        if 'Items' in response:
+            response['Items'] = [deserialize_item(item) for item in response['Items']]
+        return response
+
+    def get_item(self, **kwargs):
+        return self._call('get_item', kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call('put_item', kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call('update_item', kwargs)
+
+    def delete_item(self, **kwargs):
+        return self._call('delete_item', kwargs)
+
+    def query(self, **kwargs):
+        return self._call('query', kwargs)
+
+    def scan(self, **kwargs):
+        return self._call('scan', kwargs)
@@ -0,0 +1,152 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import time
+from aws_clients import get_resource, get_table
+
+# The summary of a user's orders is an item of the Orders table, in a partition of its own
+# next to the user's orders partition. User ids are Cognito subs and never start with '#',
+# so no order key can collide with a summary or a marker. Neither has a top level orderTime
+# or data, so they are left out of the userOrderTimeIndex and the order stream consumers.
+SUMMARY_PARTITION_PREFIX = '#summary#'
+SUMMARY_ORDER_ID = '#summary'
+ORDER_COUNT = 'orderCount'
+TOTAL_SPEND = 'totalSpend'
+# Each stream record applied to a summary leaves a marker item, keyed by the record's
+# eventID, written in the same transaction as the summary update. The markers expire
+# after the 24 hours a stream keeps its records (TTL on expiresAt).
+APPLIED_MARKER_PARTITION_PREFIX = '#applied#'
+MARKER_TTL_SECONDS = 24 * 3600
+# a transaction holds the markers of up to 24 records and the summary update
+MAX_TRANSACTION_ITEMS = 25
+# orders by status are counted in top level attributes, ADD can't create nested maps
+STATUS_COUNT_PREFIX = 'count#'
+# Only orders flagged with this top level attribute are counted. create_order flags new
+# orders, the summary backfill flags the orders written before the summaries were kept, and
+# the stream counts each order when its flag shows up, so no order is counted twice.
+IN_SUMMARY = 'inSummary'
+
+
+class InconsistentSummaryError(Exception):
+    """The counters of a summary contradict each other, e.g. negative counts"""
+
+
+def status_count(status):
+    """Name of the attribute counting the orders with a status"""
+    return STATUS_COUNT_PREFIX + status
+
+
+def summary_key(user_id):
+    """Key of the summary item of a user"""
+    return {'userId': SUMMARY_PARTITION_PREFIX + user_id, 'orderId': SUMMARY_ORDER_ID}
+
+
+def marker_key(user_id, event_id):
+    """Key of the marker left by a stream record applied to a user's summary"""
+    return {'userId': APPLIED_MARKER_PARTITION_PREFIX + user_id, 'orderId': event_id}
+
+
+def order_summary(item):
+    """Converts a summary item, or None for a user without orders, to the API form. Raises
+    InconsistentSummaryError rather than report counters that can't be right."""
+    item = item or {}
+    summary = {
+        'orderCount': item.get(ORDER_COUNT, 0),
+        'totalSpend': item.get(TOTAL_SPEND, 0),
+        'statusCounts': {
+            name[len(STATUS_COUNT_PREFIX):]: count
+            for name, count in item.items()
+            if name.startswith(STATUS_COUNT_PREFIX) and count
+        },
+    }
+    counts = summary['statusCounts'].values()
+    if (summary['orderCount'] < 0 or summary['totalSpend'] < 0 or any(count < 0 for count in counts)
+            or sum(counts) != summary['orderCount']):
+        raise InconsistentSummaryError(f"Inconsistent order summary: {summary}")
+    return summary
+
+
+def get_order_summary(table_name, user_id):
+    """Reads the summary of a user's orders with a single GetItem"""
+    response = get_table(table_name).get_item(Key=summary_key(user_id))
+    return order_summary(response.get('Item'))
+
+
+def get_order_count(table_name, user_id):
+    """Reads only the number of orders of a user"""
+    response = get_table(table_name).get_item(
+        Key=summary_key(user_id),
+        ProjectionExpression='#c',
+        ExpressionAttributeNames={'#c': ORDER_COUNT}
+    )
+    order_count = response.get('Item', {}).get(ORDER_COUNT, 0)
+    if order_count < 0:
+        raise InconsistentSummaryError(f"Inconsistent order count: {order_count}")
+    return order_count
+
+
+def summary_transaction(table_name, user_id, changes, expires_at):
+    """TransactWriteItems items applying (event id, deltas) changes to a summary: one
+    marker per change, which must not exist yet, then a single ADD of the summed deltas"""
+    items = [{
+        'Put': {
+            'TableName': table_name,
+            'Item': {**marker_key(user_id, event_id), 'expiresAt': expires_at},
+            'ConditionExpression': 'attribute_not_exists(orderId)',
+        }
+    } for event_id, deltas in changes]
+
+    totals = {}
+    for event_id, deltas in changes:
+        for name, delta in deltas.items():
+            totals[name] = totals.get(name, 0) + delta
+    names = {}
+    values = {}
+    additions = []
+    for i, (name, delta) in enumerate(totals.items()):
+        if not delta:
+            continue
+        names[f'#a{i}'] = name
+        values[f':a{i}'] = delta
+        additions.append(f'#a{i} :a{i}')
+    if additions:
+        items.append({
+            'Update': {
+                'TableName': table_name,
+                'Key': summary_key(user_id),
+                'UpdateExpression': 'ADD ' + ', '.join(additions),
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': values,
+            }
+        })
+    return items
+
+
+def add_to_order_summary(table_name, user_id, changes):
+    """Adds the deltas of a user's changes, a list of (stream record eventID, dict of
+    attribute name to number), to the user's summary with ADD.
+
+    The marker of each record is written in the same transaction as the update, so a
+    record delivered again after a retry is skipped, whatever shard it comes from and in
+    whatever order. Returns the number of changes applied."""
+    # the client of the resource converts the values, like batch_write
+    dynamodb = get_resource('dynamodb').meta.client
+    expires_at = int(time.time()) + MARKER_TTL_SECONDS
+    applied = 0
+    for start in range(0, len(changes), MAX_TRANSACTION_ITEMS - 1):
+        pending = changes[start:start + MAX_TRANSACTION_ITEMS - 1]
+        while pending:
+            try:
+                dynamodb.transact_write_items(
+                    TransactItems=summary_transaction(table_name, user_id, pending, expires_at))
+                applied += len(pending)
+                break
+            except dynamodb.exceptions.TransactionCanceledException as err:
+                # the reasons are in the order of the items, the markers come first
+                reasons = err.response.get('CancellationReasons', [])[:len(pending)]
+                duplicates = {i for i, reason in enumerate(reasons) if reason.get('Code') == 'ConditionalCheckFailed'}
+                if not duplicates:
+                    raise
+                print(f'Skipping {len(duplicates)} change(s) already applied to the order summary of user {user_id}')
+                pending = [change for i, change in enumerate(pending) if i not in duplicates]
+    return applied
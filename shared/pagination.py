@@ -0,0 +1,42 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import base64
+import binascii
+import json
+from decimal import Decimal
+from response import dumps
+
+
+def encode_next_token(last_evaluated_key):
+    """Wraps a DynamoDB LastEvaluatedKey into an opaque, URL safe cursor"""
+    if not last_evaluated_key:
+        return None
+    raw = dumps(last_evaluated_key)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('utf-8')
+
+
+def decode_next_token(next_token):
+    """Turns a cursor produced by encode_next_token back into an ExclusiveStartKey"""
+    try:
+        start_key = json.loads(
+            base64.urlsafe_b64decode(next_token.encode('utf-8')), parse_float=Decimal
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid nextToken')
+    if not isinstance(start_key, dict):
+        raise ValueError('Invalid nextToken')
+    return start_key
+
+
+def parse_page_size(value, default, maximum):
+    """Validates a 'limit' query parameter, falling back to the default page size"""
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f'Invalid limit: {value}')
+    if limit < 1 or limit > maximum:
+        raise ValueError(f'limit must be between 1 and {maximum}')
+    return limit
@@ -0,0 +1,46 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import random
+import time
+from botocore.exceptions import BotoCoreError, ClientError
+from aws_clients import get_client
+
+# PutEvents accepts at most 10 entries
+MAX_ENTRIES = 10
+PUT_EVENTS_MAX_ATTEMPTS = int(os.getenv('PUT_EVENTS_MAX_ATTEMPTS', '5'))
+PUT_EVENTS_BASE_DELAY_MS = int(os.getenv('PUT_EVENTS_BASE_DELAY_MS', '50'))
+
+
+def put_events(entries, max_attempts=PUT_EVENTS_MAX_ATTEMPTS,
+               base_delay_ms=PUT_EVENTS_BASE_DELAY_MS, sleep=time.sleep):
+    """Sends EventBridge entries with PutEvents calls of up to 10 entries. Entries
+    EventBridge reports as failed are retried with exponential backoff and full jitter,
+    up to max_attempts calls per chunk, in their original order.
+
+    Returns the entries that still failed after the last attempt, including every pending
+    entry of a chunk whose call failed (throttling after the client's retries, validation
+    errors, network errors), like batch_write, so callers only retry the affected entries."""
+    events = get_client('events')
+    failed = []
+    for start in range(0, len(entries), MAX_ENTRIES):
+        pending = entries[start:start + MAX_ENTRIES]
+        for attempt in range(max_attempts):
+            if attempt:
+                sleep(random.uniform(0, base_delay_ms * 2 ** (attempt - 1)) / 1000)
+            try:
+                response = events.put_events(Entries=pending)
+            except (BotoCoreError, ClientError) as err:
+                print(f'PutEvents of {len(pending)} entries failed: {err}')
+                break
+            if not response.get('FailedEntryCount'):
+                pending = []
+                break
+            # the result entries are in the order of the request entries
+            pending = [
+                entry for entry, result in zip(pending, response['Entries'])
+                if result.get('ErrorCode')
+            ]
+        failed.extend(pending)
+    return failed
@@ -0,0 +1,100 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import hashlib
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    # orjson is an optional, compiled dependency, the standard library encoder is the fallback
+    orjson = None
+
+# Header dicts are built once and shared by every response, they must not be mutated
+JSON_HEADERS = {'Content-Type': 'application/json'}
+TEXT_HEADERS = {'Content-Type': 'text/plain'}
+
+
+def json_default(value):
+    # DynamoDB returns all numbers as Decimal
+    if isinstance(value, Decimal):
+        return int(value) if value % 1 == 0 else float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def dumps(value):
+        """Serializes a value to a compact JSON string, Decimals included"""
+        return orjson.dumps(value, default=json_default).decode('utf-8')
+else:
+    def dumps(value):
+        """Serializes a value to a compact JSON string, Decimals included"""
+        return json.dumps(value, default=json_default, separators=(',', ':'))
+
+
+def json_response(status_code, body, headers=JSON_HEADERS):
+    """Builds an API Gateway proxy response with a JSON encoded body"""
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': dumps(body),
+    }
+
+
+def text_response(status_code, message, headers=TEXT_HEADERS):
+    """Builds an API Gateway proxy response with a plain text body, e.g. an error message"""
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': message,
+    }
+
+
+def etag(body):
+    """Strong ETag of a response body, a 128 bit BLAKE2 hash which is cheap next to the
+    serialization of the body itself"""
+    return '"' + hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest() + '"'
+
+
+def request_header(event, name):
+    """Returns a header of an API Gateway proxy event, clients may send any casing"""
+    headers = event.get('headers') or {}
+    value = headers.get(name)
+    if value is None:
+        lower_name = name.lower()
+        for header, header_value in headers.items():
+            if header.lower() == lower_name:
+                return header_value
+    return value
+
+
+def etag_matches(event, tag):
+    """True when the If-None-Match header of the request lists the ETag"""
+    if_none_match = request_header(event, 'If-None-Match')
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.replace('W/', '', 1) == tag:
+            return True
+    return False
+
+
+def cacheable_json_response(event, status_code, body, max_age=0, headers=JSON_HEADERS):
+    """Builds a JSON response with ETag and Cache-Control headers, or a 304 Not Modified
+    response without a body when the request's If-None-Match lists the same ETag"""
+    encoded = dumps(body)
+    tag = etag(encoded)
+    response_headers = {**headers, 'ETag': tag, 'Cache-Control': f'private, max-age={max_age}'}
+    if etag_matches(event, tag):
+        return {
+            'statusCode': 304,
+            'headers': response_headers,
+            'body': '',
+        }
+    return {
+        'statusCode': status_code,
+        'headers': response_headers,
+        'body': encoded,
+    }
@@ -0,0 +1,53 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+
+
+class Router(object):
+    """Maps "METHOD resource" route keys of API Gateway proxy events to handler functions.
+
+    Routes are registered with the route decorator at import time. Middleware is applied
+    once when a route is registered, so dispatching a request is a single dict lookup
+    no matter how many routes or middleware there are."""
+
+    def __init__(self):
+        self._routes = {}
+
+    def route(self, method, resource, middleware=()):
+        """Registers the decorated function as the handler of a route. Middleware are
+        callables taking a handler and returning a wrapped handler, the first one in the
+        list is the outermost one."""
+
+        def decorator(func):
+            route_key = f"{method.upper()} {resource}"
+            if route_key in self._routes:
+                raise ValueError(f"Route {route_key} is already registered")
+            handler = func
+            for wrap in reversed(middleware):
+                handler = wrap(handler)
+            self._routes[route_key] = handler
+            return func
+
+        return decorator
+
+    def resolve(self, event):
+        """Returns the handler registered for the event's route, or None"""
+        return self._routes.get(f"{event['httpMethod']} {event['resource']}")
+
+    @property
+    def route_keys(self):
+        return list(self._routes)
+
+
+def json_body(handler):
+    """Middleware that parses the request body as JSON and stores it in event['parsedBody']"""
+
+    def wrapper(event, context):
+        body = event.get('body')
+        if body is None:
+            raise ValueError('Request body is required')
+        event['parsedBody'] = json.loads(body)
+        return handler(event, context)
+
+    return wrapper
@@ -0,0 +1,83 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Latency benchmarks of the authorizer hot path, run them with
+#   python -m pytest tests/benchmark --benchmark-only
+# and compare runs with --benchmark-autosave / --benchmark-compare to catch regressions.
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+from authorizer import Authorizer, JwksCache, TokenValidator, VerifiedTokenCache
+from tests.conftest import MOCK_ADMIN_GROUP_NAME, MOCK_APP_CLIENT_ID, MOCK_METHOD_ARN
+
+# the services live next to the shared layer
+SERVICES_ROOT = Path(__file__).resolve().parents[3]
+
+
+def load_role_rules(service):
+    """The ROLE_RULES of a service's authorizer, so the benchmark can't drift from them"""
+    spec = importlib.util.spec_from_file_location(
+        f'{service}_authorizer', SERVICES_ROOT / service / 'src' / 'api' / 'authorizer.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ROLE_RULES
+
+
+ROLE_RULES = {service: load_role_rules(service) for service in ['users', 'orders']}
+
+
+def make_validator(jwks_file, cache_size=1000):
+    return TokenValidator(
+        'mock-user-pool',
+        MOCK_APP_CLIENT_ID,
+        jwks_cache=JwksCache(jwks_file.as_uri()),
+        verified_tokens=VerifiedTokenCache(max_size=cache_size),
+    )
+
+
+def test_validate_token_cold(benchmark, jwks_file, make_token):
+    """Full RSA verification, the verified token cache is disabled"""
+    validator = make_validator(jwks_file, cache_size=0)
+    token = make_token()
+    validator.validate(token, 'us-east-1')
+    assert benchmark(validator.validate, token, 'us-east-1')
+
+
+def test_validate_token_cached(benchmark, jwks_file, make_token):
+    """Repeat call of a session whose token was verified before"""
+    validator = make_validator(jwks_file)
+    token = make_token()
+    validator.validate(token, 'us-east-1')
+    assert benchmark(validator.validate, token, 'us-east-1')
+
+
+@pytest.mark.parametrize('service', ['users', 'orders'])
+@pytest.mark.parametrize('role', ['user', 'admin'])
+def test_policy_build(benchmark, role, service):
+    """Building a policy from the rules, what every cold template costs"""
+    authorizer = Authorizer(ROLE_RULES[service], validator=None)
+
+    def build():
+        authorizer._templates.clear()
+        return authorizer.get_policy_template(role, '123456789012', 'abcdef123', 'Prod', 'us-east-1')
+
+    assert benchmark(build)
+
+
+@pytest.mark.parametrize('service', ['users', 'orders'])
+@pytest.mark.parametrize('role', ['user', 'admin'])
+def test_policy_render(benchmark, role, service):
+    """Rendering a cached policy template for a principal"""
+    authorizer = Authorizer(ROLE_RULES[service], validator=None)
+    template = authorizer.get_policy_template(role, '123456789012', 'abcdef123', 'Prod', 'us-east-1')
+    assert benchmark(template.render, 'b949a946-7d55-4a95-b177-b4d4429ea55e')
+
+
+@pytest.mark.parametrize('groups', [None, [MOCK_ADMIN_GROUP_NAME]], ids=['user', 'admin'])
+def test_lambda_handler(benchmark, jwks_file, make_token, groups):
+    """End to end authorizer invocation with a warm container"""
+    authorizer = Authorizer(ROLE_RULES['users'], make_validator(jwks_file), admin_group_name=MOCK_ADMIN_GROUP_NAME)
+    event = {'methodArn': MOCK_METHOD_ARN, 'authorizationToken': make_token(groups=groups)}
+    assert benchmark(authorizer.lambda_handler, event, None)
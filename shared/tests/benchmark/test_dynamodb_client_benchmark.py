@@ -0,0 +1,51 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Compares the boto3 Table resource with dynamodb_client.ClientTable, run with
+#   python -m pytest tests/benchmark/test_dynamodb_client_benchmark.py --benchmark-only --benchmark-group-by=func
+# The moto round trips include moto's own request handling, the marshalling benchmarks
+# isolate the part of the latency that differs between both paths.
+
+import boto3
+import pytest
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from dynamodb_client import ClientTable, deserialize_item, serialize_item
+from tests.conftest import MOCK_ORDERS_TABLE_NAME, make_order
+
+ORDER = make_order('user-1', 'order-1', item_count=200)
+ORDER_KEY = {'userId': 'user-1', 'orderId': 'order-1'}
+
+
+def boto3_serialize_item(item, serializer=TypeSerializer()):
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+
+def boto3_deserialize_item(item, deserializer=TypeDeserializer()):
+    return {name: deserializer.deserialize(value) for name, value in item.items()}
+
+
+@pytest.mark.parametrize('serialize', [boto3_serialize_item, serialize_item], ids=['boto3', 'dispatch'])
+def test_serialize_order(benchmark, serialize):
+    assert benchmark(serialize, ORDER) == boto3_serialize_item(ORDER)
+
+
+@pytest.mark.parametrize('deserialize', [boto3_deserialize_item, deserialize_item], ids=['boto3', 'dispatch'])
+def test_deserialize_order(benchmark, deserialize):
+    marshalled = boto3_serialize_item(ORDER)
+    assert benchmark(deserialize, marshalled) == ORDER
+
+
+@pytest.fixture(params=['resource', 'client'])
+def table(request, orders_table):
+    if request.param == 'resource':
+        return orders_table
+    return ClientTable(MOCK_ORDERS_TABLE_NAME, boto3.client('dynamodb'))
+
+
+def test_put_order_moto(benchmark, table):
+    benchmark(table.put_item, Item=ORDER)
+
+
+def test_get_order_moto(benchmark, table):
+    table.put_item(Item=ORDER)
+    assert benchmark(table.get_item, Key=ORDER_KEY)['Item'] == ORDER
@@ -0,0 +1,112 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+import boto3
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from moto import mock_dynamodb
+
+# Modules of the shared Lambda layer are importable at the top level inside Lambda
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+MOCK_KID = 'mock-kid'
+MOCK_APP_CLIENT_ID = 'mock-app-client-id'
+MOCK_ADMIN_GROUP_NAME = 'apiAdmins'
+MOCK_PRINCIPAL_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+MOCK_METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:abcdef123/Prod/GET/users'
+
+
+@pytest.fixture(scope='session')
+def rsa_private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope='session')
+def jwks_file(rsa_private_key, tmp_path_factory):
+    """A stub jwks.json holding the public key of rsa_private_key"""
+    public_pem = rsa_private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = jwk.construct(public_pem, 'RS256').to_dict()
+    public_jwk['kid'] = MOCK_KID
+    public_jwk['use'] = 'sig'
+    path = tmp_path_factory.mktemp('jwks') / 'jwks.json'
+    path.write_text(json.dumps({'keys': [public_jwk]}))
+    return path
+
+
+@pytest.fixture(scope='session')
+def make_token(rsa_private_key):
+    """Returns a function that signs ID tokens with rsa_private_key"""
+    private_pem = rsa_private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+    def _make_token(groups=None, expires_in=3600, audience=MOCK_APP_CLIENT_ID, sub=MOCK_PRINCIPAL_ID):
+        claims = {
+            'sub': sub,
+            'aud': audience,
+            'token_use': 'id',
+            'exp': int(time.time()) + expires_in,
+        }
+        if groups:
+            claims['cognito:groups'] = groups
+        return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': MOCK_KID})
+
+    return _make_token
+
+
+MOCK_ORDERS_TABLE_NAME = 'Orders'
+
+
+def make_order(user_id, order_id, item_count=3):
+    """An orders table item as written by create_order"""
+    return {
+        'userId': user_id,
+        'orderId': order_id,
+        'orderTime': 978307200,
+        'data': {
+            'userId': user_id,
+            'orderId': order_id,
+            'restaurantId': 'restaurant-1',
+            'totalAmount': Decimal('12.5') * item_count,
+            'orderItems': [
+                {'id': i, 'name': f'Item {i}', 'price': Decimal('12.5'), 'quantity': 1, 'extras': None}
+                for i in range(item_count)
+            ],
+            'status': 'PLACED',
+            'paid': False,
+            'orderTime': '2001-01-01T00:00:00Z',
+        }
+    }
+
+
+@pytest.fixture
+def orders_table(monkeypatch):
+    """A moto Orders table, yields its boto3 Table resource"""
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_dynamodb():
+        table = boto3.resource('dynamodb').create_table(
+            TableName=MOCK_ORDERS_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'userId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderId', 'KeyType': 'RANGE'},
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'userId', 'AttributeType': 'S'},
+                {'AttributeName': 'orderId', 'AttributeType': 'S'},
+            ],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        yield table
@@ -0,0 +1,95 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+from authorizer import (
+    PRINCIPAL_ID, Authorizer, HttpVerb, JwksCache, TokenValidator, VerifiedTokenCache
+)
+from tests.conftest import (
+    MOCK_ADMIN_GROUP_NAME, MOCK_APP_CLIENT_ID, MOCK_METHOD_ARN, MOCK_PRINCIPAL_ID
+)
+
+ROLE_RULES = {
+    'user': [(HttpVerb.GET, f"/users/{PRINCIPAL_ID}")],
+    'admin': [(HttpVerb.GET, f"/users/{PRINCIPAL_ID}"), (HttpVerb.GET, "users")],
+}
+
+
+@pytest.fixture
+def authorizer(jwks_file):
+    validator = TokenValidator(
+        'mock-user-pool',
+        MOCK_APP_CLIENT_ID,
+        jwks_cache=JwksCache(jwks_file.as_uri()),
+        verified_tokens=VerifiedTokenCache(),
+    )
+    return Authorizer(ROLE_RULES, validator, admin_group_name=MOCK_ADMIN_GROUP_NAME)
+
+
+def authorize(authorizer, token):
+    return authorizer.lambda_handler(
+        {'methodArn': MOCK_METHOD_ARN, 'authorizationToken': token}, None
+    )
+
+
+def test_user_policy(authorizer, make_token):
+    policy = authorize(authorizer, make_token())
+    assert policy == {
+        'principalId': MOCK_PRINCIPAL_ID,
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{
+                'Action': 'execute-api:Invoke',
+                'Effect': 'Allow',
+                'Resource': [
+                    f'arn:aws:execute-api:us-east-1:123456789012:abcdef123/Prod/GET/users/{MOCK_PRINCIPAL_ID}'
+                ],
+            }],
+        },
+    }
+
+
+def test_admin_policy(authorizer, make_token):
+    policy = authorize(authorizer, make_token(groups=[MOCK_ADMIN_GROUP_NAME]))
+    assert policy['policyDocument']['Statement'][0]['Resource'] == [
+        f'arn:aws:execute-api:us-east-1:123456789012:abcdef123/Prod/GET/users/{MOCK_PRINCIPAL_ID}',
+        'arn:aws:execute-api:us-east-1:123456789012:abcdef123/Prod/GET/users',
+    ]
+
+
+def test_policy_template_is_reused_across_principals(authorizer, make_token):
+    authorize(authorizer, make_token())
+    policy = authorize(authorizer, make_token(sub='another-user'))
+    assert policy['principalId'] == 'another-user'
+    assert policy['policyDocument']['Statement'][0]['Resource'] == [
+        'arn:aws:execute-api:us-east-1:123456789012:abcdef123/Prod/GET/users/another-user'
+    ]
+    assert len(authorizer._templates) == 1
+
+
+def test_verified_token_is_cached(authorizer, make_token):
+    token = make_token()
+    authorize(authorizer, token)
+    assert authorizer.validator.verified_tokens.get(token)['sub'] == MOCK_PRINCIPAL_ID
+
+
+@pytest.mark.parametrize('token_kwargs', [
+    {'expires_in': -10},
+    {'audience': 'another-app-client'},
+])
+def test_invalid_token_is_rejected(authorizer, make_token, token_kwargs):
+    with pytest.raises(Exception, match='Unauthorized'):
+        authorize(authorizer, make_token(**token_kwargs))
+
+
+def test_tampered_token_is_rejected(authorizer, make_token):
+    # the admin claims of another token with the signature of a regular user token
+    header, _, signature = make_token().split('.')
+    _, other_payload, _ = make_token(groups=[MOCK_ADMIN_GROUP_NAME]).split('.')
+    with pytest.raises(Exception, match='Unauthorized'):
+        authorize(authorizer, '.'.join([header, other_payload, signature]))
+
+
+def test_rules_must_declare_both_roles():
+    with pytest.raises(ValueError):
+        Authorizer({'user': []}, validator=None)
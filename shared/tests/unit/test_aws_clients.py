@@ -0,0 +1,55 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+import aws_clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    aws_clients.clear_cache()
+    yield
+    aws_clients.clear_cache()
+
+
+def test_resource_is_created_once():
+    resource = aws_clients.get_resource('dynamodb')
+    assert aws_clients.get_resource('dynamodb') is resource
+    assert set(aws_clients.init_timings) == {'resource:dynamodb'}
+    assert resource.meta.client.meta.config.connect_timeout == aws_clients.BOTO_CONFIG.connect_timeout
+    assert resource.meta.client.meta.config.retries['mode'] == 'standard'
+
+
+def test_dynamodb_client_is_shared_with_resource(monkeypatch):
+    monkeypatch.setattr(aws_clients, 'DDB_LOW_LEVEL_CLIENT', False)
+    client = aws_clients.get_client('dynamodb')
+    assert client is aws_clients.get_resource('dynamodb').meta.client
+
+
+def test_low_level_dynamodb_client_is_its_own(monkeypatch):
+    monkeypatch.setattr(aws_clients, 'DDB_LOW_LEVEL_CLIENT', True)
+    client = aws_clients.get_client('dynamodb')
+    assert aws_clients.get_client('dynamodb') is client
+    assert 'resource:dynamodb' not in aws_clients.init_timings
+
+
+def test_client_is_created_once():
+    client = aws_clients.get_client('s3')
+    assert aws_clients.get_client('s3') is client
+    assert 'client:s3' in aws_clients.init_timings
+
+
+def test_table_is_memoized():
+    table = aws_clients.get_table('Users')
+    assert table.name == 'Users'
+    assert aws_clients.get_table('Users') is table
+    assert aws_clients.get_table('Orders') is not table
+
+
+def test_table_is_shared_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tables = list(executor.map(lambda _: aws_clients.get_table('Users'), range(32)))
+    assert all(table is tables[0] for table in tables)
+    assert aws_clients.get_table('Users') is tables[0]
@@ -0,0 +1,82 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from types import SimpleNamespace
+from botocore.exceptions import ClientError
+
+import batch_write as batch_write_module
+from batch_write import batch_write
+
+
+def put_request(i):
+    return {'PutRequest': {'Item': {'userId': f'user-{i}', 'orderId': 'order-1'}}}
+
+
+class FlakyDynamoDB(object):
+    """Stands in for the DynamoDB client, leaves the last request of a call
+    unprocessed for the first `failures` calls"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def batch_write_item(self, RequestItems):
+        (table_name, requests), = RequestItems.items()
+        self.calls.append(requests)
+        if self.failures:
+            self.failures -= 1
+            return {'UnprocessedItems': {table_name: requests[-1:]}}
+        return {'UnprocessedItems': {}}
+
+
+def test_chunks_of_25(monkeypatch):
+    dynamodb = FlakyDynamoDB(failures=0)
+    monkeypatch.setattr(batch_write_module, 'get_resource', lambda service_name: SimpleNamespace(meta=SimpleNamespace(client=dynamodb)))
+    requests = [put_request(i) for i in range(60)]
+    assert batch_write('Orders', requests) == []
+    assert [len(call) for call in dynamodb.calls] == [25, 25, 10]
+
+
+def test_unprocessed_items_are_retried_with_backoff(monkeypatch):
+    dynamodb = FlakyDynamoDB(failures=2)
+    monkeypatch.setattr(batch_write_module, 'get_resource', lambda service_name: SimpleNamespace(meta=SimpleNamespace(client=dynamodb)))
+    delays = []
+    requests = [put_request(i) for i in range(3)]
+    assert batch_write('Orders', requests, base_delay_ms=100, sleep=delays.append) == []
+    assert dynamodb.calls == [requests, requests[-1:], requests[-1:]]
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 0.1 and 0 <= delays[1] <= 0.2
+
+
+def test_gives_up_after_max_attempts(monkeypatch):
+    dynamodb = FlakyDynamoDB(failures=10)
+    monkeypatch.setattr(batch_write_module, 'get_resource', lambda service_name: SimpleNamespace(meta=SimpleNamespace(client=dynamodb)))
+    requests = [put_request(i) for i in range(3)]
+    assert batch_write('Orders', requests, max_attempts=3, sleep=lambda delay: None) == requests[-1:]
+    assert len(dynamodb.calls) == 3
+
+
+class FailingDynamoDB(FlakyDynamoDB):
+    """Raises a ClientError for the calls holding the given request"""
+
+    def __init__(self, failing_request):
+        super().__init__(failures=0)
+        self.failing_request = failing_request
+
+    def batch_write_item(self, RequestItems):
+        (table_name, requests), = RequestItems.items()
+        if self.failing_request in requests:
+            self.calls.append(requests)
+            raise ClientError(
+                {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Throttled'}},
+                'BatchWriteItem')
+        return super().batch_write_item(RequestItems)
+
+
+def test_failed_chunks_are_returned(monkeypatch):
+    requests = [put_request(i) for i in range(60)]
+    dynamodb = FailingDynamoDB(requests[30])
+    monkeypatch.setattr(batch_write_module, 'get_resource', lambda service_name: SimpleNamespace(meta=SimpleNamespace(client=dynamodb)))
+    # the other chunks are still written, only the failed one is returned
+    assert batch_write('Orders', requests, sleep=lambda delay: None) == requests[25:50]
+    assert [len(call) for call in dynamodb.calls] == [25, 25, 10]
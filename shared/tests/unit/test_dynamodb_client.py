@@ -0,0 +1,98 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import boto3
+import pytest
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+import aws_clients
+from dynamodb_client import ClientTable, deserialize_item, serialize, serialize_item
+from tests.conftest import MOCK_ORDERS_TABLE_NAME, make_order
+
+
+def test_marshaller_matches_boto3():
+    item = make_order('user-1', 'order-1')
+    item['tags'] = {'veggie', 'spicy'}
+    item['large'] = 12345678901234567890
+    expected = {name: TypeSerializer().serialize(value) for name, value in item.items()}
+    assert serialize_item(item) == expected
+    assert deserialize_item(expected) == {
+        name: TypeDeserializer().deserialize(value) for name, value in expected.items()
+    }
+
+
+def test_marshaller_rejects_floats():
+    with pytest.raises(TypeError):
+        serialize({'price': 1.5})
+
+
+@pytest.fixture
+def client_table(orders_table):
+    # the resource's meta.client converts values itself, ClientTable needs a plain client
+    return ClientTable(MOCK_ORDERS_TABLE_NAME, boto3.client('dynamodb'))
+
+
+def test_put_and_get_item(orders_table, client_table):
+    order = make_order('user-1', 'order-1')
+    client_table.put_item(Item=order, ConditionExpression='attribute_not_exists(orderId)')
+    key = {'userId': 'user-1', 'orderId': 'order-1'}
+    assert client_table.get_item(Key=key)['Item'] == orders_table.get_item(Key=key)['Item'] == order
+    assert 'Item' not in client_table.get_item(Key={'userId': 'user-1', 'orderId': 'missing'})
+
+
+def test_update_item_condition(orders_table, client_table):
+    orders_table.put_item(Item=make_order('user-1', 'order-1'))
+    key = {'userId': 'user-1', 'orderId': 'order-1'}
+    response = client_table.update_item(
+        Key=key,
+        UpdateExpression='SET #d.#s = :s',
+        ConditionExpression=Attr('data.status').eq('PLACED'),
+        ExpressionAttributeNames={'#d': 'data', '#s': 'status'},
+        ExpressionAttributeValues={':s': 'SENT'},
+        ReturnValues='ALL_NEW',
+    )
+    assert response['Attributes']['data']['status'] == 'SENT'
+    with pytest.raises(client_table.client.exceptions.ConditionalCheckFailedException):
+        client_table.update_item(
+            Key=key,
+            UpdateExpression='SET #d.#s = :s',
+            ConditionExpression=Attr('data.status').eq('PLACED'),
+            ExpressionAttributeNames={'#d': 'data', '#s': 'status'},
+            ExpressionAttributeValues={':s': 'SENT'},
+        )
+
+
+def test_query_pages(orders_table, client_table):
+    for i in range(3):
+        orders_table.put_item(Item=make_order('user-1', f'order-{i}'))
+    orders_table.put_item(Item=make_order('user-2', 'order-9'))
+
+    first = client_table.query(KeyConditionExpression=Key('userId').eq('user-1'), Limit=2)
+    assert [item['orderId'] for item in first['Items']] == ['order-0', 'order-1']
+    second = client_table.query(
+        KeyConditionExpression=Key('userId').eq('user-1'),
+        FilterExpression=Attr('data.status').eq('PLACED'),
+        ProjectionExpression='#d',
+        ExpressionAttributeNames={'#d': 'data'},
+        ExclusiveStartKey=first['LastEvaluatedKey'],
+    )
+    assert [item['data']['orderId'] for item in second['Items']] == ['order-2']
+
+
+def test_delete_item(orders_table, client_table):
+    orders_table.put_item(Item=make_order('user-1', 'order-1'))
+    client_table.delete_item(Key={'userId': 'user-1', 'orderId': 'order-1'})
+    assert orders_table.scan()['Count'] == 0
+
+
+def test_get_table_opt_in(orders_table, monkeypatch):
+    monkeypatch.setattr(aws_clients, 'DDB_LOW_LEVEL_CLIENT', True)
+    aws_clients.clear_cache()
+    try:
+        table = aws_clients.get_table(MOCK_ORDERS_TABLE_NAME)
+        assert isinstance(table, ClientTable)
+        assert 'resource:dynamodb' not in aws_clients.init_timings
+        table.put_item(Item=make_order('user-1', 'order-1'))
+        assert orders_table.scan()['Count'] == 1
+    finally:
+        aws_clients.clear_cache()
@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from authorizer.jwks import JwksCache
+
+JWKS_URL = 'https://example.com/.well-known/jwks.json'
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFetcher(object):
+    def __init__(self, *key_sets):
+        self.key_sets = list(key_sets)
+        self.calls = 0
+
+    def __call__(self, url):
+        assert url == JWKS_URL
+        keys = self.key_sets[min(self.calls, len(self.key_sets) - 1)]
+        self.calls += 1
+        return [{'kid': kid, 'kty': 'RSA'} for kid in keys]
+
+
+def test_keys_are_fetched_once_and_indexed_by_kid():
+    fetcher = FakeFetcher(['k1', 'k2'])
+    cache = JwksCache(JWKS_URL, fetcher=fetcher, clock=FakeClock())
+    assert cache.get_key('k1')['kid'] == 'k1'
+    assert cache.get_key('k2')['kid'] == 'k2'
+    assert fetcher.calls == 1
+
+
+def test_unknown_kid_refetches_with_rate_limit():
+    clock = FakeClock()
+    fetcher = FakeFetcher(['k1'], ['k1', 'k2'], ['k1', 'k2'])
+    cache = JwksCache(JWKS_URL, miss_refresh_interval=60, fetcher=fetcher, clock=clock)
+    # an unknown kid right after the initial load doesn't download the keys again
+    assert cache.get_key('k2') is None
+    assert fetcher.calls == 1
+    clock.now = 61
+    # rotated key is picked up with a single extra download
+    assert cache.get_key('k2')['kid'] == 'k2'
+    assert fetcher.calls == 2
+    # unknown kids don't hammer the identity provider
+    assert cache.get_key('unknown') is None
+    assert cache.get_key('unknown') is None
+    assert fetcher.calls == 2
+    clock.now = 122
+    assert cache.get_key('unknown') is None
+    assert fetcher.calls == 3
+
+
+def test_expired_keys_are_served_while_refreshing():
+    clock = FakeClock()
+    fetcher = FakeFetcher(['k1'], ['k1', 'k2'])
+    cache = JwksCache(JWKS_URL, ttl=10, fetcher=fetcher, clock=clock)
+    assert cache.get_key('k1') is not None
+    clock.now = 11
+    # the stale key is returned without waiting for the download
+    assert cache.get_key('k1')['kid'] == 'k1'
+    cache._refresh_thread.join(timeout=5)
+    assert fetcher.calls == 2
+    # the refreshed key set is used without a miss refresh
+    assert cache.get_key('k2')['kid'] == 'k2'
+    assert fetcher.calls == 2
+
+
+def test_failed_background_refresh_keeps_stale_keys():
+    clock = FakeClock()
+    calls = []
+
+    def fetcher(url):
+        calls.append(url)
+        if len(calls) > 1:
+            raise OSError('network down')
+        return [{'kid': 'k1'}]
+
+    cache = JwksCache(JWKS_URL, ttl=10, fetcher=fetcher, clock=clock)
+    assert cache.get_key('k1') is not None
+    clock.now = 11
+    assert cache.get_key('k1') is not None
+    cache._refresh_thread.join(timeout=5)
+    assert len(calls) == 2
+    assert cache.get_key('k1') is not None
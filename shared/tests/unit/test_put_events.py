@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from botocore.exceptions import ClientError
+import put_events as put_events_module
+from put_events import put_events
+
+
+def entry(i):
+    return {'Source': 'orders', 'DetailType': 'order.status_changed', 'Detail': f'{{"i": {i}}}'}
+
+
+class FlakyEventBridge(object):
+    """Stands in for the EventBridge client, fails the first entry of a call
+    for the first `failures` calls"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def put_events(self, Entries):
+        self.calls.append(Entries)
+        results = [{'EventId': str(i)} for i in range(len(Entries))]
+        if self.failures:
+            self.failures -= 1
+            results[0] = {'ErrorCode': 'ThrottlingException', 'ErrorMessage': 'Rate exceeded'}
+            return {'FailedEntryCount': 1, 'Entries': results}
+        return {'FailedEntryCount': 0, 'Entries': results}
+
+
+def test_chunks_of_10(monkeypatch):
+    events = FlakyEventBridge(failures=0)
+    monkeypatch.setattr(put_events_module, 'get_client', lambda service_name: events)
+    entries = [entry(i) for i in range(23)]
+    assert put_events(entries) == []
+    assert [len(call) for call in events.calls] == [10, 10, 3]
+
+
+def test_failed_entries_are_retried_with_backoff(monkeypatch):
+    events = FlakyEventBridge(failures=2)
+    monkeypatch.setattr(put_events_module, 'get_client', lambda service_name: events)
+    delays = []
+    entries = [entry(i) for i in range(3)]
+    assert put_events(entries, base_delay_ms=100, sleep=delays.append) == []
+    assert events.calls == [entries, entries[:1], entries[:1]]
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 0.1 and 0 <= delays[1] <= 0.2
+
+
+def test_gives_up_after_max_attempts(monkeypatch):
+    events = FlakyEventBridge(failures=10)
+    monkeypatch.setattr(put_events_module, 'get_client', lambda service_name: events)
+    entries = [entry(i) for i in range(3)]
+    assert put_events(entries, max_attempts=3, sleep=lambda delay: None) == entries[:1]
+    assert len(events.calls) == 3
+
+
+def test_failed_calls_return_the_chunk(monkeypatch):
+    events = FlakyEventBridge(failures=0)
+    send = events.put_events
+
+    def put_events_call(Entries):
+        if Entries[0]['Detail'] == '{"i": 10}':
+            raise ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'Denied'}}, 'PutEvents')
+        return send(Entries)
+
+    events.put_events = put_events_call
+    monkeypatch.setattr(put_events_module, 'get_client', lambda service_name: events)
+    entries = [entry(i) for i in range(23)]
+    # the other chunks are still sent
+    assert put_events(entries, sleep=lambda delay: None) == entries[10:20]
+    assert [len(call) for call in events.calls] == [10, 3]
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import importlib
+import json
+import sys
+from decimal import Decimal
+
+import pytest
+import response
+
+ITEM = {'orderId': 'order-1', 'totalAmount': Decimal('42.3'), 'quantity': Decimal('2'), 'items': [{'price': Decimal('0.1')}]}
+ITEM_JSON = '{"orderId":"order-1","totalAmount":42.3,"quantity":2,"items":[{"price":0.1}]}'
+
+
+@pytest.fixture
+def stdlib_response(monkeypatch):
+    # a None entry in sys.modules makes the orjson import fail
+    monkeypatch.setitem(sys.modules, 'orjson', None)
+    yield importlib.reload(response)
+    monkeypatch.undo()
+    importlib.reload(response)
+
+
+def test_dumps_decimals():
+    assert response.dumps(ITEM) == ITEM_JSON
+
+
+def test_dumps_stdlib_fallback(stdlib_response):
+    assert stdlib_response.orjson is None
+    assert stdlib_response.dumps(ITEM) == ITEM_JSON
+
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        response.dumps({'value': object()})
+
+
+def test_json_response():
+    ret = response.json_response(200, ITEM)
+    assert ret['statusCode'] == 200
+    assert ret['headers'] == {'Content-Type': 'application/json'}
+    assert json.loads(ret['body'])['quantity'] == 2
+
+
+def test_text_response():
+    ret = response.text_response(404, 'Order not found')
+    assert ret == {'statusCode': 404, 'headers': {'Content-Type': 'text/plain'}, 'body': 'Order not found'}
+
+
+def test_cacheable_json_response():
+    ret = response.cacheable_json_response({'headers': None}, 200, ITEM, max_age=30)
+    assert ret['statusCode'] == 200
+    assert ret['body'] == ITEM_JSON
+    assert ret['headers']['Cache-Control'] == 'private, max-age=30'
+    etag = ret['headers']['ETag']
+    assert etag == response.etag(ITEM_JSON)
+
+    for if_none_match in [etag, f'W/{etag}', f'"other", {etag}', '*']:
+        not_modified = response.cacheable_json_response({'headers': {'If-None-Match': if_none_match}}, 200, ITEM)
+        assert not_modified['statusCode'] == 304
+        assert not_modified['body'] == ''
+        assert not_modified['headers']['ETag'] == etag
+
+    changed = response.cacheable_json_response({'headers': {'if-none-match': '"other"'}}, 200, ITEM)
+    assert changed['statusCode'] == 200
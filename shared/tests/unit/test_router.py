@@ -0,0 +1,68 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+from router import Router, json_body
+
+
+def make_event(method, resource, body=None):
+    return {'httpMethod': method, 'resource': resource, 'body': body}
+
+
+def test_resolve_registered_route():
+    router = Router()
+
+    @router.route('GET', '/users/{userid}')
+    def get_user(event, context):
+        return 200, {'userid': '1'}
+
+    handler = router.resolve(make_event('GET', '/users/{userid}'))
+    assert handler(make_event('GET', '/users/{userid}'), None) == (200, {'userid': '1'})
+    assert router.resolve(make_event('DELETE', '/users/{userid}')) is None
+
+
+def test_duplicate_route_is_rejected():
+    router = Router()
+
+    @router.route('GET', '/users')
+    def first(event, context):
+        return 200, []
+
+    with pytest.raises(ValueError):
+        @router.route('get', '/users')
+        def second(event, context):
+            return 200, []
+
+
+def test_middleware_order():
+    router = Router()
+    calls = []
+
+    def middleware(name):
+        def wrap(handler):
+            def wrapper(event, context):
+                calls.append(name)
+                return handler(event, context)
+            return wrapper
+        return wrap
+
+    @router.route('PUT', '/users', middleware=[middleware('outer'), middleware('inner'), json_body])
+    def put_user(event, context):
+        calls.append('handler')
+        return 200, event['parsedBody']
+
+    event = make_event('PUT', '/users', body='{"name": "John Doe"}')
+    assert router.resolve(event)(event, None) == (200, {'name': 'John Doe'})
+    assert calls == ['outer', 'inner', 'handler']
+
+
+def test_json_body_requires_body():
+    router = Router()
+
+    @router.route('PUT', '/users', middleware=[json_body])
+    def put_user(event, context):
+        return 200, event['parsedBody']
+
+    event = make_event('PUT', '/users')
+    with pytest.raises(ValueError):
+        router.resolve(event)(event, None)
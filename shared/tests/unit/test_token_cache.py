@@ -0,0 +1,36 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from authorizer.token_cache import VerifiedTokenCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000
+
+    def __call__(self):
+        return self.now
+
+
+def test_cached_claims_expire_with_the_token():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(clock=clock)
+    cache.put('token-1', {'sub': 'user-1', 'exp': 1010})
+    assert cache.get('token-1') == {'sub': 'user-1', 'exp': 1010}
+    assert cache.get('token-2') is None
+    clock.now = 1011
+    assert cache.get('token-1') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_token_is_evicted():
+    cache = VerifiedTokenCache(max_size=2, clock=FakeClock())
+    cache.put('token-1', {'sub': 'user-1', 'exp': 2000})
+    cache.put('token-2', {'sub': 'user-2', 'exp': 2000})
+    # touch token-1 so that token-2 becomes the least recently used one
+    assert cache.get('token-1') is not None
+    cache.put('token-3', {'sub': 'user-3', 'exp': 2000})
+    assert len(cache) == 2
+    assert cache.get('token-2') is None
+    assert cache.get('token-1') is not None
+    assert cache.get('token-3') is not None
@@ -1,15 +1,13 @@
 import os
-import boto3
 import uuid
 from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_table
 
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 address_table = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(address_table)
 
 
 @tracer.capture_method 
@@ -26,7 +24,7 @@ def add_address(event, context):
     logger.info(f"Saving address for user {user_id}: {line1}, {line2}, {city}, {state_province}, {postal} to DynamoDb {address_table}")
 
     address_id = str(uuid.uuid4())
-    table.put_item(
+    get_table(address_table).put_item(
         Item={
                 'address_id': address_id,
                 'user_id': user_id,
@@ -1,13 +1,11 @@
 import os
-import boto3
 from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_table
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 address_table = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(address_table)
 
 @tracer.capture_method
 def delete_address(event, context):
@@ -25,7 +23,7 @@ def delete_address(event, context):
     logger.info(
         f"Deleting address {address_id} for user {user_id} from DynamoDb {address_table}")
 
-    table.delete_item(
+    get_table(address_table).delete_item(
         Key={
             'user_id': user_id,
             'address_id': address_id
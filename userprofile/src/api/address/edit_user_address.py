@@ -1,14 +1,12 @@
 import os
-import boto3
 from aws_lambda_powertools import Logger, Tracer
+from aws_clients import get_table
 
 # Globals
 
 logger = Logger()
 tracer = Tracer(service="APP")
 address_table = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(address_table)
 
 @tracer.capture_method 
 def update_address(event, context):
@@ -30,7 +28,7 @@ def update_address(event, context):
 
     logger.info(f"Updating address {address_id} for user {user_id}: {line1}, {line2}, {city}, {state_province}, {postal} in DynamoDb {address_table}")
 
-    table.update_item(
+    get_table(address_table).update_item(
         Key={
             'user_id': user_id,
             'address_id': address_id
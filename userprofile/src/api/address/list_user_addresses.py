@@ -1,46 +1,61 @@
-import json
 import os
-import boto3
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.conditions import Key
 from aws_lambda_powertools import Logger, Tracer
+from response import cacheable_json_response, text_response
+from pagination import encode_next_token, decode_next_token, parse_page_size
+from aws_clients import get_table
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 address_table = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(address_table)
+
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '100'))
+# seconds clients may reuse a listing without revalidating it with its ETag
+CACHE_MAX_AGE = int(os.getenv('CACHE_MAX_AGE', '0'))
+
+# user_id is transparent to the user, so it is never read
+ADDRESS_FIELDS = ('address_id', 'line1', 'line2', 'city', 'stateProvince', 'postal')
+PROJECTION_EXPRESSION = ', '.join(f'#f{i}' for i in range(len(ADDRESS_FIELDS)))
+PROJECTION_NAMES = {f'#f{i}': field for i, field in enumerate(ADDRESS_FIELDS)}
 
 @tracer.capture_method 
 def list_addresses(event, context):
-    logger.info(event)
     user_id = event['requestContext']['authorizer']['claims']['sub']
+    params = event.get('queryStringParameters') or {}
     logger.info(f"Retrieving addresses for user %s", user_id)
 
-    response = table.query(
-        KeyConditionExpression=Key('user_id').eq(user_id)
-    )
+    query_kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(user_id),
+        'Limit': parse_page_size(params.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE),
+        'ProjectionExpression': PROJECTION_EXPRESSION,
+        'ExpressionAttributeNames': PROJECTION_NAMES,
+    }
+    if params.get('nextToken'):
+        start_key = decode_next_token(params['nextToken'])
+        if start_key.get('user_id') != user_id:
+            raise ValueError('Invalid nextToken')
+        query_kwargs['ExclusiveStartKey'] = start_key
+
+    response = get_table(address_table).query(**query_kwargs)
     items = response['Items']
-    # remove the user_id property since it should be transparent to the user
-    for item in items:
-        item.pop("user_id", None)
 
-    logger.info(items)
     logger.info(f"Found {len(items)} address(es) for user.")
-    return items
+    page = {"addresses": items}
+    next_token = encode_next_token(response.get('LastEvaluatedKey'))
+    if next_token:
+        page["nextToken"] = next_token
+    return page
 
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     try:
-        addresses = list_addresses(event, context)
-        response = {
-            "statusCode": 200,
-            "headers": {},
-            "body": json.dumps({
-                "addresses": addresses
-            })
-        }
-        return response
+        page = list_addresses(event, context)
+        return cacheable_json_response(event, 200, page, CACHE_MAX_AGE)
+    except ValueError as ve:
+        logger.warning(f"Invalid request: {ve}")
+        return text_response(400, str(ve))
     except Exception as err:
         logger.exception(err)
         raise
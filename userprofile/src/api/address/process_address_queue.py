@@ -0,0 +1,130 @@
+import json
+import os
+import uuid
+from aws_lambda_powertools import Logger, Tracer
+from aws_lambda_powertools.utilities.data_classes import event_source, SQSEvent
+from batch_write import MAX_BATCH_SIZE, batch_write
+
+# Globals
+logger = Logger()
+tracer = Tracer(service="APP")
+address_table = os.getenv('TABLE_NAME')
+
+ADDRESS_FIELDS = ('line1', 'line2', 'city', 'stateProvince', 'postal')
+
+
+def required(detail, name):
+    value = detail.get(name)
+    if value is None or value == '':
+        raise Exception(f"{name} could not be found in the incoming event")
+    return value
+
+
+def address_item(detail, address_id):
+    item = {
+        'address_id': address_id,
+        'user_id': required(detail, 'userId'),
+    }
+    for field in ADDRESS_FIELDS:
+        item[field] = detail[field]
+    return item
+
+
+def added(event):
+    # derived from the EventBridge event id, so a redelivered event overwrites the
+    # address it created the first time instead of adding a duplicate
+    address_id = str(uuid.uuid5(uuid.NAMESPACE_URL, event['id']))
+    return {'PutRequest': {'Item': address_item(event['detail'], address_id)}}
+
+
+def updated(event):
+    # update events carry the whole address, so a put has the same effect as the update
+    detail = event['detail']
+    return {'PutRequest': {'Item': address_item(detail, required(detail, 'addressId'))}}
+
+
+def deleted(event):
+    detail = event['detail']
+    return {'DeleteRequest': {'Key': {
+        'user_id': required(detail, 'userId'),
+        'address_id': required(detail, 'addressId'),
+    }}}
+
+
+# Builds the BatchWriteItem request of an address event, by detail-type
+ROUTES = {
+    'address.added': added,
+    'address.updated': updated,
+    'address.deleted': deleted,
+}
+
+
+def address_write_request(record):
+    """Routes the EventBridge event carried by an SQS message by its detail-type"""
+    event = json.loads(record.body)
+    route = ROUTES.get(event.get('detail-type'))
+    if route is None:
+        raise Exception(f"Event type {event.get('detail-type')} not recognized")
+    return route(event)
+
+
+def address_key(write_request):
+    key = write_request['PutRequest']['Item'] if 'PutRequest' in write_request else write_request['DeleteRequest']['Key']
+    return key['user_id'], key['address_id']
+
+
+def write_addresses(write_requests):
+    """Writes the requests in chunks of MAX_BATCH_SIZE, returns the unprocessed ones. A
+    chunk that fails as a whole is returned as unprocessed, the other chunks are written."""
+    unprocessed = []
+    for start in range(0, len(write_requests), MAX_BATCH_SIZE):
+        chunk = write_requests[start:start + MAX_BATCH_SIZE]
+        try:
+            unprocessed.extend(batch_write(address_table, chunk))
+        except Exception as err:
+            logger.exception("Failed to write a batch of %s address change(s): %s", len(chunk), err)
+            unprocessed.extend(chunk)
+    return unprocessed
+
+
+@tracer.capture_method
+def process_event(event: SQSEvent, context):
+    """Applies a batch of address events with batched writes and returns the messages
+    that failed, so SQS only redelivers those (ReportBatchItemFailures)"""
+    failed_message_ids = []
+    # a later event on the same address replaces an earlier one, BatchWriteItem can't
+    # hold two operations on the same key
+    write_requests = {}
+    message_ids = {}
+    for record in event.records:
+        try:
+            write_request = address_write_request(record)
+        except Exception as err:
+            logger.exception("Invalid address event in message %s: %s", record.message_id, err)
+            failed_message_ids.append(record.message_id)
+            continue
+        key = address_key(write_request)
+        write_requests[key] = write_request
+        message_ids[key] = record.message_id
+
+    unprocessed = write_addresses(list(write_requests.values()))
+    for write_request in unprocessed:
+        failed_message_ids.append(message_ids[address_key(write_request)])
+    logger.info(
+        "Saved %s address change(s) to DynamoDb %s, %s message(s) failed",
+        len(write_requests) - len(unprocessed), address_table, len(failed_message_ids))
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]
+    }
+
+
+@tracer.capture_lambda_handler
+@event_source(data_class=SQSEvent)
+def lambda_handler(event: SQSEvent, context):
+    """Entrypoint for Lambda"""
+    try:
+        return process_event(event, context)
+    except Exception as err:
+        logger.exception(err)
+        raise
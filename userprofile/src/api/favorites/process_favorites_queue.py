@@ -1,64 +1,117 @@
 import os
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 from aws_lambda_powertools import Logger, Tracer
 from aws_lambda_powertools.utilities.data_classes import event_source, SQSEvent
+from batch_write import MAX_BATCH_SIZE, batch_write
 
 # Globals
 logger = Logger()
 tracer = Tracer(service="APP")
 favorites_table = os.getenv('TABLE_NAME')
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(favorites_table)
 
-@tracer.capture_method
-def process_event(event: SQSEvent, context):
-    logger.debug("Full event: %s", str(event))
-    for record in event.records:
-        logger.info("Processing event: %s", record)
+# Batches of different users are written concurrently by this many threads, 1 writes
+# them one after the other. Keep it at or below the botocore connection pool size.
+FAVORITES_CONCURRENCY = int(os.getenv('FAVORITES_CONCURRENCY', '4'))
+# created once and reused by the warm invocations of the container
+executor = ThreadPoolExecutor(max_workers=FAVORITES_CONCURRENCY) if FAVORITES_CONCURRENCY > 1 else None
 
-        restaurant_id = record.body
-        user_id = record.message_attributes['UserId'].string_value
-        command_name = record.message_attributes['CommandName'].string_value
+def favorite_write_request(record):
+    """Builds the BatchWriteItem request for the command carried by an SQS message"""
+    restaurant_id = record.body
+    user_id = record.message_attributes['UserId'].string_value
+    command_name = record.message_attributes['CommandName'].string_value
 
-        if restaurant_id is None or user_id is None or command_name is None:
-            raise Exception("Required command properties are missing")
+    if restaurant_id is None or user_id is None or command_name is None:
+        raise Exception("Required command properties are missing")
 
-        if command_name == "AddFavorite":
-            add_favorite(user_id, restaurant_id)
-        elif command_name == "DeleteFavorite":
-            delete_favorite(user_id, restaurant_id)
-        else:
-            raise Exception(f"Command {command_name} not recognized")
+    key = {
+        'user_id': user_id,
+        'restaurant_id': restaurant_id
+    }
+    if command_name == "AddFavorite":
+        return {'PutRequest': {'Item': key}}
+    if command_name == "DeleteFavorite":
+        return {'DeleteRequest': {'Key': key}}
+    raise Exception(f"Command {command_name} not recognized")
 
 
-@tracer.capture_method
-def add_favorite(user_id, restaurant_id):
-    """Adds a new favorite restaurant to the user's list"""
-    table.put_item(
-        Item={
-            'user_id': user_id,
-            'restaurant_id': restaurant_id
-        }
-    )
-    logger.info(
-        "Favorite restaurant with ID %s saved for user %s",
-        restaurant_id, user_id)
+def favorite_key(write_request):
+    key = write_request['PutRequest']['Item'] if 'PutRequest' in write_request else write_request['DeleteRequest']['Key']
+    return key['user_id'], key['restaurant_id']
+
+
+def user_batches(write_requests):
+    """Partitions the write requests by user and packs the users into batches of up to
+    MAX_BATCH_SIZE requests. A user is never split across batches, so the changes of a
+    user are applied in order by a single batch_write call."""
+    by_user = {}
+    for (user_id, restaurant_id), write_request in write_requests.items():
+        by_user.setdefault(user_id, []).append(write_request)
+
+    batches = []
+    batch = []
+    for user_requests in by_user.values():
+        if batch and len(batch) + len(user_requests) > MAX_BATCH_SIZE:
+            batches.append(batch)
+            batch = []
+        batch.extend(user_requests)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def write_batch(batch):
+    """Writes the batch of a few users, returns its unprocessed requests. A batch that
+    fails as a whole is returned as unprocessed, so it doesn't fail the other batches."""
+    try:
+        return batch_write(favorites_table, batch)
+    except Exception as err:
+        logger.exception("Failed to write a batch of %s favorite change(s): %s", len(batch), err)
+        return batch
+
+
+def write_favorites(write_requests):
+    """Writes the batches of different users concurrently, returns the unprocessed requests"""
+    batches = user_batches(write_requests)
+    if executor is None or len(batches) < 2:
+        return [r for batch in batches for r in write_batch(batch)]
+    results = executor.map(write_batch, batches)
+    return [r for result in results for r in result]
 
 
 @tracer.capture_method
-def delete_favorite(user_id, restaurant_id):
-    """Removes a favorite restaurant from the user's list"""
+def process_event(event: SQSEvent, context):
+    """Saves the favorites commands of a batch and returns the messages that failed, so
+    SQS only redelivers those (ReportBatchItemFailures)"""
+    logger.debug("Full event: %s", str(event))
+    failed_message_ids = []
+    # one write per favorite, a later command on the same favorite replaces an earlier
+    # one since BatchWriteItem can't hold two operations on the same key
+    write_requests = {}
+    message_ids = {}
+    for record in event.records:
+        logger.info("Processing event: %s", record)
+        try:
+            write_request = favorite_write_request(record)
+        except Exception as err:
+            logger.exception("Invalid favorites command in message %s: %s", record.message_id, err)
+            failed_message_ids.append(record.message_id)
+            continue
+        key = favorite_key(write_request)
+        write_requests[key] = write_request
+        message_ids[key] = record.message_id
+
+    unprocessed = write_favorites(write_requests)
+    for write_request in unprocessed:
+        # only the last command on a favorite was written, redelivering it is enough
+        failed_message_ids.append(message_ids[favorite_key(write_request)])
     logger.info(
-        "Deleting favorite restaurant %s for user %s from DynamoDb %s",
-        restaurant_id, user_id, favorites_table)
-
-    table.delete_item(
-        Key={
-            'user_id': user_id,
-            'restaurant_id': restaurant_id
-        }
-    )
-    logger.info("Favorite restaurant with ID %s deleted", restaurant_id)
+        "Saved %s favorite change(s) to DynamoDb %s, %s message(s) failed",
+        len(write_requests) - len(unprocessed), favorites_table, len(failed_message_ids))
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]
+    }
 
 
 @tracer.capture_lambda_handler
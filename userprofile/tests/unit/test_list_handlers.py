@@ -0,0 +1,103 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import boto3
+import pytest
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+MOCK_TABLE_NAME = 'UserProfile'
+# the user of the events/event-read-*.json requests
+MOCK_USER_ID = '788993909'
+
+
+@contextmanager
+def setup_test_environment(sort_key):
+    with mock_dynamodb():
+        boto3.client('dynamodb').create_table(
+            TableName=MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': sort_key, 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': sort_key, 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        yield boto3.resource('dynamodb').Table(MOCK_TABLE_NAME)
+
+
+def read_event(name, **params):
+    with open(f'./events/event-read-{name}.json', 'r') as f:
+        event = json.load(f)
+    event['queryStringParameters'] = params or None
+    event['requestContext']['authorizer']['claims']['sub'] = MOCK_USER_ID
+    return event
+
+
+def mock_address(address_id, user_id=MOCK_USER_ID):
+    return {
+        'user_id': user_id, 'address_id': address_id, 'line1': '123 Main', 'line2': 'Suite 100',
+        'city': 'Seattle', 'stateProvince': 'WA', 'postal': '12345'
+    }
+
+
+@patch.dict(os.environ, {'TABLE_NAME': MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_list_addresses_pages():
+    with setup_test_environment('address_id') as table:
+        for i in range(3):
+            table.put_item(Item=mock_address(f'address-{i}'))
+        table.put_item(Item=mock_address('address-9', user_id='someone-else'))
+        from src.api.address import list_user_addresses
+
+        response = list_user_addresses.lambda_handler(read_event('address', limit='2'), '')
+        assert response['statusCode'] == 200
+        first_page = json.loads(response['body'])
+        assert first_page['addresses'] == [
+            {k: v for k, v in mock_address(f'address-{i}').items() if k != 'user_id'} for i in range(2)
+        ]
+
+        response = list_user_addresses.lambda_handler(
+            read_event('address', limit='2', nextToken=first_page['nextToken']), '')
+        second_page = json.loads(response['body'])
+        assert [a['address_id'] for a in second_page['addresses']] == ['address-2']
+        assert 'nextToken' not in second_page
+
+
+@patch.dict(os.environ, {'TABLE_NAME': MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_list_favorites_etag():
+    with setup_test_environment('restaurant_id') as table:
+        table.put_item(Item={'user_id': MOCK_USER_ID, 'restaurant_id': 'restaurant-1'})
+        from src.api.favorites import list_user_favorites
+
+        response = list_user_favorites.lambda_handler(read_event('favorites'), '')
+        assert response['statusCode'] == 200
+        assert json.loads(response['body']) == {'favorites': [{'restaurant_id': 'restaurant-1'}]}
+        etag = response['headers']['ETag']
+        assert response['headers']['Cache-Control'] == 'private, max-age=0'
+
+        event = read_event('favorites')
+        event['headers'] = {'if-none-match': etag}
+        response = list_user_favorites.lambda_handler(event, '')
+        assert response['statusCode'] == 304
+        assert response['body'] == ''
+
+        # a change of the favorites changes the ETag
+        table.put_item(Item={'user_id': MOCK_USER_ID, 'restaurant_id': 'restaurant-2'})
+        response = list_user_favorites.lambda_handler(event, '')
+        assert response['statusCode'] == 200
+        assert response['headers']['ETag'] != etag
+
+
+@pytest.mark.parametrize('params', [{'limit': '0'}, {'limit': 'all'}, {'nextToken': 'bad'}])
+@patch.dict(os.environ, {'TABLE_NAME': MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_list_favorites_invalid_parameters(params):
+    with setup_test_environment('restaurant_id'):
+        from src.api.favorites import list_user_favorites
+        response = list_user_favorites.lambda_handler(read_event('favorites', **params), '')
+        assert response['statusCode'] == 400
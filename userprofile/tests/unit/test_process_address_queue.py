@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import copy
+import json
+import os
+import boto3
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+ADDRESS_MOCK_TABLE_NAME = 'Address'
+
+with open('./events/event-sqs-add-favorites.json', 'r') as f:
+    SQS_RECORD = json.load(f)['Records'][0]
+
+
+def address_event(name, **detail):
+    with open(f'./events/event-{name}-address.json', 'r') as f:
+        event = json.load(f)
+    event['detail'].update(detail)
+    return event
+
+
+def sqs_record(message_id, event):
+    record = copy.deepcopy(SQS_RECORD)
+    record['messageId'] = message_id
+    record['body'] = json.dumps(event)
+    record['messageAttributes'] = {}
+    return record
+
+
+def sqs_event(*records):
+    return {'Records': list(records)}
+
+
+@contextmanager
+def setup_test_environment():
+    with mock_dynamodb():
+        boto3.client('dynamodb').create_table(
+            TableName=ADDRESS_MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'address_id', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'address_id', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        from src.api.address import process_address_queue
+        yield process_address_queue
+
+
+def addresses():
+    table = boto3.resource('dynamodb').Table(ADDRESS_MOCK_TABLE_NAME)
+    return {(item['user_id'], item['address_id']): item for item in table.scan()['Items']}
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ADDRESS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_events_are_routed_by_detail_type():
+    with setup_test_environment() as process_address_queue:
+        boto3.resource('dynamodb').Table(ADDRESS_MOCK_TABLE_NAME).put_item(Item={
+            'user_id': 'user-1', 'address_id': 'address-2', 'line1': 'old', 'line2': '',
+            'city': 'old', 'stateProvince': 'old', 'postal': 'old'
+        })
+        added = address_event('add', userId='user-1')
+        response = process_address_queue.lambda_handler(sqs_event(
+            sqs_record('1', added),
+            sqs_record('2', address_event('edit', userId='user-1', addressId='address-2')),
+            sqs_record('3', address_event('edit', userId='user-1', addressId='address-3')),
+            sqs_record('4', address_event('delete', userId='user-1', addressId='address-3')),
+        ), '')
+        assert response == {'batchItemFailures': []}
+
+        saved = addresses()
+        assert len(saved) == 2
+        assert saved[('user-1', 'address-2')]['city'] == address_event('edit')['detail']['city']
+        added_address = [item for key, item in saved.items() if key != ('user-1', 'address-2')][0]
+        assert added_address['line1'] == added['detail']['line1']
+
+        # a redelivered add event overwrites the address it created
+        process_address_queue.lambda_handler(sqs_event(sqs_record('1', added)), '')
+        assert len(addresses()) == 2
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ADDRESS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_invalid_events_are_reported():
+    with setup_test_environment() as process_address_queue:
+        unknown = address_event('add')
+        unknown['detail-type'] = 'address.verified'
+        response = process_address_queue.lambda_handler(sqs_event(
+            sqs_record('1', address_event('add', userId='user-1')),
+            sqs_record('2', unknown),
+            sqs_record('3', address_event('delete', userId='user-1', addressId='')),
+            sqs_record('4', address_event('edit', userId='user-1', addressId='address-4')),
+        ), '')
+        assert response == {'batchItemFailures': [{'itemIdentifier': '2'}, {'itemIdentifier': '3'}]}
+        assert len(addresses()) == 2
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ADDRESS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_unprocessed_writes_are_reported():
+    with setup_test_environment() as process_address_queue:
+        def batch_write(table_name, write_requests):
+            return write_requests[-1:]
+
+        with patch.object(process_address_queue, 'batch_write', side_effect=batch_write):
+            response = process_address_queue.lambda_handler(sqs_event(
+                sqs_record('1', address_event('delete', userId='user-1', addressId='address-1')),
+                sqs_record('2', address_event('delete', userId='user-1', addressId='address-2')),
+            ), '')
+        assert response == {'batchItemFailures': [{'itemIdentifier': '2'}]}
+
+
+@patch.dict(os.environ, {'TABLE_NAME': ADDRESS_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_failed_write_calls_are_reported():
+    with setup_test_environment() as process_address_queue:
+        def batch_write(table_name, write_requests):
+            if len(write_requests) < 25:
+                raise RuntimeError('Connection reset')
+            return []
+
+        records = [
+            sqs_record(str(i), address_event('delete', userId='user-1', addressId=f'address-{i}'))
+            for i in range(30)
+        ]
+        with patch.object(process_address_queue, 'batch_write', side_effect=batch_write):
+            response = process_address_queue.lambda_handler(sqs_event(*records), '')
+        # only the messages of the second chunk are redelivered
+        assert response == {'batchItemFailures': [{'itemIdentifier': str(i)} for i in range(25, 30)]}
@@ -0,0 +1,210 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import copy
+import json
+import os
+import boto3
+from moto import mock_dynamodb
+from contextlib import contextmanager
+from unittest.mock import patch
+
+FAVORITES_MOCK_TABLE_NAME = 'Favorites'
+MOCK_USER_ID = 'b949a946-7d55-4a95-b177-b4d4429ea55e'
+
+with open('./events/event-sqs-add-favorites.json', 'r') as f:
+    SQS_RECORD = json.load(f)['Records'][0]
+
+
+def favorite_record(restaurant_id, command_name='AddFavorite', user_id=MOCK_USER_ID):
+    record = copy.deepcopy(SQS_RECORD)
+    record['messageId'] = f'{command_name}-{restaurant_id}'
+    record['body'] = restaurant_id
+    record['messageAttributes']['UserId']['stringValue'] = user_id
+    record['messageAttributes']['CommandName']['stringValue'] = command_name
+    return record
+
+
+def sqs_event(*records):
+    return {'Records': list(records)}
+
+
+@contextmanager
+def setup_test_environment():
+    with mock_dynamodb():
+        boto3.client('dynamodb').create_table(
+            TableName=FAVORITES_MOCK_TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'restaurant_id', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'restaurant_id', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        from src.api.favorites import process_favorites_queue
+        yield process_favorites_queue
+
+
+def favorite_ids(user_id=MOCK_USER_ID):
+    table = boto3.resource('dynamodb').Table(FAVORITES_MOCK_TABLE_NAME)
+    return sorted(item['restaurant_id'] for item in table.scan()['Items'] if item['user_id'] == user_id)
+
+
+def count_batch_writes():
+    import aws_clients
+    client = aws_clients.get_resource('dynamodb').meta.client
+    return patch.object(client, 'batch_write_item', wraps=client.batch_write_item)
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_add_favorites_in_one_batch():
+    with setup_test_environment() as process_favorites_queue:
+        records = [favorite_record(f'restaurant-{i}') for i in range(10)]
+        with count_batch_writes() as batch_write_item:
+            process_favorites_queue.lambda_handler(sqs_event(*records), '')
+        assert batch_write_item.call_count == 1
+        assert favorite_ids() == [f'restaurant-{i}' for i in range(10)]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_last_command_on_a_favorite_wins():
+    with setup_test_environment() as process_favorites_queue:
+        process_favorites_queue.lambda_handler(sqs_event(favorite_record('restaurant-1')), '')
+        process_favorites_queue.lambda_handler(sqs_event(
+            favorite_record('restaurant-1', 'DeleteFavorite'),
+            favorite_record('restaurant-2'),
+            favorite_record('restaurant-2', 'DeleteFavorite'),
+            favorite_record('restaurant-2'),
+        ), '')
+        assert favorite_ids() == ['restaurant-2']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_invalid_messages_are_reported():
+    with setup_test_environment() as process_favorites_queue:
+        missing_user = favorite_record('restaurant-3')
+        del missing_user['messageAttributes']['UserId']
+        response = process_favorites_queue.lambda_handler(sqs_event(
+            favorite_record('restaurant-1'),
+            favorite_record('restaurant-2', 'RateFavorite'),
+            missing_user,
+            favorite_record('restaurant-4'),
+        ), '')
+        assert response == {'batchItemFailures': [
+            {'itemIdentifier': 'RateFavorite-restaurant-2'},
+            {'itemIdentifier': 'AddFavorite-restaurant-3'},
+        ]}
+        assert favorite_ids() == ['restaurant-1', 'restaurant-4']
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_unprocessed_writes_are_reported():
+    with setup_test_environment() as process_favorites_queue:
+        def batch_write(table_name, write_requests):
+            # DynamoDB leaves the favorite of restaurant-2 unprocessed
+            return [r for r in write_requests if r['DeleteRequest']['Key']['restaurant_id'] == 'restaurant-2']
+
+        with patch.object(process_favorites_queue, 'batch_write', side_effect=batch_write):
+            response = process_favorites_queue.lambda_handler(sqs_event(
+                favorite_record('restaurant-1', 'DeleteFavorite'),
+                favorite_record('restaurant-2', 'DeleteFavorite'),
+            ), '')
+        assert response == {'batchItemFailures': [{'itemIdentifier': 'DeleteFavorite-restaurant-2'}]}
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_failed_write_calls_are_reported():
+    with setup_test_environment() as process_favorites_queue:
+        import aws_clients
+        client = aws_clients.get_resource('dynamodb').meta.client
+        batch_write_item = client.batch_write_item
+
+        def throttled(RequestItems):
+            requests = RequestItems[FAVORITES_MOCK_TABLE_NAME]
+            if any(r['PutRequest']['Item']['user_id'] == 'user-1' for r in requests):
+                raise client.exceptions.ProvisionedThroughputExceededException(
+                    {'Error': {'Code': 'ProvisionedThroughputExceededException', 'Message': 'Throttled'}},
+                    'BatchWriteItem')
+            return batch_write_item(RequestItems=RequestItems)
+
+        # 2 users of 20 favorites, written in 2 batches
+        records = []
+        for u in range(2):
+            for i in range(20):
+                record = favorite_record(f'restaurant-{i}', user_id=f'user-{u}')
+                record['messageId'] = f'user-{u}-restaurant-{i}'
+                records.append(record)
+        with patch.object(process_favorites_queue, 'executor', None), \
+                patch.object(client, 'batch_write_item', side_effect=throttled):
+            response = process_favorites_queue.lambda_handler(sqs_event(*records), '')
+        # the messages of the throttled batch are redelivered, the others were written
+        assert response == {'batchItemFailures': [{'itemIdentifier': f'user-1-restaurant-{i}'} for i in range(20)]}
+        assert favorite_ids('user-0') == sorted(f'restaurant-{i}' for i in range(20))
+        assert favorite_ids('user-1') == []
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_successful_batch_reports_no_failures():
+    with setup_test_environment() as process_favorites_queue:
+        response = process_favorites_queue.lambda_handler(sqs_event(favorite_record('restaurant-1')), '')
+        assert response == {'batchItemFailures': []}
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_user_batches():
+    with setup_test_environment() as process_favorites_queue:
+        def write_requests(user_id, count):
+            return {(user_id, f'restaurant-{i}'): (user_id, i) for i in range(count)}
+
+        batches = process_favorites_queue.user_batches({
+            **write_requests('user-1', 20), **write_requests('user-2', 10),
+            **write_requests('user-3', 30), **write_requests('user-4', 5),
+        })
+        # users are not split across batches and keep their order, a user with more
+        # than 25 changes gets a batch of their own
+        assert [len(batch) for batch in batches] == [20, 10, 30, 5]
+        assert batches[1] == [('user-2', i) for i in range(10)]
+        assert batches[2] == [('user-3', i) for i in range(30)]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_users_are_written_concurrently():
+    with setup_test_environment() as process_favorites_queue:
+        records = [
+            favorite_record(f'restaurant-{i}', user_id=f'user-{u}')
+            for u in range(20) for i in range(4)
+        ] + [favorite_record('restaurant-0', 'DeleteFavorite', user_id='user-7')]
+        with count_batch_writes() as batch_write_item:
+            response = process_favorites_queue.lambda_handler(sqs_event(*records), '')
+        assert response == {'batchItemFailures': []}
+        # 80 favorites of 20 users, packed 6 users per batch
+        assert batch_write_item.call_count == 4
+        assert favorite_ids('user-3') == [f'restaurant-{i}' for i in range(4)]
+        assert favorite_ids('user-7') == [f'restaurant-{i}' for i in range(1, 4)]
+
+
+@patch.dict(os.environ, {'TABLE_NAME': FAVORITES_MOCK_TABLE_NAME, 'POWERTOOLS_TRACE_DISABLED': 'true'})
+def test_failed_batch_does_not_fail_the_others():
+    with setup_test_environment() as process_favorites_queue:
+        original_batch_write = process_favorites_queue.batch_write
+
+        def batch_write(table_name, write_requests):
+            if any(r['PutRequest']['Item']['user_id'] == 'user-2' for r in write_requests):
+                raise RuntimeError('Connection reset')
+            return original_batch_write(table_name, write_requests)
+
+        records = []
+        for u in range(4):
+            for i in range(20):
+                record = favorite_record(f'restaurant-{i}', user_id=f'user-{u}')
+                record['messageId'] = f'user-{u}-restaurant-{i}'
+                records.append(record)
+        with patch.object(process_favorites_queue, 'batch_write', side_effect=batch_write):
+            response = process_favorites_queue.lambda_handler(sqs_event(*records), '')
+        # the 4 users are written by concurrent batches, only the failed one is redelivered
+        assert response == {'batchItemFailures': [{'itemIdentifier': f'user-2-restaurant-{i}'} for i in range(20)]}
+        for u in (0, 1, 3):
+            assert len(favorite_ids(f'user-{u}')) == 20
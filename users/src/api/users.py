@@ -4,81 +4,260 @@
 import json
 import uuid
 import os
+import threading
 import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from router import Router, json_body
+from pagination import encode_next_token, decode_next_token, parse_page_size
+from response import JSON_HEADERS, dumps, json_response
+from aws_clients import BOTO_CONFIG, get_client, get_table
 
-# Prepare DynamoDB client
+# Users table, the DynamoDB resource is created on first use by aws_clients
 USERS_TABLE = os.getenv('USERS_TABLE', None)
-dynamodb = boto3.resource('dynamodb')
-ddbTable = dynamodb.Table(USERS_TABLE)
 
+# Page size limits for listing users
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '1000'))
+
+# Bulk export settings
+EXPORT_BUCKET = os.getenv('EXPORT_BUCKET', None)
+EXPORT_TOTAL_SEGMENTS = int(os.getenv('EXPORT_TOTAL_SEGMENTS', '8'))
+# one thread per segment, the requested segmentation is bounded by this
+EXPORT_MAX_SEGMENTS = int(os.getenv('EXPORT_MAX_SEGMENTS', '32'))
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', '1000'))
+# a segment saves the checkpoint every this many pages, and when it stops
+EXPORT_CHECKPOINT_PAGES = int(os.getenv('EXPORT_CHECKPOINT_PAGES', '10'))
+# stop scanning when less than this is left, so the checkpoint can be saved
+EXPORT_TIME_MARGIN_MS = int(os.getenv('EXPORT_TIME_MARGIN_MS', '30000'))
+
+RESPONSE_HEADERS = {**JSON_HEADERS, 'Access-Control-Allow-Origin': '*'}
+
+
+def list_users(query_params):
+    """Returns a single page of users and the cursor to fetch the next one"""
+    scan_kwargs = {
+        'Limit': parse_page_size(query_params.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    }
+    if query_params.get('nextToken'):
+        scan_kwargs['ExclusiveStartKey'] = decode_next_token(query_params['nextToken'])
+    if query_params.get('fields'):
+        # always return the key so that clients can address the selected users
+        requested = [f.strip() for f in query_params['fields'].split(',')]
+        fields = ['userid'] + [f for f in requested if f and f != 'userid']
+        names = {f'#f{i}': field for i, field in enumerate(fields)}
+        scan_kwargs['ProjectionExpression'] = ', '.join(names)
+        scan_kwargs['ExpressionAttributeNames'] = names
+    ddb_response = get_table(USERS_TABLE).scan(**scan_kwargs)
+    page = {'users': ddb_response['Items']}
+    next_token = encode_next_token(ddb_response.get('LastEvaluatedKey'))
+    if next_token:
+        page['nextToken'] = next_token
+    return page
+
+
+class S3ExportSink(object):
+    """Stores NDJSON chunks and the export checkpoint under exports/<exportId>/ in S3.
+    Chunk keys are derived from segment and part number, so a chunk that is written
+    again after a resume overwrites the previous copy instead of duplicating it."""
+
+    def __init__(self, bucket, export_id, client=None):
+        self.bucket = bucket
+        self.prefix = f'exports/{export_id}'
+        self.client = client or get_client('s3')
+
+    def write_chunk(self, segment, part, body):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=f'{self.prefix}/segment-{segment:04d}/part-{part:06d}.ndjson',
+            Body=body.encode('utf-8'),
+            ContentType='application/x-ndjson',
+        )
+
+    def load_checkpoint(self):
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=f'{self.prefix}/checkpoint.json'
+            )
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return json.loads(response['Body'].read())
+
+    def save_checkpoint(self, checkpoint):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=f'{self.prefix}/checkpoint.json',
+            Body=dumps(checkpoint).encode('utf-8'),
+            ContentType='application/json',
+        )
+
+
+def check_total_segments(total_segments):
+    if not 1 <= total_segments <= EXPORT_MAX_SEGMENTS:
+        raise ValueError(f'totalSegments must be between 1 and {EXPORT_MAX_SEGMENTS}')
+
+
+def export_users(sink, total_segments=EXPORT_TOTAL_SEGMENTS, should_stop=None):
+    """Exports the whole Users table to the sink with a parallel scan, one thread per
+    segment. Each segment checkpoints its progress every EXPORT_CHECKPOINT_PAGES pages and
+    when it stops; calling it again with the same sink resumes each unfinished segment
+    from its last checkpointed key."""
+    checkpoint = sink.load_checkpoint()
+    if checkpoint is None:
+        check_total_segments(total_segments)
+        checkpoint = {
+            'totalSegments': total_segments,
+            'segments': {
+                str(segment): {'part': 0, 'items': 0, 'lastEvaluatedKey': None, 'done': False}
+                for segment in range(total_segments)
+            },
+        }
+    # a resumed export must keep the segmentation it was started with
+    total_segments = checkpoint['totalSegments']
+    lock = threading.Lock()
+
+    def save_checkpoint():
+        # the checkpoint holds the state of every segment, written one at a time
+        with lock:
+            sink.save_checkpoint(checkpoint)
+
+    def scan_segment(segment):
+        state = checkpoint['segments'][str(segment)]
+        # boto3 resources are not thread safe, each worker gets its own
+        table = boto3.session.Session().resource('dynamodb', config=BOTO_CONFIG).Table(USERS_TABLE)
+        unsaved_pages = 0
+        try:
+            while not state['done']:
+                if should_stop is not None and should_stop():
+                    return
+                scan_kwargs = {
+                    'Segment': segment,
+                    'TotalSegments': total_segments,
+                    'Limit': EXPORT_PAGE_SIZE,
+                }
+                if state['lastEvaluatedKey']:
+                    scan_kwargs['ExclusiveStartKey'] = state['lastEvaluatedKey']
+                ddb_response = table.scan(**scan_kwargs)
+                items = ddb_response['Items']
+                if items:
+                    body = ''.join(dumps(item) + '\n' for item in items)
+                    sink.write_chunk(segment, state['part'], body)
+                with lock:
+                    if items:
+                        state['part'] += 1
+                        state['items'] += len(items)
+                    state['lastEvaluatedKey'] = ddb_response.get('LastEvaluatedKey')
+                    state['done'] = state['lastEvaluatedKey'] is None
+                unsaved_pages += 1
+                if unsaved_pages >= EXPORT_CHECKPOINT_PAGES:
+                    save_checkpoint()
+                    unsaved_pages = 0
+        finally:
+            # also after an error, the chunks written so far are kept
+            if unsaved_pages:
+                save_checkpoint()
+
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        # list() re-raises the first exception of any segment
+        list(executor.map(scan_segment, range(total_segments)))
+
+    segments = checkpoint['segments'].values()
+    return {
+        'itemCount': sum(state['items'] for state in segments),
+        'totalSegments': total_segments,
+        'complete': all(state['done'] for state in segments),
+    }
 
-def lambda_handler(event, context):
-    route_key = f"{event['httpMethod']} {event['resource']}"
 
+def export_handler(event, context):
+    """Entry point for the users export job. Invoke it again with the returned exportId
+    while 'complete' is false to resume an interrupted export."""
+    export_id = event.get('exportId') or str(uuid.uuid1())
+    sink = S3ExportSink(EXPORT_BUCKET, export_id)
+
+    def should_stop():
+        return context.get_remaining_time_in_millis() < EXPORT_TIME_MARGIN_MS
+
+    try:
+        total_segments = int(event.get('totalSegments', EXPORT_TOTAL_SEGMENTS))
+        check_total_segments(total_segments)
+    except (TypeError, ValueError) as err:
+        print(f'Invalid export request: {err}')
+        return {'error': f'Invalid totalSegments: {err}'}
+
+    result = export_users(sink, total_segments, should_stop)
+    result['exportId'] = export_id
+    result['location'] = f's3://{EXPORT_BUCKET}/{sink.prefix}/'
+    print(json.dumps(result))
+    return result
+
+
+# *** Routes served by the users function
+router = Router()
+
+
+# Get a page of Users, use nextToken to fetch the following pages
+@router.route('GET', '/users')
+def get_users(event, context):
+    return 200, list_users(event.get('queryStringParameters') or {})
+
+
+# CRUD operations for a single User
+
+# Read a user by ID
+@router.route('GET', '/users/{userid}')
+def get_user(event, context):
+    # get data from the database
+    ddb_response = get_table(USERS_TABLE).get_item(
+        Key={'userid': event['pathParameters']['userid']}
+    )
+    # return single item instead of full DynamoDB response
+    return 200, ddb_response.get('Item', {})
+
+
+# Delete a user by ID
+@router.route('DELETE', '/users/{userid}')
+def delete_user(event, context):
+    # delete item in the database
+    get_table(USERS_TABLE).delete_item(Key={'userid': event['pathParameters']['userid']})
+    return 200, {}
+
+
+# Create a new user
+@router.route('PUT', '/users', middleware=[json_body])
+def create_user(event, context):
+    request_json = event['parsedBody']
+    request_json['timestamp'] = datetime.now().isoformat()
+    # generate unique id if it isn't present in the request
+    if 'userid' not in request_json:
+        request_json['userid'] = str(uuid.uuid1())
+    # update the database
+    get_table(USERS_TABLE).put_item(Item=request_json)
+    return 200, request_json
+
+
+# Update a specific user by ID
+@router.route('PUT', '/users/{userid}', middleware=[json_body])
+def update_user(event, context):
+    request_json = event['parsedBody']
+    request_json['timestamp'] = datetime.now().isoformat()
+    request_json['userid'] = event['pathParameters']['userid']
+    # update the database
+    get_table(USERS_TABLE).put_item(Item=request_json)
+    return 200, request_json
+
+
+def lambda_handler(event, context):
     # Set default response, override with data from DynamoDB if any
     response_body = {'Message': 'Unsupported route'}
     status_code = 400
-    headers = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
 
+    handler = router.resolve(event)
     try:
-        # Get a list of all Users
-        if route_key == 'GET /users':
-            ddb_response = ddbTable.scan(Select='ALL_ATTRIBUTES')
-            # return list of items instead of full DynamoDB response
-            response_body = ddb_response['Items']
-            status_code = 200
-
-        # CRUD operations for a single User
-
-        # Read a user by ID
-        if route_key == 'GET /users/{userid}':
-            # get data from the database
-            ddb_response = ddbTable.get_item(
-                Key={'userid': event['pathParameters']['userid']}
-            )
-            # return single item instead of full DynamoDB response
-            if 'Item' in ddb_response:
-                response_body = ddb_response['Item']
-            else:
-                response_body = {}
-            status_code = 200
-
-        # Delete a user by ID
-        if route_key == 'DELETE /users/{userid}':
-            # delete item in the database
-            ddbTable.delete_item(Key={'userid': event['pathParameters']['userid']})
-            response_body = {}
-            status_code = 200
-
-        # Create a new user
-        if route_key == 'PUT /users':
-            request_json = json.loads(event['body'])
-            request_json['timestamp'] = datetime.now().isoformat()
-            # generate unique id if it isn't present in the request
-            if 'userid' not in request_json:
-                request_json['userid'] = str(uuid.uuid1())
-            # update the database
-            ddbTable.put_item(Item=request_json)
-            response_body = request_json
-            status_code = 200
-
-        # Update a specific user by ID
-        if route_key == 'PUT /users/{userid}':
-            # update item in the database
-            request_json = json.loads(event['body'])
-            request_json['timestamp'] = datetime.now().isoformat()
-            request_json['userid'] = event['pathParameters']['userid']
-            # update the database
-            ddbTable.put_item(Item=request_json)
-            response_body = request_json
-            status_code = 200
+        if handler is not None:
+            status_code, response_body = handler(event, context)
     except Exception as err:
         status_code = 400
         response_body = {'Error:': str(err)}
         print(str(err))
-    return {
-        'statusCode': status_code,
-        'body': json.dumps(response_body),
-        'headers': headers,
-    }
+    return json_response(status_code, response_body, RESPONSE_HEADERS)
@@ -0,0 +1,9 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import sys
+
+# Modules of the shared Lambda layer are importable at the top level inside Lambda
+SHARED_LAYER_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'shared')
+sys.path.insert(0, os.path.abspath(SHARED_LAYER_PATH))
@@ -6,11 +6,12 @@ import os
 import boto3
 import uuid
 import pytest
-from moto import mock_dynamodb
+from moto import mock_dynamodb, mock_s3
 from contextlib import contextmanager
 from unittest.mock import patch
 
 USERS_MOCK_TABLE_NAME = 'Users'
+EXPORT_MOCK_BUCKET_NAME = 'users-export'
 UUID_MOCK_VALUE_JOHN = 'f8216640-91a2-11eb-8ab9-57aa454facef'
 UUID_MOCK_VALUE_JANE = '31a9f940-917b-11eb-9054-67837e2c40b0'
 UUID_MOCK_VALUE_NEW_USER = 'new-user-guid'
@@ -70,24 +71,74 @@ def test_get_list_of_users():
 
         with open('./events/event-get-all-users.json', 'r') as f:
             apigw_get_all_users_event = json.load(f)
-        expected_response = [
-            {
-                'userid': UUID_MOCK_VALUE_JOHN,
-                'name': 'John Doe',
-                'timestamp': '2021-03-30T21:57:49.860Z',
-            },
-            {
-                'userid': UUID_MOCK_VALUE_JANE,
-                'name': 'Jane Doe',
-                'timestamp': '2021-03-30T17:13:06.516Z',
-            },
-        ]
+        expected_response = {
+            'users': [
+                {
+                    'userid': UUID_MOCK_VALUE_JOHN,
+                    'name': 'John Doe',
+                    'timestamp': '2021-03-30T21:57:49.860Z',
+                },
+                {
+                    'userid': UUID_MOCK_VALUE_JANE,
+                    'name': 'Jane Doe',
+                    'timestamp': '2021-03-30T17:13:06.516Z',
+                },
+            ]
+        }
         ret = users.lambda_handler(apigw_get_all_users_event, '')
         assert ret['statusCode'] == 200
         data = json.loads(ret['body'])
         assert data == expected_response
 
 
+def test_get_list_of_users_paginated():
+    with my_test_environment():
+        from src.api import users
+
+        with open('./events/event-get-all-users.json', 'r') as f:
+            apigw_event = json.load(f)
+        apigw_event['queryStringParameters'] = {'limit': '1'}
+        ret = users.lambda_handler(apigw_event, '')
+        assert ret['statusCode'] == 200
+        first_page = json.loads(ret['body'])
+        assert len(first_page['users']) == 1
+        assert 'nextToken' in first_page
+
+        apigw_event['queryStringParameters']['nextToken'] = first_page['nextToken']
+        ret = users.lambda_handler(apigw_event, '')
+        assert ret['statusCode'] == 200
+        second_page = json.loads(ret['body'])
+        assert len(second_page['users']) == 1
+        assert second_page['users'][0]['userid'] != first_page['users'][0]['userid']
+
+
+def test_get_list_of_users_projection():
+    with my_test_environment():
+        from src.api import users
+
+        with open('./events/event-get-all-users.json', 'r') as f:
+            apigw_event = json.load(f)
+        apigw_event['queryStringParameters'] = {'fields': 'name'}
+        ret = users.lambda_handler(apigw_event, '')
+        assert ret['statusCode'] == 200
+        data = json.loads(ret['body'])
+        assert data['users'] == [
+            {'userid': UUID_MOCK_VALUE_JOHN, 'name': 'John Doe'},
+            {'userid': UUID_MOCK_VALUE_JANE, 'name': 'Jane Doe'},
+        ]
+
+
+def test_get_list_of_users_invalid_token():
+    with my_test_environment():
+        from src.api import users
+
+        with open('./events/event-get-all-users.json', 'r') as f:
+            apigw_event = json.load(f)
+        apigw_event['queryStringParameters'] = {'nextToken': 'not-a-token'}
+        ret = users.lambda_handler(apigw_event, '')
+        assert ret['statusCode'] == 400
+
+
 def test_get_single_user():
     with my_test_environment():
         from src.api import users
@@ -165,4 +216,94 @@ def test_delete_user():
         assert json.loads(ret['body']) == {}
 
 
+def read_export_lines(export_id):
+    s3 = boto3.client('s3')
+    objects = s3.list_objects_v2(
+        Bucket=EXPORT_MOCK_BUCKET_NAME, Prefix=f'exports/{export_id}/segment-'
+    )
+    lines = []
+    for obj in objects.get('Contents', []):
+        body = s3.get_object(Bucket=EXPORT_MOCK_BUCKET_NAME, Key=obj['Key'])['Body']
+        lines.extend(json.loads(line) for line in body.read().decode('utf-8').splitlines())
+    return lines
+
+
+@patch.dict(
+    os.environ,
+    {'USERS_TABLE': USERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'},
+)
+def test_export_users():
+    with my_test_environment(), mock_s3():
+        boto3.client('s3').create_bucket(Bucket=EXPORT_MOCK_BUCKET_NAME)
+        from src.api import users
+
+        sink = users.S3ExportSink(EXPORT_MOCK_BUCKET_NAME, 'export-1')
+        result = users.export_users(sink, total_segments=1)
+        assert result == {'itemCount': 2, 'totalSegments': 1, 'complete': True}
+        exported = read_export_lines('export-1')
+        assert sorted(user['userid'] for user in exported) == sorted(
+            [UUID_MOCK_VALUE_JOHN, UUID_MOCK_VALUE_JANE]
+        )
+
+
+@patch.dict(
+    os.environ,
+    {'USERS_TABLE': USERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'},
+)
+def test_export_users_resume():
+    with my_test_environment(), mock_s3():
+        boto3.client('s3').create_bucket(Bucket=EXPORT_MOCK_BUCKET_NAME)
+        from src.api import users
+
+        sink = users.S3ExportSink(EXPORT_MOCK_BUCKET_NAME, 'export-2')
+        pages = []
+        with patch.object(users, 'EXPORT_PAGE_SIZE', 1):
+            # interrupt the export after the first page
+            result = users.export_users(
+                sink, total_segments=1, should_stop=lambda: pages.append(1) or len(pages) > 1
+            )
+            assert result == {'itemCount': 1, 'totalSegments': 1, 'complete': False}
+            checkpoint = sink.load_checkpoint()
+            assert checkpoint['segments']['0']['lastEvaluatedKey'] is not None
+
+            result = users.export_users(sink, total_segments=1)
+        assert result == {'itemCount': 2, 'totalSegments': 1, 'complete': True}
+        assert len(read_export_lines('export-2')) == 2
+
+
+@patch.dict(
+    os.environ,
+    {'USERS_TABLE': USERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'},
+)
+def test_export_users_checkpoints_every_few_pages():
+    with my_test_environment(), mock_s3():
+        boto3.client('s3').create_bucket(Bucket=EXPORT_MOCK_BUCKET_NAME)
+        from src.api import users
+
+        sink = users.S3ExportSink(EXPORT_MOCK_BUCKET_NAME, 'export-3')
+        with patch.object(users, 'EXPORT_PAGE_SIZE', 1), \
+                patch.object(users, 'EXPORT_CHECKPOINT_PAGES', 5), \
+                patch.object(sink, 'save_checkpoint', wraps=sink.save_checkpoint) as save_checkpoint:
+            result = users.export_users(sink, total_segments=1)
+        assert result == {'itemCount': 2, 'totalSegments': 1, 'complete': True}
+        # saved once when the segment is done rather than after each of its pages
+        assert save_checkpoint.call_count == 1
+        assert sink.load_checkpoint()['segments']['0']['done'] is True
+
+
+@pytest.mark.parametrize('total_segments', [0, -1, 10000, 'many'])
+@patch.dict(
+    os.environ,
+    {'USERS_TABLE': USERS_MOCK_TABLE_NAME, 'AWS_XRAY_CONTEXT_MISSING': 'LOG_ERROR'},
+)
+def test_export_handler_rejects_invalid_segments(total_segments):
+    with my_test_environment(), mock_s3():
+        from src.api import users
+
+        with patch.object(users, 'export_users') as export_users:
+            result = users.export_handler({'totalSegments': total_segments}, None)
+        assert 'error' in result
+        export_users.assert_not_called()
+
+
 # Add your unit testing code here